@@ -0,0 +1,427 @@
+"""
+micro benchmarks of hot paths.
+
+```shell
+python -m benchmark.bench --output bench_output.json
+python -m benchmark.bench --compare bench_output.json  # compare with a previous run
+python -m benchmark.bench -k decode  # only benchmarks whose name contains `decode`
+```
+
+every benchmark reports the best and median seconds per operation
+over several repeats, results are stored as json so runs can be
+compared.
+"""
+import argparse
+import asyncio
+import datetime
+import json
+import platform
+import statistics
+import time
+from dataclasses import replace
+from typing import Any, Callable, Dict, Optional
+
+from benchmark.fake_notion import FakeNotion
+from benchmark.fixtures import make_database, make_pages, make_tasks
+from notion_self_management.client.memory_client import MemoryClient
+from notion_self_management.client.notion_client.datatypes.database import DataBase
+from notion_self_management.client.notion_client.datatypes.page import Page
+from notion_self_management.expression.bool_expression import and_, or_
+from notion_self_management.expression.utils import dataclass_filter
+from notion_self_management.expression.variable import Variable
+from notion_self_management.task_manager.note import Note
+from notion_self_management.task_manager.task import Task
+from notion_self_management.task_manager.task_manager import TaskManager
+
+BENCHMARKS = {}  # type: Dict[str, Callable[[int], Any]]
+
+
+def benchmark(name: str):
+    """register a benchmark, it takes the size and returns a callable of one run and ops per run"""
+
+    def wrap(f):
+        BENCHMARKS[name] = f
+        return f
+
+    return wrap
+
+
+def measure(run: Callable[[], Any], ops: int, repeat: int) -> Dict[str, float]:
+    times = []
+    for _ in range(repeat):
+        s = time.perf_counter()
+        result = run()
+        if asyncio.iscoroutine(result):
+            asyncio.run(result)
+        times.append((time.perf_counter() - s) / ops)
+    return {"best": min(times), "median": statistics.median(times), "ops": ops}
+
+
+# expression
+RULE = and_(
+    Task.status == "doing",
+    or_(Task.percent > 50, Task.title == "task 1"),
+    ~(Task.is_done == True),  # noqa: E712
+)
+
+
+RULE_TIME = datetime.datetime(2022, 1, 1)
+
+
+@benchmark("condition_list_evaluate")
+def bench_condition_evaluate(size: int):
+    rows = [vars(t) for t in make_tasks(size)]
+    return (lambda: [RULE.evaluate(**r) for r in rows]), size
+
+
+@benchmark("condition_list_compiled")
+def bench_condition_compiled(size: int):
+    rows = [vars(t) for t in make_tasks(size)]
+    f = RULE.compile()
+    return (lambda: [f(r) for r in rows]), size
+
+
+@benchmark("condition_compile_repeated")
+def bench_condition_compile_repeated(size: int):
+    # filters rebuilt for every call, like `TaskManager` does
+    ids = [f"task-{i % 100}" for i in range(size)]
+    return (lambda: [and_(Note.task_id == i, Note.note_time > RULE_TIME).compile() for i in ids]), size
+
+
+@benchmark("columnar_evaluate")
+def bench_columnar(size: int):
+    from notion_self_management.expression.columnar import evaluate_columns, to_columns
+    columns = to_columns(make_tasks(size), ["status", "percent", "title", "is_done"])
+    return (lambda: evaluate_columns(RULE, columns)), size
+
+
+@benchmark("dataclass_filter_create")
+def bench_dataclass_filter(size: int):
+
+    def run():
+        for _ in range(size // 100 or 1):
+
+            @dataclass_filter
+            class A:
+                a = Variable(int)
+                b: str
+                c: datetime.datetime
+
+            @dataclass_filter
+            class B(A):
+                d: int
+
+    return run, size // 100 or 1
+
+
+# rule matching
+def _rules(n: int):
+    """
+    ten percent thresholds, and rules on distinct titles or statuses. An
+    event satisfies a bounded number of rules however many there are, so
+    matching by the index shouldn't grow with the count of rules.
+    """
+    rules = [Task.percent > 90 + i for i in range(min(n, 10))]
+    for i in range(len(rules), n):
+        if i % 2:
+            rules.append((Task.title == f"task {i}") & (Task.is_done == False))  # noqa: E712
+        else:
+            rules.append(or_(Task.title == f"task {i}", Task.status == f"status {i}"))
+    return rules
+
+
+def _bench_rule_index(rules: int, changed: Optional[set] = None):
+
+    def setup(size: int):
+        from notion_self_management.handler.rule_index import RuleIndex
+        index = RuleIndex()
+        for i, r in enumerate(_rules(rules)):
+            index.add(i, r)
+        rows = [vars(t) for t in make_tasks(size)]
+        return (lambda: [index.match(r, changed) for r in rows]), size
+
+    return setup
+
+
+def _bench_rule_scan(rules: int):
+
+    def setup(size: int):
+        fs = [r.compile() for r in _rules(rules)]
+        rows = [vars(t) for t in make_tasks(size // 10 or 1)]
+        return (lambda: [[i for i, f in enumerate(fs) if f(r)] for r in rows]), size // 10 or 1
+
+    return setup
+
+
+for _n in (100, 1000, 10000):
+    benchmark(f"rule_index_match_{_n}")(_bench_rule_index(_n))
+    benchmark(f"rule_scan_{_n}")(_bench_rule_scan(_n))
+    # an edit of `content` only, which none of the rules reads
+    benchmark(f"rule_index_changed_{_n}")(_bench_rule_index(_n, {"content"}))
+
+
+@benchmark("rules_load_json")
+def bench_rules_load_json(size: int):
+    from notion_self_management.expression.serialize import dump_rules, load_rules
+    data = dump_rules({str(i): r for i, r in enumerate(_rules(size))})
+    return (lambda: load_rules(data)), size
+
+
+@benchmark("rules_load_binary")
+def bench_rules_load_binary(size: int):
+    from notion_self_management.expression.serialize import dump_rules, load_rules
+    data = dump_rules({str(i): r for i, r in enumerate(_rules(size))}, binary=True)
+    return (lambda: load_rules(data)), size
+
+
+# cron
+@benchmark("cron_next")
+def bench_cron_next(size: int):
+    from notion_self_management.expression.cron import Cron
+    crons = [Cron("*/15 9-18 * * mon-fri"), Cron("0 0 29 2 *"), Cron("5 4 * * sun")]
+    start = datetime.datetime(2022, 1, 1)
+    times = [start + datetime.timedelta(minutes=i * 37) for i in range(size)]
+    return (lambda: [c.next(t) for t in times for c in crons]), size * len(crons)
+
+
+@benchmark("scheduler_add_fire")
+def bench_scheduler(size: int):
+    from notion_self_management.expression.cron import Cron
+    from notion_self_management.handler.scheduler import Scheduler
+    crons = [Cron(f"{i % 60} {i % 24} * * *") for i in range(size)]
+
+    async def job(when):
+        ...
+
+    async def run():
+        now = datetime.datetime(2022, 1, 1)
+        scheduler = Scheduler(lambda: now)
+        for i, c in enumerate(crons):
+            scheduler.add(i, c, job)
+        now = datetime.datetime(2022, 1, 2)
+        scheduler.run_pending()
+        await scheduler.stop()
+
+    return run, size
+
+
+def _bench_catch_up(policy_name: str, downtime: datetime.timedelta):
+
+    def setup(size: int):
+        from notion_self_management.client.watermark import MemoryWatermarkStore
+        from notion_self_management.expression.cron import Cron
+        from notion_self_management.handler.scheduler import MissedPolicy, Scheduler
+        last = datetime.datetime(2022, 1, 1)
+        store = MemoryWatermarkStore()
+        store.data = {f"cron:{i}": {"last_fired": last.isoformat()} for i in range(size)}
+        cron = Cron("*/5 * * * *")
+
+        async def job(when):
+            ...
+
+        async def run():
+            scheduler = Scheduler(lambda: last + downtime, store)
+            for i in range(size):
+                scheduler.add(i, cron, job, MissedPolicy[policy_name])
+            await scheduler.restore()
+            await scheduler.stop()
+
+        return run, size
+
+    return setup
+
+
+# a year down costs coalescing nothing more than a day
+benchmark("cron_catch_up_coalesce_day")(_bench_catch_up("coalesce", datetime.timedelta(days=1)))
+benchmark("cron_catch_up_coalesce_year")(_bench_catch_up("coalesce", datetime.timedelta(days=365)))
+benchmark("cron_catch_up_replay_day")(_bench_catch_up("replay", datetime.timedelta(days=1)))
+
+
+@benchmark("dispatch_events")
+def bench_dispatch(size: int):
+    from notion_self_management.handler.handler_manager import HandlerManager
+    tasks = make_tasks(size)
+    notes = [Note(version=str(i), note_time=t.update_time, previous=None, **vars(t)) for i, t in enumerate(tasks)]
+
+    async def handler(note, previous):
+        ...
+
+    async def run():
+        handlers = HandlerManager(concurrency=4)
+        for i, condition in enumerate(_rules(100)):
+            handlers.register(str(i), condition, handler)
+        handlers.register("all", Task.percent >= 0, handler)
+        handlers.start()
+        for n in notes:
+            await handlers.dispatch(n)
+        await handlers.join()
+        await handlers.stop()
+
+    return run, size
+
+
+# decoding
+@benchmark("database_from_dict")
+def bench_database_from_dict(size: int):
+    data = make_database()
+    return (lambda: [DataBase.from_dict(data) for _ in range(size // 10 or 1)]), size // 10 or 1
+
+
+@benchmark("page_decode")
+def bench_page_decode(size: int):
+    pages = make_pages(size)
+    return (lambda: [Page.from_dict(p) for p in pages]), size
+
+
+@benchmark("notion_query_to_task")
+def bench_notion_query(size: int):
+    fake = FakeNotion(make_pages(size))
+
+    async def run():
+        notion = fake.client(Task)
+        async for _ in notion.iter_rows():
+            pass
+
+    return run, size
+
+
+# note pipeline
+def _manager() -> TaskManager:
+    return TaskManager(MemoryClient(), MemoryClient(id_field="version"))
+
+
+@benchmark("take_note")
+def bench_take_note(size: int):
+    tasks = make_tasks(size)
+
+    async def run():
+        manager = _manager()
+        for t in tasks:
+            await manager.take_note(t)
+            await manager.take_note(t)  # idempotent
+            await manager.take_note(replace(t, update_time=t.update_time + datetime.timedelta(1)))
+
+    return run, size * 3
+
+
+@benchmark("take_note_delta")
+def bench_take_note_delta(size: int):
+    from notion_self_management.client.delta_client import DeltaNoteClient
+    tasks = make_tasks(size)
+
+    async def run():
+        manager = TaskManager(MemoryClient(), DeltaNoteClient(MemoryClient(id_field="version")))
+        for t in tasks:
+            await manager.take_note(t)
+            await manager.take_note(replace(t, update_time=t.update_time + datetime.timedelta(1)))
+
+    return run, size * 2
+
+
+class _SlowNotes(MemoryClient):
+    """a note client with a round trip latency"""
+
+    async def create(self, t):
+        await asyncio.sleep(0.001)
+        return await super().create(t)
+
+
+def _bench_take_notes(concurrency: int):
+
+    def setup(size: int):
+        tasks = make_tasks(size // 10 or 1) * 2
+
+        async def run():
+            manager = TaskManager(MemoryClient(), _SlowNotes(id_field="version"))
+            await manager.take_notes(tasks, concurrency)
+
+        return run, len(tasks)
+
+    return setup
+
+
+# throughput grows with the concurrency the note client allows
+benchmark("take_notes_sequential")(_bench_take_notes(1))
+benchmark("take_notes_concurrent")(_bench_take_notes(32))
+
+
+@benchmark("coalescer_submit")
+def bench_coalescer_submit(size: int):
+    from notion_self_management.task_manager.coalescer import Coalescer
+    tasks = make_tasks(size)
+
+    async def sink(task):
+        ...
+
+    async def run():
+        coalescer = Coalescer(sink)
+        for _ in range(3):  # rapid edits of many tasks
+            for t in tasks:
+                await coalescer.submit(t)
+        await coalescer.flush()
+
+    return run, size * 3
+
+
+@benchmark("delete_notes")
+def bench_delete_notes(size: int):
+    now = datetime.datetime(2022, 1, 1)
+    task = vars(make_tasks(1)[0])
+
+    async def run():
+        manager = _manager()
+        notes = [
+            Note(version=str(i), note_time=now + datetime.timedelta(seconds=i), previous=str(i - 1) if i else None,
+                 **task) for i in range(size)
+        ]
+        await manager.note_db.create_many(notes)
+        await manager.delete_notes(notes[size // 2:])
+
+    return run, size - size // 2
+
+
+def compare(results: Dict[str, Any], baseline: Dict[str, Any]):
+    print(f"{'benchmark':<32}{'baseline':>14}{'current':>14}{'ratio':>10}")
+    for name, r in results.items():
+        b = baseline.get("results", {}).get(name)
+        if b is None:
+            continue
+        print(f"{name:<32}{b['median']:>14.3e}{r['median']:>14.3e}{r['median'] / b['median']:>10.2f}")
+
+
+def main(argv: Optional[list] = None):
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--size", type=int, default=10000, help="rows of synthetic data")
+    parser.add_argument("--repeat", type=int, default=5)
+    parser.add_argument("-k", dest="keyword", default="", help="only run benchmarks containing keyword")
+    parser.add_argument("--output", help="write results to a json file")
+    parser.add_argument("--compare", help="compare with results of a previous run")
+    args = parser.parse_args(argv)
+
+    results = {}
+    for name, setup in BENCHMARKS.items():
+        if args.keyword not in name:
+            continue
+        run, ops = setup(args.size)
+        results[name] = measure(run, ops, args.repeat)
+        print(f"{name:<32}{results[name]['median']:>14.3e} s/op")
+
+    report = {
+        "meta": {
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "time": datetime.datetime.now().isoformat(),
+            "size": args.size,
+        },
+        "results": results,
+    }
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump(report, f, indent=2)
+    if args.compare:
+        with open(args.compare) as f:
+            compare(results, json.load(f))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,86 @@
+"""
+an in-process fake of Notion's API, served through
+`httpx.MockTransport` so no socket or token is needed.
+
+only what `Notion` client uses is implemented: retrieving
+a database, querying it with pagination, and retrieving,
+creating and updating pages. Query filters are ignored
+except `last_edited_time`, sorts are ignored except
+timestamps. Error responses can be queued to test retries.
+"""
+import asyncio
+import json
+import uuid
+from typing import Any, Dict, List, Optional
+
+import httpx
+from benchmark.fixtures import make_database
+from notion_self_management.client.notion_client.client import AsyncClient, Notion
+from notion_self_management.client.notion_client.rate_limit import RateLimiter
+
+
+class FakeNotion:
+
+    def __init__(self, pages: List[Dict[str, Any]], database_id: str = "db", latency: float = 0.0) -> None:
+        self.database = make_database(database_id)
+        self.pages = {p["id"]: p for p in pages}
+        self.latency = latency
+        self.requests = 0
+        self.errors: List[httpx.Response] = []  # responded to the next requests in order
+
+    def client(self, model: Optional[type] = None, rate_limiter: Optional[RateLimiter] = None, **kwargs) -> Notion:
+        """a Notion client talking to this fake, without rate limits by default"""
+        notion = Notion("fake", self.database["id"], model=model, **kwargs)
+        notion.client = AsyncClient(
+            transport=httpx.MockTransport(self.handle),
+            rate_limiter=rate_limiter or RateLimiter(rate=1e9, burst=1 << 30),
+        )
+        return notion
+
+    async def handle(self, request: httpx.Request) -> httpx.Response:
+        if self.latency:
+            await asyncio.sleep(self.latency)
+        self.requests += 1
+        if self.errors:
+            return self.errors.pop(0)
+
+        parts = request.url.path.strip("/").split("/")
+        body = json.loads(request.content) if request.content else {}
+        if parts[1] == "databases" and len(parts) == 3:
+            return httpx.Response(200, json=self.database)
+        if parts[1] == "databases":
+            return self._query(body)
+        if request.method == "POST":
+            return self._create(body)
+        page = self.pages.get(parts[2])
+        if page is None:
+            return httpx.Response(404, json={"object": "error"})
+        if request.method == "PATCH":
+            page["properties"].update(body.get("properties", {}))
+            page["archived"] = body.get("archived", page["archived"])
+        return httpx.Response(200, json=page)
+
+    def _query(self, body: Dict[str, Any]) -> httpx.Response:
+        rows = [p for p in self.pages.values() if not p["archived"]]
+        since = body.get("filter", {}).get("last_edited_time", {}).get("on_or_after")
+        if since:
+            rows = [p for p in rows if p["last_edited_time"] >= since[:19]]
+        for sort in body.get("sorts", []):
+            if "timestamp" in sort:
+                rows.sort(key=lambda p: p[sort["timestamp"]], reverse=sort["direction"] == "descending")
+
+        start = int(body.get("start_cursor") or 0)
+        end = start + body.get("page_size", 100)
+        has_more = end < len(rows)
+        return httpx.Response(200, json={
+            "object": "list",
+            "results": rows[start:end],
+            "has_more": has_more,
+            "next_cursor": str(end) if has_more else None,
+        })
+
+    def _create(self, body: Dict[str, Any]) -> httpx.Response:
+        page = dict(next(iter(self.pages.values()))) if self.pages else {}
+        page.update(id=str(uuid.uuid4()), properties=body.get("properties", {}), archived=False)
+        self.pages[page["id"]] = page
+        return httpx.Response(200, json=page)
@@ -0,0 +1,131 @@
+"""
+synthetic Notion databases for benchmarks.
+
+every page has the properties of `Task`, so a `Notion(model=Task)`
+client can decode them.
+"""
+import datetime
+import random
+from typing import Any, Dict, List
+
+from notion_self_management.task_manager.task import Task
+
+USER = {"object": "user", "id": "55be79e7-0853-4ef4-a5ec-193f890dd119"}
+STATUS = ["todo", "doing", "done", "blocked", "canceled"]
+TAGS = ["develop", "learn", "other", "opensource", "design", "tools", "writing"]
+
+SCHEMA = {
+    "title": "title",
+    "content": "rich_text",
+    "status": "select",
+    "due_date": "date",
+    "start_date": "date",
+    "Tags": "multi_select",
+    "is_done": "checkbox",
+    "active": "checkbox",
+    "percent": "number",
+}
+
+
+def _rich_text(content: str) -> Dict[str, Any]:
+    return {
+        "type": "text",
+        "text": {"content": content, "link": None},
+        "annotations": {
+            "bold": False,
+            "italic": False,
+            "strikethrough": False,
+            "underline": False,
+            "code": False,
+            "color": "default",
+        },
+        "plain_text": content,
+        "href": None,
+    }
+
+
+def make_database(database_id: str = "db") -> Dict[str, Any]:
+    properties = {}
+    for i, (name, type_) in enumerate(SCHEMA.items()):
+        prop = {"id": str(i), "name": name, "type": type_, type_: {}}
+        if type_ in ("select", "multi_select"):
+            prop[type_] = {"options": [{"id": o, "name": o, "color": "default"} for o in STATUS + TAGS]}
+        properties[name] = prop
+
+    return {
+        "object": "database",
+        "id": database_id,
+        "cover": None,
+        "icon": {"type": "emoji", "emoji": "🌓"},
+        "created_time": "2022-01-01T00:00:00.000Z",
+        "created_by": USER,
+        "last_edited_time": "2022-01-01T00:00:00.000Z",
+        "last_edited_by": USER,
+        "title": [_rich_text("benchmark")],
+        "description": [],
+        "is_inline": False,
+        "properties": properties,
+        "parent": {"type": "workspace", "workspace": True},
+        "url": f"https://www.notion.so/{database_id}",
+        "archived": False,
+    }
+
+
+def _iso(t: datetime.datetime) -> str:
+    return t.strftime("%Y-%m-%dT%H:%M:%S.000Z")
+
+
+def make_page(i: int, rnd: random.Random, database_id: str = "db") -> Dict[str, Any]:
+    start = datetime.datetime(2022, 1, 1) + datetime.timedelta(minutes=i)
+    percent = rnd.randint(0, 100)
+    return {
+        "object": "page",
+        "id": f"page-{i:08d}",
+        "created_time": _iso(start),
+        "created_by": USER,
+        "last_edited_time": _iso(start + datetime.timedelta(minutes=rnd.randint(0, 60))),
+        "last_edited_by": USER,
+        "archived": False,
+        "parent": {"type": "database_id", "database_id": database_id},
+        "url": f"https://www.notion.so/page-{i}",
+        "properties": {
+            "title": {"id": "0", "type": "title", "title": [_rich_text(f"task {i}")]},
+            "content": {"id": "1", "type": "rich_text", "rich_text": [_rich_text("x" * rnd.randint(0, 200))]},
+            "status": {"id": "2", "type": "select", "select": {"id": "s", "name": rnd.choice(STATUS), "color": "red"}},
+            "due_date": {"id": "3", "type": "date", "date": {"start": _iso(start + datetime.timedelta(days=7))}},
+            "start_date": {"id": "4", "type": "date", "date": {"start": _iso(start)}},
+            "Tags": {"id": "5", "type": "multi_select", "multi_select": [{"name": t} for t in rnd.sample(TAGS, 2)]},
+            "is_done": {"id": "6", "type": "checkbox", "checkbox": percent == 100},
+            "active": {"id": "7", "type": "checkbox", "checkbox": True},
+            "percent": {"id": "8", "type": "number", "number": percent},
+        },
+    }
+
+
+def make_pages(n: int, seed: int = 0) -> List[Dict[str, Any]]:
+    rnd = random.Random(seed)
+    return [make_page(i, rnd) for i in range(n)]
+
+
+def make_tasks(n: int, seed: int = 0) -> List[Task]:
+    rnd = random.Random(seed)
+    now = datetime.datetime(2022, 1, 1)
+    return [
+        Task(
+            task_id=f"task-{i}",
+            create_time=now,
+            update_time=now + datetime.timedelta(seconds=i),
+            create_by="",
+            update_by="",
+            title=f"task {i}",
+            content="x" * rnd.randint(0, 200),
+            status=rnd.choice(STATUS),
+            due_date=now + datetime.timedelta(days=rnd.randint(0, 30)),
+            start_date=now,
+            Tags=rnd.sample(TAGS, 2),
+            is_done=False,
+            active=True,
+            percent=rnd.randint(0, 100),
+            extras_field={},
+        ) for i in range(n)
+    ]
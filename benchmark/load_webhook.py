@@ -0,0 +1,156 @@
+"""
+a load test of the webhook endpoint against a local server.
+
+```shell
+python -m benchmark.load_webhook --requests 20000 --concurrency 200 --pages 500
+```
+
+the server runs in another process with a sink which only sleeps,
+so acknowledgement latency of the endpoint is measured instead of
+Notion's. Notifications of a few pages are sent in bursts over
+keep-alive connections, latency percentiles and how many were
+coalesced are reported. It fails if p99 is over `--p99-budget`.
+
+requests are written on raw connections, an HTTP client library on
+the same machine costs more CPU than the endpoint and its queueing
+would be measured instead. Each connection sends a request after the
+previous response, so latency includes waiting behind the other
+connections: p50 is about concurrency / throughput.
+"""
+import argparse
+import asyncio
+import hashlib
+import hmac
+import json
+import multiprocessing
+import random
+import statistics
+import sys
+import time
+from typing import Dict, List, Tuple
+
+SECRET = "load-test"
+
+
+def serve(host: str, port: int, window: float):
+    from notion_self_management.web.batcher import MicroBatcher
+    from notion_self_management.web.server import create_app
+
+    async def sink(pages: List[str]):
+        await asyncio.sleep(0.01)  # a fetch
+
+    app = create_app(MicroBatcher(sink, window=window), secret=SECRET, name="load_test")
+    app.run(host=host, port=port, access_log=False)
+
+
+def notification(page_id: str) -> bytes:
+    return json.dumps({
+        "type": "page.properties_updated",
+        "entity": {"id": page_id, "type": "page"},
+        "data": {"parent": {"id": "db", "type": "database"}},
+    }).encode()
+
+
+class Connection:
+    """a keep-alive HTTP/1.1 connection which sends one request at a time"""
+
+    def __init__(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter) -> None:
+        self.reader = reader
+        self.writer = writer
+
+    @classmethod
+    async def open(cls, host: str, port: int, timeout: float = 30) -> "Connection":
+        deadline = time.monotonic() + timeout
+        while True:
+            try:
+                return cls(*await asyncio.open_connection(host, port))
+            except OSError:
+                if time.monotonic() > deadline:
+                    raise
+                await asyncio.sleep(0.1)
+
+    async def request(self, method: str, path: str, body: bytes = b"", headers: str = "") -> Tuple[int, bytes]:
+        if body:
+            headers += f"Content-Length: {len(body)}\r\n"
+        self.writer.write(f"{method} {path} HTTP/1.1\r\nHost: localhost\r\n{headers}\r\n".encode() + body)
+        head = (await self.reader.readuntil(b"\r\n\r\n")).decode("latin-1").split("\r\n")
+        length = 0
+        for line in head[1:]:
+            name, _, value = line.partition(":")
+            if name.lower() == "content-length":
+                length = int(value)
+        return int(head[0].split()[1]), await self.reader.readexactly(length)
+
+    def close(self):
+        self.writer.close()
+
+
+async def load(host: str, port: int, requests: int, concurrency: int, pages: int) -> dict:
+    bodies = [notification(f"page-{i}") for i in range(pages)]
+    signatures = ["sha256=" + hmac.new(SECRET.encode(), b, hashlib.sha256).hexdigest() for b in bodies]
+    latencies: List[float] = []
+    statuses: Dict[int, int] = {}
+
+    connections = [await Connection.open(host, port) for _ in range(concurrency)]
+    remaining = iter(range(requests))
+
+    async def worker(connection: Connection):
+        for _ in remaining:
+            i = random.randrange(pages)
+            start = time.perf_counter()
+            status, _ = await connection.request("POST", "/webhook", bodies[i],
+                                                 f"X-Notion-Signature: {signatures[i]}\r\n")
+            latencies.append(time.perf_counter() - start)
+            statuses[status] = statuses.get(status, 0) + 1
+
+    start = time.perf_counter()
+    await asyncio.gather(*(worker(c) for c in connections))
+    elapsed = time.perf_counter() - start
+    await asyncio.sleep(1)  # let the last batch go
+    _, health = await connections[0].request("GET", "/health")
+    for c in connections:
+        c.close()
+
+    latencies.sort()
+    percentiles = statistics.quantiles(latencies, n=100)
+    return {
+        "requests": requests,
+        "throughput": requests / elapsed,
+        "p50": percentiles[49],
+        "p99": percentiles[98],
+        "max": latencies[-1],
+        "statuses": statuses,
+        "batcher": json.loads(health),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8765)
+    parser.add_argument("--requests", type=int, default=10000)
+    parser.add_argument("--concurrency", type=int, default=100)
+    parser.add_argument("--pages", type=int, default=500, help="distinct pages notified")
+    parser.add_argument("--window", type=float, default=0.2, help="seconds notifications are coalesced")
+    parser.add_argument("--p99-budget", type=float, default=50, help="milliseconds p99 latency may take")
+    args = parser.parse_args()
+
+    server = multiprocessing.Process(target=serve, args=(args.host, args.port, args.window), daemon=True)
+    server.start()
+    try:
+        result = asyncio.run(load(args.host, args.port, args.requests, args.concurrency, args.pages))
+    finally:
+        server.terminate()
+        server.join()
+
+    print(f"{result['requests']} requests, {result['throughput']:.0f} req/s")
+    print(f"p50 {result['p50'] * 1000:.2f} ms, p99 {result['p99'] * 1000:.2f} ms, max {result['max'] * 1000:.2f} ms")
+    print(f"statuses {result['statuses']}")
+    print(f"batcher {result['batcher']}")
+    if result["p99"] * 1000 > args.p99_budget:
+        print(f"p99 is over the budget of {args.p99_budget:.0f} ms")
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
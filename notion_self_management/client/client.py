@@ -1,3 +1,4 @@
+from dataclasses import dataclass
 from typing import Generic, List, Optional, TypeVar
 
 from notion_self_management.expression.bool_expression import ConditionType
@@ -8,6 +9,18 @@ from notion_self_management.task_manager.task import Task
 T = TypeVar("T", Note, Task)
 
 
+@dataclass
+class BatchResult(Generic[T]):
+    """result of one item in a batch operation"""
+    item: T
+    result: Optional[T] = None
+    error: Optional[Exception] = None
+
+    @property
+    def ok(self) -> bool:
+        return self.error is None
+
+
 class Client(Generic[T]):
 
     async def create(self, t: T) -> T:
@@ -22,6 +35,25 @@ class Client(Generic[T]):
     async def update(self, t: T) -> Optional[T]:
         return NotImplemented
 
+    # for batch
+    # subclasses can override these with a bulk api or concurrent requests,
+    # a failure of one item should not stop others.
+    async def create_many(self, ts: List[T]) -> List[BatchResult[T]]:
+        return [await self._batch_one(self.create, t) for t in ts]
+
+    async def delete_many(self, ts: List[T]) -> List[BatchResult[T]]:
+        return [await self._batch_one(self.delete, t) for t in ts]
+
+    async def update_many(self, ts: List[T]) -> List[BatchResult[T]]:
+        return [await self._batch_one(self.update, t) for t in ts]
+
+    @staticmethod
+    async def _batch_one(method, t: T) -> BatchResult[T]:
+        try:
+            return BatchResult(t, result=await method(t))
+        except Exception as ex:
+            return BatchResult(t, error=ex)
+
     # for get
     async def get(self, t_id: str) -> Optional[T]:
         return NotImplemented
@@ -0,0 +1,184 @@
+from dataclasses import replace
+from typing import Dict, List, Optional
+
+from notion_self_management.client.client import BatchResult, Client
+from notion_self_management.expression.bool_expression import ConditionType, and_, or_
+from notion_self_management.expression.dependency import referenced_variables
+from notion_self_management.expression.variable import Variable
+from notion_self_management.task_manager.cache import LRUCache
+from notion_self_management.task_manager.note import _TASK_FIELDS, Note, changed_fields
+
+# fields every stored note keeps, queries can only read them
+CHAIN_FIELDS = frozenset(["task_id", "version", "note_time", "previous", "delta", "depth"])
+
+
+class DeltaNoteClient(Client[Note]):
+
+    def __init__(self, client: Client[Note], snapshot_every: int = 10, cache_size: int = 1024) -> None:
+        """
+        a note client which stores most notes as deltas of their previous notes.
+
+        a delta note only stores fields changed since the previous note,
+        others are `None`, and `delta` lists the stored fields. Every
+        `snapshot_every` notes of a task a full note is stored, reading
+        a note applies at most `snapshot_every - 1` deltas to the nearest
+        full note before it, they are read in a single query.
+
+        notes read from this client are always full, so `TaskManager`
+        works the same with it.
+
+        ```python
+        notes = DeltaNoteClient(await MongoClient.from_url("mongodb://localhost:27017", "notion"))
+        manager = TaskManager(notion, notes)
+        ```
+
+        only `CHAIN_FIELDS` can be queried, they are stored in every note.
+
+        :param client: stores encoded notes.
+        :param snapshot_every: notes between full notes, `1` means only full notes.
+        :param cache_size: recently read or written full notes are cached.
+        """
+        self.client = client
+        self.snapshot_every = snapshot_every
+        self._full: LRUCache[str, Note] = LRUCache(cache_size)
+
+    async def _previous(self, note: Note) -> Optional[Note]:
+        if note.previous is None:
+            return None
+        previous = self._full.get(note.previous)
+        if previous is None:
+            previous = await self.client.get(note.previous)
+            previous = previous and await self.materialize(previous)
+        return previous
+
+    def _encode(self, note: Note, previous: Optional[Note]) -> Note:
+        """the stored form of a full note"""
+        if previous is None or previous.depth + 1 >= self.snapshot_every:
+            return replace(note, delta=None, depth=0)
+        changed = changed_fields(note, previous)
+        holes = {name: None for name in _TASK_FIELDS if name not in changed and name not in CHAIN_FIELDS}
+        return replace(note, delta=sorted(changed), depth=previous.depth + 1, **holes)
+
+    @staticmethod
+    def _apply(full: Note, delta: Note) -> Note:
+        values = {name: getattr(delta, name) for name in delta.delta or ()}
+        return replace(full, version=delta.version, note_time=delta.note_time, previous=delta.previous,
+                       depth=delta.depth, delta=None, **values)
+
+    async def materialize(self, note: Note) -> Note:
+        """
+        the full note of a stored note, deltas are applied
+        to the nearest full note before it.
+
+        ```text
+        v1(full) <- v2(delta) <- v3(delta)
+        materialize(v3) == v1 + v2 + v3
+        ```
+        """
+        if note.delta is None:
+            return note
+        full = self._full.get(note.version)
+        if full is not None:
+            return replace(full)
+
+        # prefetch the notes back to the full note
+        fetched: Dict[str, Note] = {}
+        if note.previous not in self._full:
+            earlier = await self.client.lists(
+                and_(Note.task_id == note.task_id, Note.note_time < note.note_time),
+                limit=note.depth,
+                order_by=[Note.note_time],
+                desc=True,
+            )
+            fetched = {n.version: n for n in earlier}
+
+        chain = [note]
+        while True:
+            version = chain[-1].previous
+            if version is None:
+                raise ValueError(f"delta note {chain[-1].version} has no previous note")
+            base = self._full.get(version)
+            if base is not None:
+                break
+            stored = fetched.get(version) or await self.client.get(version)
+            if stored is None:
+                raise ValueError(f"note {version} which note {note.version} depends on is missing")
+            if stored.delta is None:
+                base = stored
+                break
+            chain.append(stored)
+
+        for delta in reversed(chain):
+            base = self._apply(base, delta)
+            self._full.put(base.version, base)
+        return replace(base)
+
+    async def _materialize_all(self, notes: List[Note]) -> List[Note]:
+        # earlier notes first, later ones are applied to them in the cache
+        for i in sorted(range(len(notes)), key=lambda i: notes[i].note_time):
+            notes[i] = await self.materialize(notes[i])
+        return notes
+
+    async def create(self, t: Note) -> Note:
+        stored = self._encode(t, await self._previous(t))
+        await self.client.create(stored)
+        full = replace(t, delta=None, depth=stored.depth)
+        self._full.put(full.version, full)
+        return replace(full)
+
+    async def update(self, t: Note) -> Optional[Note]:
+        """a note is updated as a full note, notes after it inherit its new values"""
+        full = replace(t, delta=None, depth=0)
+        if await self.client.update(full) is None:
+            return None
+        self._full.clear()  # notes after it change too
+        return replace(full)
+
+    async def _rebase(self, deleted: List[Note]):
+        """delta notes following deleted ones become full notes, their previous notes are gone"""
+        if not deleted:
+            return
+        versions = {n.version for n in deleted}
+        following = await self.client.lists(or_(*(Note.previous == v for v in versions)))
+        for n in following:
+            if n.version in versions or n.delta is None:
+                continue
+            full = replace(await self.materialize(n), depth=0)
+            await self.client.update(full)
+            self._full.put(full.version, full)
+
+    async def delete(self, t: Note) -> Optional[Note]:
+        await self._rebase([t])
+        self._full.pop(t.version)
+        return await self.client.delete(t)
+
+    async def hard_delete(self, t: Note):
+        return await self.delete(t)
+
+    async def delete_many(self, ts: List[Note]) -> List[BatchResult[Note]]:
+        await self._rebase(ts)
+        for t in ts:
+            self._full.pop(t.version)
+        return await self.client.delete_many(ts)
+
+    async def get(self, t_id: str) -> Optional[Note]:
+        stored = await self.client.get(t_id)
+        return stored and await self.materialize(stored)
+
+    async def lists(
+        self,
+        conditions: ConditionType,
+        limit: Optional[int] = None,
+        offset: Optional[int] = None,
+        order_by: Optional[List[Variable]] = None,
+        desc: bool = False,
+    ) -> List[Note]:
+        unknown = referenced_variables(conditions) - CHAIN_FIELDS
+        unknown |= {v.name for v in order_by or []} - CHAIN_FIELDS
+        if unknown:
+            raise ValueError(f"fields {sorted(unknown)} are not stored in delta notes")
+        notes = await self.client.lists(conditions, limit, offset, order_by, desc)
+        return await self._materialize_all(notes)
+
+    async def lists_all(self, conditions: ConditionType) -> List[Note]:
+        return await self.lists(conditions)
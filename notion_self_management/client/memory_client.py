@@ -0,0 +1,69 @@
+from dataclasses import replace
+from typing import Dict, List, Optional
+
+from notion_self_management.client.client import Client, T
+from notion_self_management.expression.bool_expression import ConditionType
+from notion_self_management.expression.compiler import compile_condition
+from notion_self_management.expression.variable import Variable
+
+
+class MemoryClient(Client[T]):
+
+    def __init__(self, id_field: str = "task_id") -> None:
+        """
+        a `Client` keeps everything in a dict, it's useful
+        for testing or a note store which doesn't need to
+        be persisted.
+
+        conditions are evaluated against every item.
+
+        :param id_field: the field which holds item's id,
+                         `version` for `Note`.
+        """
+        self.id_field = id_field
+        self.items: Dict[str, T] = {}
+
+    def _id(self, t: T) -> str:
+        return getattr(t, self.id_field)
+
+    async def create(self, t: T) -> T:
+        self.items[self._id(t)] = replace(t)
+        return t
+
+    async def delete(self, t: T) -> Optional[T]:
+        return self.items.pop(self._id(t), None)
+
+    async def hard_delete(self, t: T):
+        return await self.delete(t)
+
+    async def update(self, t: T) -> Optional[T]:
+        if self._id(t) not in self.items:
+            return None
+        self.items[self._id(t)] = replace(t)
+        return t
+
+    async def get(self, t_id: str) -> Optional[T]:
+        t = self.items.get(t_id)
+        return t and replace(t)
+
+    async def lists(
+        self,
+        conditions: ConditionType,
+        limit: Optional[int] = None,
+        offset: Optional[int] = None,
+        order_by: Optional[List[Variable]] = None,
+        desc: bool = False,
+    ) -> List[T]:
+        if conditions is None:
+            items = list(self.items.values())
+        else:
+            matches = compile_condition(conditions)
+            items = [t for t in self.items.values() if matches(vars(t))]
+        if order_by:
+            items.sort(key=lambda t: tuple(getattr(t, v.name) for v in order_by), reverse=desc)
+        offset = offset or 0
+        end = None if limit is None else offset + limit
+        return [replace(t) for t in items[offset:end]]
+
+    async def lists_all(self, conditions: ConditionType) -> List[T]:
+        return await self.lists(conditions)
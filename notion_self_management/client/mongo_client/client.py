@@ -0,0 +1,129 @@
+import logging
+from dataclasses import asdict
+from typing import Any, Dict, List, Optional, Type
+
+from motor.motor_asyncio import AsyncIOMotorClient, AsyncIOMotorCollection
+from notion_self_management.client.client import BatchResult, Client, T
+from notion_self_management.client.mongo_client.query import compile_query
+from notion_self_management.expression.bool_expression import ConditionType
+from notion_self_management.expression.variable import Variable
+from notion_self_management.task_manager.note import Note
+from pymongo import ASCENDING, DESCENDING
+from pymongo.errors import BulkWriteError
+
+logger = logging.getLogger("MongoClient")
+
+
+class MongoClient(Client[T]):
+
+    def __init__(
+        self,
+        collection: AsyncIOMotorCollection,
+        model: Type[T] = Note,
+        id_field: str = "version",
+    ) -> None:
+        """
+        use a MongoDB collection as datasource, it's suitable
+        for notes which are written much more than tasks.
+
+        ```python
+        notes = await MongoClient.from_url("mongodb://localhost:27017", "notion")
+        manager = TaskManager(notion, notes)
+        ```
+
+        awaiting the client creates indexes for `TaskManager`'s
+        queries, they are `(task_id, note_time)` and `previous`.
+
+        :param collection: motor's collection.
+        :param model: dataclass of documents.
+        :param id_field: the field which is stored as `_id`.
+        """
+        self.collection = collection
+        self.model = model
+        self.id_field = id_field
+
+    @classmethod
+    def from_url(cls, url: str, database: str, collection: str = "notes", **kwargs) -> "MongoClient":
+        return cls(AsyncIOMotorClient(url)[database][collection], **kwargs)
+
+    async def create_indexes(self):
+        logger.debug(f"creating indexes of {self.collection.name}")
+        await self.collection.create_index([("task_id", ASCENDING), ("note_time", DESCENDING)])
+        await self.collection.create_index([("previous", ASCENDING)])
+
+    async def _init(self) -> "MongoClient[T]":
+        await self.create_indexes()
+        return self
+
+    def __await__(self):
+        return self._init().__await__()
+
+    def _to_doc(self, t: T) -> Dict[str, Any]:
+        doc = asdict(t)
+        doc["_id"] = doc[self.id_field]
+        return doc
+
+    def _from_doc(self, doc: Optional[Dict[str, Any]]) -> Optional[T]:
+        if doc is None:
+            return None
+        doc.pop("_id", None)
+        return self.model(**doc)
+
+    async def create(self, t: T) -> T:
+        await self.collection.insert_one(self._to_doc(t))
+        return t
+
+    async def delete(self, t: T) -> Optional[T]:
+        return self._from_doc(await self.collection.find_one_and_delete({"_id": getattr(t, self.id_field)}))
+
+    async def hard_delete(self, t: T):
+        return await self.delete(t)
+
+    async def update(self, t: T) -> Optional[T]:
+        doc = self._to_doc(t)
+        res = await self.collection.replace_one({"_id": doc["_id"]}, doc)
+        return t if res.matched_count else None
+
+    async def create_many(self, ts: List[T]) -> List[BatchResult[T]]:
+        if not ts:
+            return []
+        errors = {}  # type: Dict[int, Exception]
+        try:
+            await self.collection.insert_many([self._to_doc(t) for t in ts], ordered=False)
+        except BulkWriteError as ex:
+            for err in ex.details.get("writeErrors", []):
+                errors[err["index"]] = ex
+        return [BatchResult(t, error=errors[i]) if i in errors else BatchResult(t, result=t) for i, t in enumerate(ts)]
+
+    async def delete_many(self, ts: List[T]) -> List[BatchResult[T]]:
+        if not ts:
+            return []
+        query = {"_id": {"$in": [getattr(t, self.id_field) for t in ts]}}
+        existing = {doc["_id"] async for doc in self.collection.find(query, {"_id": 1})}
+        await self.collection.delete_many(query)
+        return [BatchResult(t, result=t if getattr(t, self.id_field) in existing else None) for t in ts]
+
+    async def get(self, t_id: str) -> Optional[T]:
+        return self._from_doc(await self.collection.find_one({"_id": t_id}))
+
+    async def lists(
+        self,
+        conditions: ConditionType,
+        limit: Optional[int] = None,
+        offset: Optional[int] = None,
+        order_by: Optional[List[Variable]] = None,
+        desc: bool = False,
+    ) -> List[T]:
+        if limit == 0:
+            return []
+        cursor = self.collection.find(compile_query(conditions))
+        if order_by:
+            cursor = cursor.sort([(v.name, DESCENDING if desc else ASCENDING) for v in order_by])
+        if offset:
+            cursor = cursor.skip(offset)
+        if limit is not None:
+            cursor = cursor.limit(limit)
+        return [self._from_doc(doc) async for doc in cursor]
+
+    async def lists_all(self, conditions: ConditionType) -> List[T]:
+        return await self.lists(conditions)
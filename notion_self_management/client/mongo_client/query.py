@@ -0,0 +1,59 @@
+from typing import Any, Dict, Optional
+
+from notion_self_management.expression.base_variable import BaseVariable
+from notion_self_management.expression.bool_expression import Condition, ConditionList, ConditionType
+from notion_self_management.expression.const import false, true
+from notion_self_management.expression.ops import BoolOperator, BoolOperatorMirror, LogicalOperator
+
+_OPS = {
+    BoolOperator.eq: "$eq",
+    BoolOperator.ne: "$ne",
+    BoolOperator.lt: "$lt",
+    BoolOperator.le: "$lte",
+    BoolOperator.gt: "$gt",
+    BoolOperator.ge: "$gte",
+}
+
+# a query matches no document
+NOTHING = {"$expr": {"$eq": [0, 1]}}
+
+Query = Dict[str, Any]
+
+
+def _condition_query(c: Condition) -> Query:
+    left, right, op = c.left, c.right, c.op
+    if isinstance(right, BaseVariable) and not isinstance(left, BaseVariable):
+        left, right, op = right, left, BoolOperatorMirror[op]
+
+    if not isinstance(left, BaseVariable):  # two values
+        return {} if op.value(left, right) else NOTHING
+    if isinstance(right, BaseVariable):  # two fields
+        return {"$expr": {_OPS[op]: [f"${left.name}", f"${right.name}"]}}
+    return {left.name: {_OPS[op]: right}}
+
+
+def compile_query(conditions: Optional[ConditionType]) -> Query:
+    """
+    compile a bool expression into a MongoDB query document.
+
+    ```python
+    compile_query((Note.task_id == "t1") & (Note.note_time > now))
+    # {"$and": [{"task_id": {"$eq": "t1"}}, {"note_time": {"$gt": now}}]}
+    ```
+
+    Variable's name is used as the field name.
+    """
+    if conditions is None or conditions is true or isinstance(conditions, true):
+        return {}
+    if conditions is false or isinstance(conditions, false):
+        return NOTHING
+    if isinstance(conditions, Condition):
+        return _condition_query(conditions)
+    if isinstance(conditions, ConditionList):
+        if not conditions.clauses:  # MongoDB refuses empty `$and` and `$or`
+            matches = (conditions.op == LogicalOperator.and_) != conditions._inv
+            return {} if matches else NOTHING
+        key = "$and" if conditions.op == LogicalOperator.and_ else "$or"
+        query = {key: [compile_query(c) for c in conditions.clauses]}
+        return {"$nor": [query]} if conditions._inv else query
+    raise TypeError(f"{type(conditions)} can't be compiled into a query")
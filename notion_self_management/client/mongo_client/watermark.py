@@ -0,0 +1,21 @@
+from typing import Any, Dict, Optional
+
+from motor.motor_asyncio import AsyncIOMotorCollection
+from notion_self_management.client.watermark import WatermarkStore
+
+
+class MongoWatermarkStore(WatermarkStore):
+
+    def __init__(self, collection: AsyncIOMotorCollection) -> None:
+        """
+        keep watermarks in a MongoDB collection, one document
+        per key, which is shared by workers of the same database.
+        """
+        self.collection = collection
+
+    async def load(self, key: str) -> Optional[Dict[str, Any]]:
+        doc = await self.collection.find_one({"_id": key})
+        return doc and doc["value"]
+
+    async def save(self, key: str, value: Dict[str, Any]):
+        await self.collection.replace_one({"_id": key}, {"_id": key, "value": value}, upsert=True)
@@ -1,2 +1,6 @@
 
 RETRIEVE_DATABASE = "v1/databases/{database_id}"
+QUERY_DATABASE = "v1/databases/{database_id}/query"
+RETRIEVE_PAGE = "v1/pages/{page_id}"
+CREATE_PAGE = "v1/pages"
+UPDATE_PAGE = "v1/pages/{page_id}"
@@ -1,39 +1,106 @@
+import asyncio
 import logging
-import os
 import time
+from dataclasses import fields
+from datetime import datetime
 from functools import cached_property
-from typing import Dict, Tuple
+from typing import Any, AsyncIterator, Dict, Hashable, List, Optional, Tuple, Type
 from urllib import parse
 
 import httpx
-from notion_self_management.client.client import Client
+from notion_self_management.client.client import BatchResult, Client, T
 from notion_self_management.client.notion_client import apis
 from notion_self_management.client.notion_client import exceptions as e
 from notion_self_management.client.notion_client.datatypes.database import DataBase
+from notion_self_management.client.notion_client.datatypes.decoder import get_decoder
+from notion_self_management.client.notion_client.datatypes.page import Page, property_payload, property_value
+from notion_self_management.client.notion_client.filter import compile_filter
+from notion_self_management.client.notion_client.rate_limit import RateLimiter, get_rate_limiter
+from notion_self_management.client.notion_client.transport import get_transport
+from notion_self_management.expression.bool_expression import ConditionType
+from notion_self_management.expression.compiler import MAX_CACHED, Compiled, compile_condition
+from notion_self_management.expression.expression import fingerprint
+from notion_self_management.expression.variable import Variable
 
 logger = logging.getLogger("NotionClient")
 
+# model fields which are filled by page's metadata
+# instead of page's properties
+META_FIELDS = {
+    "create_time": "created_time",
+    "update_time": "last_edited_time",
+    "create_by": "created_by",
+    "update_by": "last_edited_by",
+}
+META_TIMESTAMPS = {k: v for k, v in META_FIELDS.items() if v.endswith("_time")}
+
+# Notion's maximum page size of a query
+MAX_PAGE_SIZE = 100
+
+
+def _parse_datetime(value: Any) -> Any:
+    """Notion's ISO 8601 str to datetime, `Z` is not supported before python3.11"""
+    if isinstance(value, str):
+        return datetime.fromisoformat(value.replace("Z", "+00:00"))
+    return value
+
 
 class AsyncClient(httpx.AsyncClient):
     """
-    a simple proxy to check if reach Notion's
+    a simple proxy to keep requests under Notion's
     API rate limits and log verbose to request
-    if needed
+    if needed.
+
+    429 and 5xx responses are retried with the
+    limiter's backoff, `RateLimitException` is
+    raised if Notion still responds 429 after
+    all retries.
+
+    a 5xx response may come after the request took
+    effect, requests which are not idempotent, such
+    as creating a page, pass `retry_5xx=False` so
+    they are not sent twice. 429 is always retried.
     """
 
-    async def request(self, *args, **kwargs):
-        s = time.time()
-        logger.debug(f"sending request to Notion API args is {args}, kwargs is {kwargs}")
-        res = await super().request(*args, **kwargs)
-        logger.debug(f"receive notion's response content is {res.content},"
-                     f" status is {res.status_code}, "
-                     f"spend {time.time() - s} seconds")
-        if res.status_code == 429:
-            raise e.RateLimitException
-        return res
+    def __init__(self, *args, rate_limiter: Optional[RateLimiter] = None, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.rate_limiter = rate_limiter or RateLimiter()
+
+    async def request(self, *args, retry_5xx: bool = True, **kwargs):
+        limiter = self.rate_limiter
+        attempt = 0
+        while True:
+            await limiter.acquire()
+            s = time.time()
+            logger.debug(f"sending request to Notion API args is {args}, kwargs is {kwargs}")
+            res = await super().request(*args, **kwargs)
+            logger.debug(f"receive notion's response content is {res.content},"
+                         f" status is {res.status_code}, "
+                         f"spend {time.time() - s} seconds")
+
+            if res.status_code != 429 and res.status_code < 500:
+                limiter.succeeded()
+                return res
 
+            if res.status_code == 429:
+                limiter.stats.throttled += 1
+            elif not retry_5xx:
+                return res
+            if attempt >= limiter.max_retries:
+                if res.status_code == 429:
+                    raise e.RateLimitException
+                return res
 
-class Notion(Client):
+            delay = limiter.backoff(attempt, res)
+            limiter.stats.retried += 1
+            attempt += 1
+            if res.status_code == 429:
+                limiter.slow_down(delay)  # next `acquire` will wait
+            else:
+                await limiter.sleep(delay)
+
+
+class Notion(Client[T]):
 
     @cached_property
     def notion_header(self) -> Dict[str, str]:
@@ -58,8 +125,7 @@ class Notion(Client):
 
         if res.status_code == 404:
             raise e.NoSuchDataBase()
-        if res.status_code == 401:
-            raise e.UnauthorizedException()
+        self._check_response(res)
 
         db = DataBase.from_dict(res.json())  # DB should not change until fresh
 
@@ -67,6 +133,7 @@ class Notion(Client):
             raise e.ArchivedObjectException()
 
         self.db = db
+        self._filters.clear()  # compiled with the old schema
 
     def __init__(
         self,
@@ -74,6 +141,11 @@ class Notion(Client):
         database_id: str,
         base_url: str = "https://api.notion.com",
         notion_version: str = "2022-02-22",
+        model: Optional[Type[T]] = None,
+        id_field: str = "task_id",
+        limits: Optional[httpx.Limits] = None,
+        http2: Optional[bool] = None,
+        batch_concurrency: int = 3,
     ) -> None:
         """
         use Notion's database as datasource
@@ -93,16 +165,256 @@ class Notion(Client):
                         mirror(or CDN) of Notion API if you 
                         reach Notion's API limits frequently
                         https://developers.notion.com/reference/request-limits
+        :param model: a dataclass which rows will be decoded into, fields
+                      are matched by property name. `None` means rows
+                      are returned as `Page`.
+        :param id_field: the field of `model` which holds page's id.
+        :param limits: connection pool limits of `base_url`, all clients
+                       of the same `base_url` share one pool.
+        :param http2: use HTTP/2, `None` means use it if `h2` is installed.
+        :param batch_concurrency: requests in flight of a batch operation,
+                                  requests are still throttled by the rate
+                                  limiter.
         """
         self.base_url = base_url
         self.api_token = api_token
         self.database_id = database_id
         self.notion_version = notion_version
-        self.client = AsyncClient(headers=self.notion_header)
+        self.model = model
+        self.id_field = id_field
+        self.batch_concurrency = batch_concurrency
+        self._model_fields = frozenset(f.name for f in fields(model)) if model else frozenset()
+        self.client = AsyncClient(
+            headers=self.notion_header,
+            rate_limiter=get_rate_limiter(api_token),
+            transport=get_transport(base_url, limits, http2),
+        )
         self.db = None
+        self._filters: Dict[Hashable, Tuple[Optional[Dict[str, Any]], Optional[Compiled]]] = {}
 
     def __await__(self):
         return self.retrieve_database_schema().__await__()
 
-    def get(self, Id: str):
-        ...
+    @staticmethod
+    def _check_response(res: httpx.Response):
+        if res.status_code == 401:
+            raise e.UnauthorizedException()
+        if res.status_code >= 400:
+            logger.error(f"unexpected response from Notion, status is {res.status_code}, content is {res.content}")
+            raise e.UnexpectedResponseException()
+
+    def _row_values(self, raw: Dict[str, Any]) -> Dict[str, Any]:
+        """flatten a page object into a dict keyed by property name"""
+        values = {name: property_value(prop) for name, prop in raw.get("properties", {}).items()}
+        for field, key in META_FIELDS.items():
+            value = raw.get(key)
+            values[field] = value.get("id") if isinstance(value, dict) else value
+        values[self.id_field] = raw["id"]
+        return values
+
+    def _to_model(self, raw: Dict[str, Any]) -> Any:
+        if self.model is None:
+            return Page.from_dict(raw)
+
+        values = self._row_values(raw)
+        data = {name: values.pop(name, None) for name in self._model_fields}
+        if "extras_field" in self._model_fields:
+            data["extras_field"] = values
+        return get_decoder(self.model, type_hooks={datetime: _parse_datetime}, check_types=False)(data)
+
+    def _build_sorts(self, order_by: Optional[List[Variable]], desc: bool) -> List[Dict[str, str]]:
+        direction = "descending" if desc else "ascending"
+        sorts = []
+        for v in order_by or []:
+            if v.name in META_TIMESTAMPS:
+                sorts.append({"timestamp": META_TIMESTAMPS[v.name], "direction": direction})
+            else:
+                sorts.append({"property": v.name, "direction": direction})
+        return sorts
+
+    def _compile_filter(
+        self,
+        conditions: Optional[ConditionType],
+    ) -> Tuple[Optional[Dict[str, Any]], Optional[Compiled]]:
+        """Notion's filter and the local matcher of conditions, cached by the conditions' fingerprint"""
+        try:
+            key = fingerprint(conditions)
+        except TypeError:
+            key = None
+        if key is not None and key in self._filters:
+            return self._filters[key]
+
+        query_filter, residual = compile_filter(conditions, self.db.properties if self.db else {}, META_TIMESTAMPS)
+        compiled = query_filter, (compile_condition(residual) if residual is not None else None)
+        if key is not None:
+            if len(self._filters) >= MAX_CACHED:
+                del self._filters[next(iter(self._filters))]
+            self._filters[key] = compiled
+        return compiled
+
+    async def iter_rows(
+        self,
+        conditions: Optional[ConditionType] = None,
+        order_by: Optional[List[Variable]] = None,
+        desc: bool = False,
+        page_size: int = MAX_PAGE_SIZE,
+    ) -> AsyncIterator[T]:
+        """
+        stream rows of the database.
+
+        rows are queried page by page following Notion's `next_cursor`,
+        and yielded as soon as a page arrives. Only one page of results
+        is held in memory at a time.
+
+        conditions are compiled into Notion's filter with the schema
+        from `retrieve_database_schema`, what Notion can't express is
+        evaluated locally.
+
+        ```python
+        async for task in notion.iter_rows(Task.status == "done"):
+            ...
+        ```
+
+        :param conditions: rows which don't satisfy conditions are skipped.
+        :param order_by: variables to sort by.
+        :param desc: sort in descending order.
+        :param page_size: rows of each request, at most 100.
+        """
+        url = parse.urljoin(self.base_url, apis.QUERY_DATABASE.format(database_id=self.database_id))
+        body: Dict[str, Any] = {"page_size": min(page_size, MAX_PAGE_SIZE)}
+        query_filter, matches = self._compile_filter(conditions)
+        if query_filter:
+            body["filter"] = query_filter
+        sorts = self._build_sorts(order_by, desc)
+        if sorts:
+            body["sorts"] = sorts
+
+        while True:
+            res = await self.client.post(url, json=body, headers=self.notion_header)
+            self._check_response(res)
+            content = res.json()
+
+            for raw in content["results"]:
+                row = self._to_model(raw)
+                if matches:
+                    values = vars(row) if self.model else self._row_values(raw)
+                    if not matches(values):
+                        continue
+                yield row
+
+            if not content.get("has_more"):
+                break
+            body["start_cursor"] = content["next_cursor"]
+
+    async def get(self, t_id: str) -> Optional[T]:
+        res = await self.client.get(
+            parse.urljoin(self.base_url, apis.RETRIEVE_PAGE.format(page_id=t_id)),
+            headers=self.notion_header,
+        )
+        if res.status_code == 404:
+            return None
+        self._check_response(res)
+        return self._to_model(res.json())
+
+    async def lists(
+        self,
+        conditions: ConditionType,
+        limit: Optional[int] = None,
+        offset: Optional[int] = None,
+        order_by: Optional[List[Variable]] = None,
+        desc: bool = False,
+    ) -> List[T]:
+        rows: List[T] = []
+        if limit == 0:
+            return rows
+        offset = offset or 0
+        # rows filtered locally don't count, a smaller page only saves
+        # transfer if Notion applies the whole filter
+        _, matches = self._compile_filter(conditions)
+        page_size = MAX_PAGE_SIZE if limit is None or matches else offset + limit
+        it = self.iter_rows(conditions, order_by, desc, page_size=page_size)
+        try:
+            async for row in it:
+                if offset:
+                    offset -= 1
+                    continue
+                rows.append(row)
+                if limit is not None and len(rows) >= limit:
+                    break
+        finally:
+            await it.aclose()
+        return rows
+
+    async def lists_all(self, conditions: ConditionType) -> List[T]:
+        return [row async for row in self.iter_rows(conditions)]
+
+    def _page_id(self, t: T) -> str:
+        return t.id if isinstance(t, Page) else getattr(t, self.id_field)
+
+    async def _properties(self, t: T) -> Dict[str, Any]:
+        """encode a model into page's properties by the database schema"""
+        if isinstance(t, Page):
+            return t.properties
+        if self.db is None:
+            await self.retrieve_database_schema()
+
+        values = dict(vars(t))
+        values.update(values.pop("extras_field", None) or {})
+        properties = {}
+        for name, prop in self.db.properties.items():
+            if name in values and name != self.id_field and name not in META_FIELDS:
+                payload = property_payload(prop.type, values[name])
+                if payload is not None:
+                    properties[name] = payload
+        return properties
+
+    async def _patch_page(self, t: T, body: Dict[str, Any]) -> Optional[T]:
+        res = await self.client.patch(
+            parse.urljoin(self.base_url, apis.UPDATE_PAGE.format(page_id=self._page_id(t))),
+            json=body,
+            headers=self.notion_header,
+        )
+        if res.status_code == 404:
+            return None
+        self._check_response(res)
+        return self._to_model(res.json())
+
+    async def create(self, t: T) -> T:
+        res = await self.client.request(
+            "POST",
+            parse.urljoin(self.base_url, apis.CREATE_PAGE),
+            json={"parent": {"database_id": self.database_id}, "properties": await self._properties(t)},
+            headers=self.notion_header,
+            retry_5xx=False,  # the page may have been created
+        )
+        self._check_response(res)
+        return self._to_model(res.json())
+
+    async def update(self, t: T) -> Optional[T]:
+        return await self._patch_page(t, {"properties": await self._properties(t)})
+
+    async def delete(self, t: T) -> Optional[T]:
+        """pages are archived, which can be restored in Notion's trash"""
+        return await self._patch_page(t, {"archived": True})
+
+    async def hard_delete(self, t: T):
+        # Notion's API can't delete a page permanently
+        return await self.delete(t)
+
+    async def _fan_out(self, method, ts: List[T]) -> List[BatchResult[T]]:
+        semaphore = asyncio.Semaphore(self.batch_concurrency)
+
+        async def one(t: T) -> BatchResult[T]:
+            async with semaphore:
+                return await self._batch_one(method, t)
+
+        return list(await asyncio.gather(*(one(t) for t in ts)))
+
+    async def create_many(self, ts: List[T]) -> List[BatchResult[T]]:
+        return await self._fan_out(self.create, ts)
+
+    async def delete_many(self, ts: List[T]) -> List[BatchResult[T]]:
+        return await self._fan_out(self.delete, ts)
+
+    async def update_many(self, ts: List[T]) -> List[BatchResult[T]]:
+        return await self._fan_out(self.update, ts)
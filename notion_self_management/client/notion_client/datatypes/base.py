@@ -1,15 +1,14 @@
 from dataclasses import dataclass
-from enum import Enum
 
-from dacite.config import Config
-from dacite.core import from_dict
+from notion_self_management.client.notion_client.datatypes.decoder import get_decoder
 
 
 class Base:
 
     @classmethod
     def from_dict(cls, data: dict):
-        return from_dict(cls, data, config=Config(cast=[Enum]))
+        """same as `dacite.from_dict(cls, data, Config(cast=[Enum]))`, but compiled once"""
+        return get_decoder(cls)(data)
 
 
 @dataclass
@@ -0,0 +1,220 @@
+from collections.abc import Mapping
+from dataclasses import MISSING, fields, is_dataclass
+from enum import Enum
+from typing import Any, Callable, Dict, FrozenSet, Optional, Tuple, Union, get_args, get_origin, get_type_hints
+
+from dacite.exceptions import MissingValueError, UnionMatchError, WrongTypeError
+
+Decoder = Callable[[Any], Any]
+TypeHooks = Dict[Any, Callable[[Any], Any]]
+
+_NoneType = type(None)
+_cache: Dict[Tuple[Any, bool, Tuple], Decoder] = {}
+
+
+def _is_instance(value: Any, type_: Any) -> bool:
+    """a shallow type check, values built by decoders already have the right inner types"""
+    if type_ is Any:
+        return True
+    origin = get_origin(type_)
+    if origin is Union:
+        return any(_is_instance(value, t) for t in get_args(type_))
+    return isinstance(value, origin or type_)
+
+
+class _Compiler:
+
+    def __init__(self, type_hooks: TypeHooks, check_types: bool) -> None:
+        self.type_hooks = type_hooks
+        self.check_types = check_types
+        self.decoders: Dict[Any, Decoder] = {}
+
+    def build(self, type_: Any) -> Decoder:
+        if type_ not in self.decoders:
+            # a placeholder for recursive types, replaced once compiled
+            compiled = []
+            self.decoders[type_] = lambda data: compiled[0](data)
+            decoder = self._build(type_)
+            hook = self.type_hooks.get(type_)
+            if hook is not None:
+                inner = decoder
+                decoder = lambda data: inner(hook(data))  # noqa: E731
+            compiled.append(decoder)
+            self.decoders[type_] = decoder
+        return self.decoders[type_]
+
+    def _build(self, type_: Any) -> Decoder:
+        origin = get_origin(type_)
+        if origin is Union:
+            return self._union(type_)
+        if origin in (list, set, frozenset, tuple):
+            return self._collection(type_, origin)
+        if origin is dict:
+            return self._dict(type_)
+        if is_dataclass(type_):
+            return self._dataclass(type_)
+        if isinstance(type_, type) and issubclass(type_, Enum):
+            return type_  # Config(cast=[Enum])
+        return self._leaf(type_)
+
+    def _leaf(self, type_: Any) -> Decoder:
+        if type_ is Any or not self.check_types:
+            return lambda data: data
+
+        def decode(data):
+            if not isinstance(data, type_):
+                raise WrongTypeError(field_type=type_, value=data)
+            return data
+
+        return decode
+
+    def _collection(self, type_: Any, origin: type) -> Decoder:
+        args = get_args(type_)
+        if origin is tuple and not (len(args) == 2 and args[1] is Ellipsis):
+            item_decoders = [self.build(a) for a in args]
+
+            def decode_tuple(data):
+                if not isinstance(data, (list, tuple)):
+                    return self._mismatch(type_, data)
+                return tuple(d(v) for d, v in zip(item_decoders, data))
+
+            return decode_tuple
+
+        item = self.build(args[0]) if args else (lambda data: data)
+
+        def decode(data):
+            if not isinstance(data, (list, tuple, set, frozenset)):
+                return self._mismatch(type_, data)
+            return origin(item(v) for v in data)
+
+        return decode
+
+    def _dict(self, type_: Any) -> Decoder:
+        args = get_args(type_)
+        value = self.build(args[1]) if args else (lambda data: data)
+
+        def decode(data):
+            if not isinstance(data, Mapping):
+                return self._mismatch(type_, data)
+            return {k: value(v) for k, v in data.items()}
+
+        return decode
+
+    def _mismatch(self, type_: Any, data: Any) -> Any:
+        if self.check_types:
+            raise WrongTypeError(field_type=type_, value=data)
+        return data
+
+    def _dataclass(self, cls: type) -> Decoder:
+        hints = get_type_hints(cls)
+        specs = []
+        required = set()
+        for f in fields(cls):
+            if not f.init:
+                continue
+            t = hints[f.name]
+            if f.default is not MISSING:
+                default = lambda d=f.default: d  # noqa: E731
+            elif f.default_factory is not MISSING:  # type: ignore
+                default = f.default_factory  # type: ignore
+            elif get_origin(t) is Union and _NoneType in get_args(t):
+                default = lambda: None  # noqa: E731
+            else:
+                default = None
+                required.add(f.name)
+            specs.append((f.name, self.build(t), default))
+
+        def decode(data):
+            if not isinstance(data, Mapping):
+                raise WrongTypeError(field_type=cls, value=data)
+            kwargs = {}
+            for name, field_decoder, default in specs:
+                if name in data:
+                    kwargs[name] = field_decoder(data[name])
+                elif default is not None:
+                    kwargs[name] = default()
+                else:
+                    raise MissingValueError(name)
+            return cls(**kwargs)
+
+        decode.required = frozenset(required)  # type: ignore
+        decode.fields = frozenset(name for name, _, _ in specs)  # type: ignore
+        return decode
+
+    def _union(self, type_: Any) -> Decoder:
+        args = get_args(type_)
+        nullable = _NoneType in args
+        members = [(t, self.build(t)) for t in args if t is not _NoneType]
+
+        if nullable and len(members) == 1:
+            inner = members[0][1]
+            return lambda data: None if data is None else inner(data)
+
+        # Notion objects put their payload under the key named by `type`,
+        # e.g. `{"type": "title", "title": ...}`, so `type` picks members
+        # having that field directly.
+        members_of_type: Dict[str, list] = {}
+        for t, d in members:
+            for name in getattr(d, "fields", ()):
+                members_of_type.setdefault(name, []).append((t, d))
+
+        # otherwise members whose required fields are missing can't match,
+        # they are filtered out by the keys of data.
+        candidates_of: Dict[Optional[FrozenSet[str]], list] = {}
+
+        def candidates(data):
+            keys = frozenset(data) if isinstance(data, Mapping) else None
+            if keys not in candidates_of:
+                candidates_of[keys] = [(t, d) for t, d in members
+                                       if keys is None or getattr(d, "required", frozenset()) <= keys]
+            return candidates_of[keys]
+
+        def match(data, candidates):
+            for t, member in candidates:
+                try:
+                    value = member(data)
+                except Exception:
+                    continue
+                if _is_instance(value, t):
+                    return True, value
+            return False, None
+
+        def decode(data):
+            if data is None and nullable:
+                return None
+            if isinstance(data, Mapping) and isinstance(data.get("type"), str):
+                typed = members_of_type.get(data["type"])
+                if typed:
+                    matched, value = match(data, typed)
+                    if matched:
+                        return value
+            matched, value = match(data, candidates(data))
+            if matched:
+                return value
+            if not self.check_types:
+                return data
+            raise UnionMatchError(field_type=type_, value=data)
+
+        return decode
+
+
+def get_decoder(type_: Any, type_hooks: Optional[TypeHooks] = None, check_types: bool = True) -> Decoder:
+    """
+    get a decoder which converts a dict into `type_`.
+
+    the result is the same as `dacite.from_dict(type_, data, Config(cast=[Enum]))`
+    but types are inspected only once, the decoder of every dataclass, union
+    and collection is compiled into a closure and cached.
+
+    Union members are dispatched on the `type` of data first, members
+    having a field named by it are tried. Otherwise members are tried in
+    order like dacite, members missing required keys are skipped.
+
+    :param type_: usually a dataclass.
+    :param type_hooks: converters applied to data of the type before decoding.
+    :param check_types: raise if a value doesn't match its type.
+    """
+    key = (type_, check_types, tuple((type_hooks or {}).items()))
+    if key not in _cache:
+        _cache[key] = _Compiler(type_hooks or {}, check_types).build(type_)
+    return _cache[key]
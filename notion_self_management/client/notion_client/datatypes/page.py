@@ -1,9 +1,82 @@
 from dataclasses import dataclass
+from datetime import date, datetime
+from typing import Any, Dict, List, Optional
 
 from notion_self_management.client.notion_client.datatypes.base import NotionObject
+from notion_self_management.client.notion_client.datatypes.properties import PropertyType
 
 
 @dataclass
 class Page(NotionObject):
-    ...
+    """https://developers.notion.com/reference/page"""
     # type: str  # always be Page
+    parent: Dict[str, Any]
+    url: str
+    properties: Dict[str, Any]
+
+
+def property_value(prop: Dict[str, Any]) -> Any:
+    """
+    flatten a page property value object into
+    a plain python value.
+
+    https://developers.notion.com/reference/property-value-object
+
+    ```python
+    property_value({"type": "checkbox", "checkbox": True})  # True
+    property_value({"type": "select", "select": {"name": "done"}})  # "done"
+    ```
+    """
+    type_ = prop.get("type")
+    value = prop.get(type_)
+
+    if type_ in ("title", "rich_text"):
+        return "".join(t.get("plain_text", "") for t in value or [])
+    if type_ in ("select", "status"):
+        return value and value.get("name")
+    if type_ == "multi_select":
+        return [o.get("name") for o in value or []]
+    if type_ == "date":
+        return value and value.get("start")
+    if type_ in ("people", "relation"):
+        return [p.get("id") for p in value or []]
+    if type_ == "files":
+        return [f.get("name") for f in value or []]
+    if type_ in ("created_by", "last_edited_by"):
+        return value and value.get("id")
+    if type_ in ("formula", "rollup"):
+        return value and value.get(value.get("type"))
+    # number, checkbox, url, email, phone_number, created_time, last_edited_time
+    return value
+
+
+def _rich_text(value: Any) -> List[Dict[str, Any]]:
+    return [{"type": "text", "text": {"content": str(value)}}] if value is not None else []
+
+
+def _iso(value: Any) -> Any:
+    return value.isoformat() if isinstance(value, (date, datetime)) else value
+
+
+def property_payload(type_: PropertyType, value: Any) -> Optional[Dict[str, Any]]:
+    """
+    the reverse of `property_value`, build a property value object
+    for creating or updating a page.
+
+    `None` is returned for read-only properties such as `formula`
+    or `created_time`.
+    """
+    if type_ in (PropertyType.title, PropertyType.rich_text):
+        return {type_.value: _rich_text(value)}
+    if type_ == PropertyType.select:
+        return {"select": value and {"name": value}}
+    if type_ == PropertyType.multi_select:
+        return {"multi_select": [{"name": v} for v in value or []]}
+    if type_ == PropertyType.date:
+        return {"date": value and {"start": _iso(value)}}
+    if type_ in (PropertyType.people, PropertyType.relation):
+        return {type_.value: [{"id": v} for v in value or []]}
+    if type_ in (PropertyType.number, PropertyType.checkbox, PropertyType.url, PropertyType.email,
+                 PropertyType.phone_number):
+        return {type_.value: value}
+    return None
@@ -23,4 +23,8 @@ class RateLimitException(NotionClientException):
 
 
 class ArchivedObjectException(NotionClientException):
-    msg = "Notion's object has been archived"
\ No newline at end of file
+    msg = "Notion's object has been archived"
+
+
+class UnexpectedResponseException(NotionClientException):
+    msg = "Notion responded with an unexpected status"
@@ -0,0 +1,194 @@
+from datetime import date, datetime
+from typing import Any, Dict, Mapping, Optional, Tuple
+
+from notion_self_management.client.notion_client.datatypes.properties import PropertyType
+from notion_self_management.expression.base_variable import BaseVariable
+from notion_self_management.expression.bool_expression import Condition, ConditionList, ConditionType
+from notion_self_management.expression.const import false, true
+from notion_self_management.expression.ops import BoolOperator, BoolOperatorMirror, BoolOperatorNegate, LogicalOperator
+
+# Notion allows compound filters to be nested up to two levels deep
+# https://developers.notion.com/reference/post-database-query-filter#compound-filter-object
+MAX_DEPTH = 2
+
+_TEXT_OPS = {BoolOperator.eq: "equals", BoolOperator.ne: "does_not_equal"}
+_NUMBER_OPS = {
+    BoolOperator.eq: "equals",
+    BoolOperator.ne: "does_not_equal",
+    BoolOperator.gt: "greater_than",
+    BoolOperator.lt: "less_than",
+    BoolOperator.ge: "greater_than_or_equal_to",
+    BoolOperator.le: "less_than_or_equal_to",
+}
+# date's `equals` only compares the date part, leave it to local evaluation
+_DATE_OPS = {
+    BoolOperator.gt: "after",
+    BoolOperator.lt: "before",
+    BoolOperator.ge: "on_or_after",
+    BoolOperator.le: "on_or_before",
+}
+
+# property type -> (filter key, supported operators, accepted python types)
+_PROPERTY_FILTERS = {
+    PropertyType.title: ("title", _TEXT_OPS, (str, )),
+    PropertyType.rich_text: ("rich_text", _TEXT_OPS, (str, )),
+    PropertyType.url: ("url", _TEXT_OPS, (str, )),
+    PropertyType.email: ("email", _TEXT_OPS, (str, )),
+    PropertyType.phone_number: ("phone_number", _TEXT_OPS, (str, )),
+    PropertyType.select: ("select", _TEXT_OPS, (str, )),
+    PropertyType.number: ("number", _NUMBER_OPS, (int, float)),
+    PropertyType.checkbox: ("checkbox", _TEXT_OPS, (bool, )),
+    PropertyType.date: ("date", _DATE_OPS, (datetime, date)),
+    PropertyType.created_time: ("created_time", _DATE_OPS, (datetime, date)),
+    PropertyType.last_edited_time: ("last_edited_time", _DATE_OPS, (datetime, date)),
+}
+
+Filter = Dict[str, Any]
+
+
+def _is_const(c: Any, const: type) -> bool:
+    """`and_` and `or_` may put a Const class instead of an instance"""
+    return c is const or isinstance(c, const)
+
+
+def _negate(c: ConditionType) -> ConditionType:
+    if _is_const(c, true):
+        return false()
+    if _is_const(c, false):
+        return true()
+    if isinstance(c, Condition):
+        return Condition(BoolOperatorNegate[c.op], c.left, c.right)
+    inv = ConditionList(c.op, c.clauses)
+    inv._inv = not c._inv
+    return inv
+
+
+def _flip(op: LogicalOperator) -> LogicalOperator:
+    return LogicalOperator.or_ if op == LogicalOperator.and_ else LogicalOperator.and_
+
+
+def _encode(value: Any) -> Any:
+    if isinstance(value, (datetime, date)):
+        return value.isoformat()
+    return value
+
+
+def _condition_filter(
+    c: Condition,
+    op: BoolOperator,
+    properties: Mapping[str, Any],
+    timestamps: Mapping[str, str],
+) -> Optional[Filter]:
+    left, right = c.left, c.right
+    if isinstance(right, BaseVariable) and not isinstance(left, BaseVariable):
+        left, right, op = right, left, BoolOperatorMirror[op]
+    if not isinstance(left, BaseVariable) or isinstance(right, BaseVariable):
+        return None  # two variables or two values can't be pushed down
+
+    if left.name in properties:
+        key, ops, types = _PROPERTY_FILTERS.get(properties[left.name].type, (None, {}, ()))
+        target = {"property": left.name}
+    elif left.name in timestamps:
+        key, ops, types = timestamps[left.name], _DATE_OPS, (datetime, date)
+        target = {"timestamp": key}
+    else:
+        return None
+
+    # bool is a subclass of int
+    if op not in ops or not isinstance(right, types) or (isinstance(right, bool) and bool not in types):
+        return None
+    return {**target, key: {ops[op]: _encode(right)}}
+
+
+def _compile(
+    c: ConditionType,
+    negate: bool,
+    depth: int,
+    properties: Mapping[str, Any],
+    timestamps: Mapping[str, str],
+) -> Tuple[Optional[Filter], Optional[ConditionType]]:
+    if _is_const(c, true) or _is_const(c, false):
+        matches_all = _is_const(c, true) != negate
+        return None, (None if matches_all else false())
+
+    if isinstance(c, Condition):
+        op = BoolOperatorNegate[c.op] if negate else c.op
+        f = _condition_filter(c, op, properties, timestamps)
+        if f is None:
+            return None, (_negate(c) if negate else c)
+        return f, None
+
+    if not isinstance(c, ConditionList) or depth >= MAX_DEPTH:
+        return None, (_negate(c) if negate else c)
+
+    inv = negate != c._inv
+    op = c.op
+    if inv:  # De Morgan
+        op = _flip(op)
+    key = "and" if op == LogicalOperator.and_ else "or"
+
+    filters = []
+    residuals = []
+    for clause in c.clauses:
+        # the same compound will be flattened, so it doesn't go deeper
+        same = isinstance(clause, ConditionList) and (_flip(clause.op) if inv != clause._inv else clause.op) == op
+        f, r = _compile(clause, inv, depth if same else depth + 1, properties, timestamps)
+        if f is not None:
+            filters.extend(f[key] if set(f) == {key} else [f])  # flatten the same compound
+        if r is not None:
+            residuals.append(r)
+
+        if op == LogicalOperator.or_ and f is None and r is None:
+            return None, None  # one of `or` clauses is always true
+
+    if op == LogicalOperator.or_ and residuals:
+        # `or` only can be pushed down as a whole
+        return None, (_negate(c) if negate else c)
+
+    if not filters:
+        f = None
+    elif len(filters) == 1:
+        f = filters[0]
+    else:
+        f = {key: filters}
+
+    if not residuals:
+        r = None
+    elif len(residuals) == 1:
+        r = residuals[0]
+    else:
+        r = ConditionList(LogicalOperator.and_, residuals)
+    return f, r
+
+
+def compile_filter(
+    conditions: Optional[ConditionType],
+    properties: Mapping[str, Any],
+    timestamps: Optional[Mapping[str, str]] = None,
+) -> Tuple[Optional[Filter], Optional[ConditionType]]:
+    """
+    compile a bool expression into Notion's query filter.
+
+    https://developers.notion.com/reference/post-database-query-filter
+
+    Variable is matched to a database property by name, and the filter
+    type is picked by the property's type. The parts which Notion can't
+    express are returned as a residual expression which should be
+    evaluated locally.
+
+    ```python
+    f, residual = compile_filter((Task.percent > 50) & (Task.title != Task.content), db.properties)
+    # f: {"property": "percent", "number": {"greater_than": 50}}
+    # residual: Task.title != Task.content
+    ```
+
+    :param conditions: bool expression to compile.
+    :param properties: database's properties, keyed by property name.
+    :param timestamps: variable name to page's timestamp, such as
+                       `{"update_time": "last_edited_time"}`
+    :return: a tuple of filter(`None` means no filter) and residual
+             expression(`None` means nothing to evaluate locally).
+    """
+    if conditions is None:
+        return None, None
+    return _compile(conditions, False, 0, properties, timestamps or {})
@@ -0,0 +1,153 @@
+import asyncio
+import logging
+import random
+import threading
+import time
+from dataclasses import dataclass
+from typing import Awaitable, Callable, Dict, Optional
+from weakref import WeakKeyDictionary
+
+import httpx
+
+logger = logging.getLogger("RateLimiter")
+
+# https://developers.notion.com/reference/request-limits
+NOTION_RATE = 3.0
+
+
+@dataclass
+class RateLimitStats:
+    queued: int = 0  # requests which had to wait for a token
+    retried: int = 0  # requests which were sent again
+    throttled: int = 0  # 429 responses received
+
+
+class RateLimiter:
+
+    def __init__(
+        self,
+        rate: float = NOTION_RATE,
+        burst: int = 3,
+        max_retries: int = 5,
+        backoff_base: float = 0.5,
+        backoff_max: float = 30.0,
+        min_rate: float = 0.5,
+        clock: Callable[[], float] = time.monotonic,
+        sleep: Callable[[float], Awaitable] = asyncio.sleep,
+    ) -> None:
+        """
+        A token bucket which keeps requests under Notion's rate limits.
+
+        the bucket is refilled with `rate` tokens per second and holds
+        `burst` tokens at most. Every request takes one token, requests
+        wait in order when the bucket is empty.
+
+        when Notion still responds 429, the limiter pauses every request
+        sharing it for `Retry-After` seconds and halves the rate, the rate
+        recovers little by little on successful responses.
+
+        a limiter can be shared by clients of different event loops, such
+        as `asyncio.run` per job, they share the bucket and requests wait
+        in order within each loop.
+
+        :param rate: average requests per second.
+        :param burst: maximum requests which can be sent at once.
+        :param max_retries: retry times of a 429 or 5xx response.
+        :param backoff_base: first backoff delay in seconds, doubled
+                             every retry and jittered.
+        :param backoff_max: upper bound of a backoff delay.
+        :param min_rate: the rate will not be lowered below this.
+        :param clock: monotonic clock, injectable for testing.
+        :param sleep: async sleep, injectable for testing.
+        """
+        self.max_rate = rate
+        self.rate = rate
+        self.min_rate = min(min_rate, rate)
+        self.burst = burst
+        self.max_retries = max_retries
+        self.backoff_base = backoff_base
+        self.backoff_max = backoff_max
+        self.clock = clock
+        self.sleep = sleep
+        self.stats = RateLimitStats()
+
+        self._tokens = float(burst)
+        self._updated = clock()
+        self._paused_until = 0.0
+        self._bucket = threading.Lock()  # loops may run in different threads
+        self._locks: WeakKeyDictionary[asyncio.AbstractEventLoop, asyncio.Lock] = WeakKeyDictionary()
+
+    def _refill(self, now: float):
+        self._tokens = min(self.burst, self._tokens + (now - self._updated) * self.rate)
+        self._updated = now
+
+    def _take(self) -> float:
+        """take a token, or return seconds to wait for one"""
+        with self._bucket:
+            now = self.clock()
+            self._refill(now)
+            if self._paused_until > now:
+                return self._paused_until - now
+            if self._tokens >= 1 - 1e-9:  # float error of refilling
+                self._tokens -= 1
+                return 0
+            return (1 - self._tokens) / self.rate
+
+    async def acquire(self):
+        """wait until a request is allowed to be sent"""
+        loop = asyncio.get_running_loop()
+        lock = self._locks.get(loop)
+        if lock is None:
+            lock = self._locks[loop] = asyncio.Lock()
+
+        queued = False
+        async with lock:  # waiters are served in order
+            while True:
+                wait = self._take()
+                if not wait:
+                    return
+                if not queued:
+                    queued = True
+                    self.stats.queued += 1
+                await self.sleep(wait)
+
+    def backoff(self, attempt: int, response: Optional[httpx.Response] = None) -> float:
+        """
+        delay before the next retry. `Retry-After` is honoured if
+        the response has one, otherwise a full-jittered exponential
+        backoff is used.
+        """
+        if response is not None:
+            retry_after = response.headers.get("Retry-After")
+            try:
+                return max(0.0, float(retry_after))
+            except (TypeError, ValueError):
+                pass
+        return random.uniform(0, min(self.backoff_max, self.backoff_base * 2**attempt))
+
+    def slow_down(self, delay: float):
+        """Notion responded 429, pause everyone and lower the rate"""
+        with self._bucket:
+            self._paused_until = max(self._paused_until, self.clock() + delay)
+            self._refill(self.clock())
+            self.rate = max(self.min_rate, self.rate / 2)
+        logger.warning(f"reach Notion's rate limits, pause {delay} seconds, rate is lowered to {self.rate}")
+
+    def succeeded(self):
+        if self.rate < self.max_rate:
+            with self._bucket:
+                self._refill(self.clock())
+                self.rate = min(self.max_rate, self.rate + 0.1)
+
+
+_limiters: Dict[str, RateLimiter] = {}
+
+
+def get_rate_limiter(api_token: str) -> RateLimiter:
+    """
+    Notion's rate limits are counted by integration, so
+    all clients using the same token share one limiter.
+    """
+    if api_token not in _limiters:
+        _limiters[api_token] = RateLimiter()
+    return _limiters[api_token]
@@ -0,0 +1,72 @@
+import logging
+from typing import Dict, Optional
+
+import httpx
+
+logger = logging.getLogger("NotionTransport")
+
+DEFAULT_LIMITS = httpx.Limits(max_connections=20, max_keepalive_connections=10, keepalive_expiry=60)
+
+
+def http2_available() -> bool:
+    """httpx needs `h2` to speak HTTP/2"""
+    try:
+        import h2  # noqa: F401
+    except ImportError:
+        return False
+    return True
+
+
+class SharedTransport(httpx.AsyncBaseTransport):
+    """
+    a proxy of a pooled transport in the registry.
+
+    closing a client won't close the pool which other clients
+    are still using, pools are closed by `close_transports`.
+    """
+
+    def __init__(self, transport: httpx.AsyncHTTPTransport) -> None:
+        self.transport = transport
+
+    async def handle_async_request(self, request: httpx.Request) -> httpx.Response:
+        return await self.transport.handle_async_request(request)
+
+    async def aclose(self) -> None:
+        ...
+
+
+_transports: Dict[str, httpx.AsyncHTTPTransport] = {}
+
+
+def get_transport(
+    base_url: str,
+    limits: Optional[httpx.Limits] = None,
+    http2: Optional[bool] = None,
+) -> SharedTransport:
+    """
+    get the process-wide connection pool of `base_url`.
+
+    All Notion clients of the same host multiplex over one pool,
+    so connections and TLS sessions are reused between clients.
+    The pool is created with `limits` and `http2` by the first
+    caller, later arguments are ignored.
+
+    :param base_url: Notion's base url.
+    :param limits: pool limits, defaults to `DEFAULT_LIMITS`.
+    :param http2: use HTTP/2, `None` means use it if `h2` is installed.
+    """
+    if base_url not in _transports:
+        if http2 is None:
+            http2 = http2_available()
+        logger.debug(f"creating transport of {base_url}, http2 is {http2}")
+        _transports[base_url] = httpx.AsyncHTTPTransport(limits=limits or DEFAULT_LIMITS, http2=http2)
+    elif limits is not None or http2 is not None:
+        logger.debug(f"transport of {base_url} exists, limits and http2 are ignored")
+    return SharedTransport(_transports[base_url])
+
+
+async def close_transports():
+    """shutdown hook, close all connection pools"""
+    while _transports:
+        _, transport = _transports.popitem()
+        await transport.aclose()
@@ -0,0 +1,58 @@
+import json
+import os
+from pathlib import Path
+from typing import Any, Dict, Optional, Union
+
+
+class WatermarkStore:
+    """
+    a tiny key-value store which persists progress,
+    such as how far a database has been polled.
+
+    values must be json serializable.
+    """
+
+    async def load(self, key: str) -> Optional[Dict[str, Any]]:
+        return NotImplemented
+
+    async def save(self, key: str, value: Dict[str, Any]):
+        return NotImplemented
+
+
+class MemoryWatermarkStore(WatermarkStore):
+
+    def __init__(self) -> None:
+        self.data = {}  # type: Dict[str, Dict[str, Any]]
+
+    async def load(self, key: str) -> Optional[Dict[str, Any]]:
+        return self.data.get(key)
+
+    async def save(self, key: str, value: Dict[str, Any]):
+        self.data[key] = value
+
+
+class FileWatermarkStore(WatermarkStore):
+
+    def __init__(self, path: Union[str, Path]) -> None:
+        """
+        keep all watermarks in a json file. the file
+        is replaced atomically on every save, so a crash
+        never leaves a half-written file.
+        """
+        self.path = Path(path)
+        self._data = None  # type: Optional[Dict[str, Dict[str, Any]]]
+
+    def _read(self) -> Dict[str, Dict[str, Any]]:
+        if self._data is None:
+            self._data = json.loads(self.path.read_text()) if self.path.exists() else {}
+        return self._data
+
+    async def load(self, key: str) -> Optional[Dict[str, Any]]:
+        return self._read().get(key)
+
+    async def save(self, key: str, value: Dict[str, Any]):
+        data = self._read()
+        data[key] = value
+        tmp = self.path.with_suffix(self.path.suffix + ".tmp")
+        tmp.write_text(json.dumps(data))
+        os.replace(tmp, self.path)
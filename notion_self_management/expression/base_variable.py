@@ -1,4 +1,4 @@
-from typing import Type
+from typing import Hashable, Type
 from typing_extensions import Self
 from notion_self_management.expression.expression import Expression
 
@@ -16,8 +16,14 @@ class BaseVariable(Expression):
         super().__init__()
 
     def to_json(self) -> str:
-        return super().to_json()
+        """See `notion_self_management.expression.serialize.to_dict`"""
+        from notion_self_management.expression.serialize import dumps
+        return dumps(self)
 
     @classmethod
     def from_json(cls, json_str: str) -> Self:
-        return super().from_json(json_str)
+        from notion_self_management.expression.serialize import loads
+        return loads(json_str, cls)
+
+    def _fingerprint(self) -> Hashable:
+        return BaseVariable, self.name
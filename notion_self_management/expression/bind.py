@@ -1,7 +1,7 @@
-from typing import Any, Dict
+from typing import Any, Dict, Hashable
 from typing_extensions import Self
 
-from notion_self_management.expression.expression import Expression
+from notion_self_management.expression.expression import Expression, fingerprint
 from notion_self_management.expression.formula import BasicValue, Formula
 
 
@@ -23,9 +23,13 @@ class BindVariable(Expression):
 
     @classmethod
     def from_json(cls, json_str: str) -> Self:
-        """for deserialize"""
-        return NotImplemented
+        from notion_self_management.expression.serialize import loads
+        return loads(json_str, cls)
 
     def to_json(self) -> str:
-        """for persistence"""
-        return NotImplemented
+        """See `notion_self_management.expression.serialize.to_dict`"""
+        from notion_self_management.expression.serialize import dumps
+        return dumps(self)
+
+    def _fingerprint(self) -> Hashable:
+        return BindVariable, self.variable, fingerprint(self.value)
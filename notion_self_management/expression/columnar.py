@@ -0,0 +1,162 @@
+from dataclasses import fields
+from datetime import datetime
+from typing import Any, Dict, Iterable, List, Mapping, Optional, Sequence
+
+from notion_self_management.expression.bool_expression import Condition, ConditionList, ConditionType
+from notion_self_management.expression.const import false, true
+from notion_self_management.expression.ops import LogicalOperator
+from notion_self_management.expression.variable import Variable
+
+try:
+    import numpy as np
+except ImportError:  # numpy is optional, columns are evaluated row by row without it
+    np = None
+
+Columns = Mapping[str, Sequence[Any]]
+Mask = Sequence[bool]
+
+
+def _to_array(values: List[Any]) -> Sequence[Any]:
+    """convert a column to a numpy array if it can be compared with vectorized operations"""
+    if np is None or not values:
+        return values
+    kinds = {type(v) for v in values}
+    if len(kinds) != 1:
+        return values  # mixed types or None
+    kind = kinds.pop()
+    if kind in (int, float, bool, str):
+        return np.array(values)
+    if kind is datetime and all(v.tzinfo is None for v in values):
+        return np.array(values, dtype="datetime64[us]")
+    return values
+
+
+def to_columns(rows: Sequence[Any], names: Optional[Iterable[str]] = None) -> Dict[str, Sequence[Any]]:
+    """
+    transpose dataclass rows into columns.
+
+    columns of int, float, bool, str and naive datetime become numpy
+    arrays if numpy is installed (requirements/requriements-optional.txt),
+    others are kept as lists.
+
+    :param rows: dataclass instances, such as `Task`.
+    :param names: fields to extract, defaults to all fields.
+    """
+    if names is None:
+        names = [f.name for f in fields(rows[0])] if rows else []
+    return {name: _to_array([getattr(r, name) for r in rows]) for name in names}
+
+
+def _is_array(column: Any) -> bool:
+    return np is not None and isinstance(column, np.ndarray)
+
+
+def _scalar(value: Any, column: Any) -> Any:
+    """a python value which can be compared with the array, `None` if it can't"""
+    kind = column.dtype.kind
+    if kind == "b":
+        return value if isinstance(value, bool) else None
+    if kind in "iuf":
+        return value if isinstance(value, (int, float)) and not isinstance(value, bool) else None
+    if kind == "U":
+        return value if isinstance(value, str) else None
+    if kind == "M":
+        if isinstance(value, datetime) and value.tzinfo is None:
+            return np.datetime64(value, "us")
+    return None
+
+
+def _column(columns: Columns, v: Variable) -> Sequence[Any]:
+    if v.name not in columns:
+        raise ValueError(f"variable {v.name} is unbound during compute")
+    return columns[v.name]
+
+
+def _condition(c: Condition, columns: Columns, size: int) -> Mask:
+    f = c.op.value
+    left, right = c.left, c.right
+    if isinstance(right, Variable):
+        right = _column(columns, right)
+        right_col = True
+    else:
+        right_col = False
+    if isinstance(left, Variable):
+        left = _column(columns, left)
+        left_col = True
+    else:
+        left_col = False
+
+    if left_col and right_col:
+        if _is_array(left) and _is_array(right) and left.dtype.kind == right.dtype.kind:
+            return f(left, right)
+        return [bool(f(a, b)) for a, b in zip(left, right)]
+    if left_col:
+        value = _scalar(right, left) if _is_array(left) else None
+        if value is not None:
+            return f(left, value)
+        return [bool(f(a, right)) for a in left]
+    if right_col:
+        value = _scalar(left, right) if _is_array(right) else None
+        if value is not None:
+            return f(value, right)
+        return [bool(f(left, b)) for b in right]
+    return _full(bool(f(left, right)), size)
+
+
+def _full(value: bool, size: int) -> Mask:
+    return np.full(size, value) if np is not None else [value] * size
+
+
+def _combine(masks: List[Mask], is_and: bool) -> Mask:
+    if np is not None:
+        arrays = [np.asarray(m, dtype=bool) for m in masks]
+        return np.logical_and.reduce(arrays) if is_and else np.logical_or.reduce(arrays)
+    if is_and:
+        return [all(row) for row in zip(*masks)]
+    return [any(row) for row in zip(*masks)]
+
+
+def _invert(mask: Mask) -> Mask:
+    if np is not None:
+        return ~np.asarray(mask, dtype=bool)
+    return [not m for m in mask]
+
+
+def evaluate_columns(c: ConditionType, columns: Columns, size: Optional[int] = None) -> Mask:
+    """
+    evaluate a bool expression over columns, a mask of rows is returned.
+
+    comparisons of numpy arrays are vectorized, other columns fall back
+    to comparing row by row. Unlike `evaluate`, every clause is evaluated
+    on all rows, there is no short-circuit.
+
+    ```python
+    columns = to_columns(tasks)
+    mask = evaluate_columns((Task.percent > 50) & (Task.status == "done"), columns)
+    done = [t for t, m in zip(tasks, mask) if m]
+    ```
+
+    :param c: bool expression.
+    :param columns: column values keyed by variable name, all columns
+                    must have the same length.
+    :param size: rows count, required only if there are no columns.
+    :return: a numpy bool array if numpy is installed, otherwise a list.
+    """
+    if size is None:
+        size = len(next(iter(columns.values()))) if columns else 0
+
+    if c is true or isinstance(c, true):
+        return _full(True, size)
+    if c is false or isinstance(c, false):
+        return _full(False, size)
+    if isinstance(c, Condition):
+        mask = _condition(c, columns, size)
+        return np.asarray(mask, dtype=bool) if np is not None else mask
+    if isinstance(c, ConditionList):
+        is_and = c.op == LogicalOperator.and_
+        if not c.clauses:
+            mask = _full(is_and, size)
+        else:
+            mask = _combine([evaluate_columns(clause, columns, size) for clause in c.clauses], is_and)
+        return _invert(mask) if c._inv else mask
+    raise TypeError(f"{type(c)} can't be evaluated over columns")
@@ -0,0 +1,190 @@
+from typing import Any, Callable, Dict, Hashable, List, Mapping, Tuple
+
+from notion_self_management.expression.bool_expression import Condition, ConditionList, ConditionType
+from notion_self_management.expression.const import false, true
+from notion_self_management.expression.expression import fingerprint
+from notion_self_management.expression.ops import LogicalOperator
+from notion_self_management.expression.variable import Variable
+
+Compiled = Callable[[Mapping[str, Any]], Any]
+
+# (is constant, constant value, compiled function)
+_Node = Tuple[bool, Any, Compiled]
+
+MAX_CACHED = 1024
+_cache: Dict[Hashable, Compiled] = {}
+
+
+def _unbound(name: str) -> ValueError:
+    return ValueError(f"variable {name} is unbound during compute")
+
+
+def _const(value: Any) -> _Node:
+    return True, value, lambda values: value
+
+
+def _compile_condition(c: Condition) -> _Node:
+    f = c.op.value
+    left, right = c.left, c.right
+    left_var, right_var = isinstance(left, Variable), isinstance(right, Variable)
+
+    if left_var and right_var:
+        ln, rn = left.name, right.name
+
+        def var_var(values):
+            # right is bound first, the same as `Condition.evaluate`
+            if rn not in values:
+                raise _unbound(rn)
+            if ln not in values:
+                raise _unbound(ln)
+            return f(values[ln], values[rn])
+
+        return False, None, var_var
+
+    if left_var:
+        ln = left.name
+
+        def var_value(values):
+            try:
+                v = values[ln]
+            except KeyError:
+                raise _unbound(ln) from None
+            return f(v, right)
+
+        return False, None, var_value
+
+    if right_var:
+        rn = right.name
+
+        def value_var(values):
+            try:
+                v = values[rn]
+            except KeyError:
+                raise _unbound(rn) from None
+            return f(left, v)
+
+        return False, None, value_var
+
+    try:
+        return _const(f(left, right))
+    except Exception:
+        return False, None, lambda values: f(left, right)  # raise at evaluating like before
+
+
+def _flatten(c: ConditionList) -> List[ConditionType]:
+    """`a & (b & c)` is `a & b & c`"""
+    clauses = []
+    for clause in c.clauses:
+        if isinstance(clause, ConditionList) and clause.op == c.op and not clause._inv:
+            clauses.extend(_flatten(clause))
+        else:
+            clauses.append(clause)
+    return clauses
+
+
+def _chain(fs: List[Compiled], is_and: bool) -> Compiled:
+    """short-circuit like `all` and `any`, and always return bool"""
+    if len(fs) == 1:
+        f0, = fs
+        return lambda values: bool(f0(values))
+    if len(fs) == 2:
+        f0, f1 = fs
+        if is_and:
+            return lambda values: bool(f0(values) and f1(values))
+        return lambda values: bool(f0(values) or f1(values))
+    if len(fs) == 3:
+        f0, f1, f2 = fs
+        if is_and:
+            return lambda values: bool(f0(values) and f1(values) and f2(values))
+        return lambda values: bool(f0(values) or f1(values) or f2(values))
+
+    fs = tuple(fs)
+    if is_and:
+
+        def chain_and(values):
+            for f in fs:
+                if not f(values):
+                    return False
+            return True
+
+        return chain_and
+
+    def chain_or(values):
+        for f in fs:
+            if f(values):
+                return True
+        return False
+
+    return chain_or
+
+
+def _compile_list(c: ConditionList) -> _Node:
+    is_and = c.op == LogicalOperator.and_
+    fs = []
+    result = None
+    for clause in _flatten(c):
+        is_const, value, f = _compile(clause)
+        if not is_const:
+            fs.append(f)
+        elif bool(value) != is_and:
+            # `False` in `and` or `True` in `or` decides the result,
+            # clauses after it are never evaluated.
+            result = not is_and
+            break
+        # `True` in `and` or `False` in `or` can be dropped
+
+    if not fs:
+        value = is_and if result is None else result
+        return _const((not value) if c._inv else value)
+
+    if result is not None:
+        prefix = _chain(fs, is_and)
+        # the prefix is evaluated for its errors, the result is decided anyway
+        fs = [lambda values: (prefix(values), result)[1]]
+
+    f = _chain(fs, is_and)
+    if c._inv:
+        return False, None, lambda values: not f(values)
+    return False, None, f
+
+
+def _compile(c: ConditionType) -> _Node:
+    if c is true or isinstance(c, true):
+        return _const(True)
+    if c is false or isinstance(c, false):
+        return _const(False)
+    if isinstance(c, Condition):
+        return _compile_condition(c)
+    if isinstance(c, ConditionList):
+        return _compile_list(c)
+    return False, None, lambda values: c.evaluate(**values)
+
+
+def compile_condition(c: ConditionType) -> Compiled:
+    """
+    compile a bool expression into a single function which
+    takes a mapping of variable values.
+
+    variable names are resolved when compiling, nested lists of
+    the same operator are flattened and constants are folded. The
+    result is exactly what `evaluate` returns.
+
+    compiled functions are cached by the expression's fingerprint,
+    compiling an expression built the same way again is a lookup.
+
+    ```python
+    f = compile_condition((Task.status == "done") & (Task.percent > 50))
+    matched = [t for t in tasks if f(vars(t))]
+    ```
+    """
+    try:
+        key = fingerprint(c)
+    except TypeError:
+        return _compile(c)[2]  # unhashable values
+
+    f = _cache.get(key)
+    if f is None:
+        if len(_cache) >= MAX_CACHED:
+            del _cache[next(iter(_cache))]  # the oldest
+        f = _cache[key] = _compile(c)[2]
+    return f
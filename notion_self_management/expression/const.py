@@ -1,3 +1,5 @@
+from typing import Hashable
+
 from notion_self_management.expression.expression import Expression
 from typing_extensions import Self
 
@@ -11,11 +13,17 @@ class Const(Expression):
         return cls.instance
 
     def to_json(self) -> str:
-        return super().to_json()
+        """See `notion_self_management.expression.serialize.to_dict`"""
+        from notion_self_management.expression.serialize import dumps
+        return dumps(self)
 
     @classmethod
     def from_json(cls, json_str: str) -> Self:
-        return super().from_json(json_str)
+        from notion_self_management.expression.serialize import loads
+        return loads(json_str, cls)
+
+    def _fingerprint(self) -> Hashable:
+        return type(self),
 
 
 class true(Const):
@@ -1,4 +1,81 @@
+import calendar
+from datetime import datetime, timedelta
+from typing import Hashable, Iterator, List, Optional, Tuple
+
 from notion_self_management.expression.expression import Expression
+from typing_extensions import Self
+
+MACROS = {
+    "@yearly": "0 0 1 1 *",
+    "@annually": "0 0 1 1 *",
+    "@monthly": "0 0 1 * *",
+    "@weekly": "0 0 * * 0",
+    "@daily": "0 0 * * *",
+    "@midnight": "0 0 * * *",
+    "@hourly": "0 * * * *",
+}
+MONTHS = ["jan", "feb", "mar", "apr", "may", "jun", "jul", "aug", "sep", "oct", "nov", "dec"]
+WEEKDAYS = ["sun", "mon", "tue", "wed", "thu", "fri", "sat"]
+
+# (name, minimum, maximum, names of values)
+_FIELDS = [
+    ("minute", 0, 59, None),
+    ("hour", 0, 23, None),
+    ("day", 1, 31, None),
+    ("month", 1, 12, MONTHS),
+    ("weekday", 0, 7, WEEKDAYS),
+]
+
+# a schedule which doesn't fire in this many years never fires,
+# the calendar repeats every 400 years.
+MAX_YEARS = 400
+
+
+def _next_bit(mask: int, i: int) -> Optional[int]:
+    """the lowest set bit at or above `i`"""
+    m = mask >> i
+    if not m:
+        return None
+    return i + (m & -m).bit_length() - 1
+
+
+def _prev_bit(mask: int, i: int) -> Optional[int]:
+    """the highest set bit at or below `i`"""
+    if i < 0:
+        return None
+    m = mask & ((1 << (i + 1)) - 1)
+    return m.bit_length() - 1 if m else None
+
+
+def _value(token: str, minimum: int, names: Optional[List[str]]) -> int:
+    if names and token.lower() in names:
+        return names.index(token.lower()) + (minimum if names is MONTHS else 0)
+    if not token.isdigit():
+        raise ValueError(f"invalid value {token!r}")
+    return int(token)
+
+
+def _parse_field(field: str, minimum: int, maximum: int, names: Optional[List[str]]) -> Tuple[int, bool]:
+    """a bitset of the values, and whether the field is `*`"""
+    mask = 0
+    for part in field.split(","):
+        expr, _, step_str = part.partition("/")
+        step = int(step_str) if step_str else 1
+        if step < 1:
+            raise ValueError(f"invalid step {part!r}")
+        if expr == "*":
+            start, stop = minimum, maximum
+        elif "-" in expr:
+            a, b = expr.split("-", 1)
+            start, stop = _value(a, minimum, names), _value(b, minimum, names)
+        else:
+            start = _value(expr, minimum, names)
+            stop = maximum if step_str else start
+        if not minimum <= start <= stop <= maximum:
+            raise ValueError(f"{part!r} out of range {minimum}-{maximum}")
+        for v in range(start, stop + 1, step):
+            mask |= 1 << v
+    return mask, field.startswith("*")
 
 
 class Cron(Expression):
@@ -7,3 +84,157 @@ class Cron(Expression):
     used by Handler manager
     to start a cron job.
     """
+
+    def __init__(self, expr: str) -> None:
+        """
+        a standard five fields cron expression, `minute hour day month weekday`.
+
+        `*`, lists, ranges, steps, names of months and weekdays and
+        macros like `@daily` are supported. Like cron, if both day and
+        weekday are restricted, a day matching either of them fires.
+
+        allowed values of every field are kept as a bitset, the next
+        value of a field is the lowest set bit above the current value,
+        so `next` is computed in a few steps instead of scanning minutes.
+
+        ```python
+        cron = Cron("*/15 9-18 * * mon-fri")
+        cron.next(datetime(2022, 7, 1, 18, 50))  # datetime(2022, 7, 4, 9, 0)
+        ```
+
+        times are wall clock times, daylight saving time is not considered.
+        """
+        self.expr = expr
+        fields = MACROS.get(expr.strip().lower(), expr).split()
+        if len(fields) != 5:
+            raise ValueError(f"cron expression needs 5 fields, got {expr!r}")
+
+        masks = [_parse_field(f, lo, hi, names) for f, (_, lo, hi, names) in zip(fields, _FIELDS)]
+        (self.minutes, _), (self.hours, _), (self.days, any_day), (self.months, _), (weekdays, any_weekday) = masks
+        if weekdays & (1 << 7):
+            weekdays = (weekdays | 1) & ~(1 << 7)  # 7 is sunday too
+        self.weekdays = weekdays
+
+        # days of a month by weekdays, indexed by the weekday of the 1st
+        self._days_by_weekday = []  # type: List[int]
+        for first in range(7):
+            mask = 0
+            for day in range(1, 32):
+                if weekdays >> ((first + day - 1) % 7) & 1:
+                    mask |= 1 << day
+            self._days_by_weekday.append(mask)
+        self._any_day, self._any_weekday = any_day, any_weekday
+
+    def _month_days(self, year: int, month: int) -> int:
+        """a bitset of days to fire in the month"""
+        first, size = calendar.monthrange(year, month)
+        by_weekday = self._days_by_weekday[(first + 1) % 7]  # monday is 0 in calendar
+        if self._any_day:
+            days = by_weekday
+        elif self._any_weekday:
+            days = self.days
+        else:
+            days = self.days | by_weekday
+        return days & ((1 << (size + 1)) - 1)
+
+    def next(self, after: datetime) -> datetime:
+        """the first fire time later than `after`, `ValueError` is raised if it never fires"""
+        t = after.replace(second=0, microsecond=0) + timedelta(minutes=1)
+        year, month, day, hour, minute = t.year, t.month, t.day, t.hour, t.minute
+        while year <= after.year + MAX_YEARS:
+            m = _next_bit(self.months, month)
+            if m is None:
+                year, month, day, hour, minute = year + 1, 1, 1, 0, 0
+                continue
+            if m != month:
+                month, day, hour, minute = m, 1, 0, 0
+
+            d = _next_bit(self._month_days(year, month), day)
+            if d is None:
+                month, day, hour, minute = month + 1, 1, 0, 0
+                if month > 12:
+                    year, month = year + 1, 1
+                continue
+            if d != day:
+                day, hour, minute = d, 0, 0
+
+            h = _next_bit(self.hours, hour)
+            if h is None:
+                day, hour, minute = day + 1, 0, 0  # may be out of the month, the day's bitset has no such bit
+                continue
+            if h != hour:
+                hour, minute = h, 0
+
+            mi = _next_bit(self.minutes, minute)
+            if mi is None:
+                hour, minute = hour + 1, 0
+                continue
+            return t.replace(year=year, month=month, day=day, hour=hour, minute=mi)
+        raise ValueError(f"{self.expr!r} never fires")
+
+    def prev(self, before: datetime) -> datetime:
+        """the last fire time earlier than `before`, `ValueError` is raised if it never fires"""
+        t = before.replace(second=0, microsecond=0)
+        if t == before:
+            t -= timedelta(minutes=1)
+        year, month, day, hour, minute = t.year, t.month, t.day, t.hour, t.minute
+        while year >= before.year - MAX_YEARS:
+            m = _prev_bit(self.months, month)
+            if m is None:
+                year, month, day, hour, minute = year - 1, 12, 31, 23, 59
+                continue
+            if m != month:
+                month, day, hour, minute = m, 31, 23, 59
+
+            d = _prev_bit(self._month_days(year, month), day)
+            if d is None:
+                month, day, hour, minute = month - 1, 31, 23, 59
+                if month < 1:
+                    year, month = year - 1, 12
+                continue
+            if d != day:
+                day, hour, minute = d, 23, 59
+
+            h = _prev_bit(self.hours, hour)
+            if h is None:
+                day, hour, minute = day - 1, 23, 59
+                continue
+            if h != hour:
+                hour, minute = h, 59
+
+            mi = _prev_bit(self.minutes, minute)
+            if mi is None:
+                hour, minute = hour - 1, 59
+                continue
+            return t.replace(year=year, month=month, day=day, hour=hour, minute=mi)
+        raise ValueError(f"{self.expr!r} never fires")
+
+    def iter(self, after: datetime, until: Optional[datetime] = None) -> Iterator[datetime]:
+        """fire times later than `after` and no later than `until`, lazily"""
+        t = after
+        while True:
+            t = self.next(t)
+            if until is not None and t > until:
+                return
+            yield t
+
+    def evaluate(self, t: datetime) -> bool:
+        """whether `t` is a fire time, seconds are ignored"""
+        day = self.months >> t.month & 1 and self._month_days(t.year, t.month) >> t.day & 1
+        return bool(day and self.hours >> t.hour & 1 and self.minutes >> t.minute & 1)
+
+    def _fingerprint(self) -> Hashable:
+        return Cron, self.minutes, self.hours, self.days, self.months, self.weekdays, self._any_day, self._any_weekday
+
+    def to_json(self) -> str:
+        """See `notion_self_management.expression.serialize.to_dict`"""
+        from notion_self_management.expression.serialize import dumps
+        return dumps(self)
+
+    @classmethod
+    def from_json(cls, json_str: str) -> Self:
+        from notion_self_management.expression.serialize import loads
+        return loads(json_str, cls)
+
+    def __str__(self) -> str:
+        return self.expr
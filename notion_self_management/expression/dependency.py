@@ -0,0 +1,42 @@
+from typing import Any, FrozenSet, Set
+
+from notion_self_management.expression.base_variable import BaseVariable
+from notion_self_management.expression.bind import BindVariable
+from notion_self_management.expression.bool_expression import Condition, ConditionList
+from notion_self_management.expression.formula import Formula
+
+
+def _collect(e: Any, names: Set[str]):
+    if isinstance(e, BaseVariable):
+        names.add(e.name)
+    elif isinstance(e, Condition):
+        _collect(e.left, names)
+        _collect(e.right, names)
+    elif isinstance(e, ConditionList):
+        for clause in e.clauses:
+            _collect(clause, names)
+    elif isinstance(e, Formula):
+        for arg in e.args:
+            _collect(arg, names)
+    elif isinstance(e, BindVariable):
+        names.add(e.variable)
+        _collect(e.value, names)
+    # constants and values don't depend on any variable
+
+
+def referenced_variables(e: Any) -> FrozenSet[str]:
+    """
+    names of variables which an expression reads.
+
+    the result of an expression can only change if one of these
+    variables changes, so a rule can be skipped when an edit
+    doesn't touch them.
+
+    ```python
+    referenced_variables((Task.status == "done") & (Task.percent > Task.extras_field))
+    # frozenset({"status", "percent", "extras_field"})
+    ```
+    """
+    names = set()  # type: Set[str]
+    _collect(e, names)
+    return frozenset(names)
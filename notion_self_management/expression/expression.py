@@ -1,5 +1,6 @@
 from abc import ABC, abstractmethod
-from typing import Any
+from datetime import date, datetime
+from typing import Any, Hashable
 
 from typing_extensions import Self
 
@@ -29,3 +30,53 @@ class Expression(ABC):
 
     def evaluate(self, *args, **kwargs) -> Any:
         ...
+
+    def _fingerprint(self) -> Hashable:
+        raise TypeError(f"{type(self).__name__} has no fingerprint")
+
+    def fingerprint(self) -> Hashable:
+        """
+        a structural key of the expression.
+
+        `==` of variables is overloaded to build conditions, so
+        expressions can't be compared or used as dict keys directly.
+        Expressions built the same way have equal fingerprints, which
+        can be used as keys of caches instead.
+
+        ```python
+        (Task.status == "done").fingerprint() == (Task.status == "done").fingerprint()  # True
+        ```
+
+        expressions are treated as immutable, the fingerprint is
+        computed once.
+        """
+        key = self.__dict__.get("_key")
+        if key is None:
+            key = self.__dict__["_key"] = self._fingerprint()
+        return key
+
+
+_SCALARS = frozenset((str, int, float, bool, type(None), datetime, date))
+
+
+def fingerprint(value: Any) -> Hashable:
+    """
+    fingerprint of an expression or a value in expressions.
+
+    values of different types never share a fingerprint,
+    so `1`, `1.0` and `True` are not the same.
+    `TypeError` is raised if a value can't be hashed.
+    """
+    t = type(value)
+    if t in _SCALARS:
+        return t, value
+    if isinstance(value, Expression):
+        return value.fingerprint()
+    if isinstance(value, (list, tuple)):
+        return type(value), tuple(fingerprint(v) for v in value)
+    if isinstance(value, (set, frozenset)):
+        return type(value), frozenset(fingerprint(v) for v in value)
+    if isinstance(value, dict):
+        return dict, frozenset((k, fingerprint(v)) for k, v in value.items())
+    hash(value)
+    return t, value
@@ -1,6 +1,6 @@
-from typing import Any, Generic, Iterable, TypeVar, Union, Callable
+from typing import Any, Generic, Iterable, TypeVar, Union, Callable, Hashable
 
-from notion_self_management.expression.expression import Expression
+from notion_self_management.expression.expression import Expression, fingerprint
 
 Number = Union[int, float]
 _BasicValue = Union[str, Number, bool]
@@ -20,6 +20,9 @@ class Formula(Expression):
         # TODO: valid parameter types
         return
 
+    def _fingerprint(self) -> Hashable:
+        return type(self), tuple(fingerprint(a) for a in self.args)
+
 
 # some built in Formula
 class Add(Formula):
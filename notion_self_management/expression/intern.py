@@ -0,0 +1,62 @@
+from typing import Any, Hashable, TypeVar
+from weakref import WeakValueDictionary
+
+from notion_self_management.expression.bind import BindVariable
+from notion_self_management.expression.bool_expression import Condition, ConditionList
+from notion_self_management.expression.expression import Expression
+from notion_self_management.expression.formula import Formula
+
+E_ = TypeVar("E_")
+
+
+class Interner:
+
+    def __init__(self) -> None:
+        """
+        Interner returns the same node for structurally identical
+        expressions, so equal subtrees are shared and can be compared
+        by identity. Nodes are kept by weak references, a node no one
+        uses is released.
+
+        ```python
+        intern = Interner()
+        a = intern((Task.status == "done") & (Task.percent > 50))
+        b = intern((Task.percent > 50) | (Task.status == "done"))
+        a.clauses[0] is b.clauses[1]  # True
+        ```
+
+        interned nodes must not be modified.
+        """
+        self._nodes: WeakValueDictionary[Hashable, Expression] = WeakValueDictionary()
+
+    def __len__(self) -> int:
+        return len(self._nodes)
+
+    def __call__(self, e: E_) -> E_:
+        if not isinstance(e, Expression):
+            return e
+        try:
+            key = e.fingerprint()
+        except TypeError:
+            return e  # unhashable values, it can't be shared
+        node = self._nodes.get(key)
+        if node is not None:
+            return node  # type: ignore
+
+        # children are interned first, the node keeps the shared children
+        if isinstance(e, Condition):
+            e.left, e.right = self._child(e.left), self._child(e.right)
+        elif isinstance(e, ConditionList):
+            e.clauses = [self(c) for c in e.clauses]
+        elif isinstance(e, Formula):
+            e.args = tuple(self._child(a) for a in e.args)
+        elif isinstance(e, BindVariable):
+            e.value = self._child(e.value)
+        self._nodes[key] = e
+        return e
+
+    def _child(self, value: Any) -> Any:
+        return self(value) if isinstance(value, Expression) else value
+
+
+intern = Interner()
@@ -24,3 +24,23 @@ BoolOperatorInv = {
     BoolOperator.lt: BoolOperator.gt,
     BoolOperator.gt: BoolOperator.lt,
 }
+
+# swap the operands, `1 < a` is `a > 1`
+BoolOperatorMirror = {
+    BoolOperator.eq: BoolOperator.eq,
+    BoolOperator.ne: BoolOperator.ne,
+    BoolOperator.lt: BoolOperator.gt,
+    BoolOperator.gt: BoolOperator.lt,
+    BoolOperator.le: BoolOperator.ge,
+    BoolOperator.ge: BoolOperator.le,
+}
+
+# the complement, `not (a < b)` is `a >= b`
+BoolOperatorNegate = {
+    BoolOperator.eq: BoolOperator.ne,
+    BoolOperator.ne: BoolOperator.eq,
+    BoolOperator.lt: BoolOperator.ge,
+    BoolOperator.ge: BoolOperator.lt,
+    BoolOperator.gt: BoolOperator.le,
+    BoolOperator.le: BoolOperator.gt,
+}
@@ -0,0 +1,444 @@
+import json
+import mmap
+import struct
+from datetime import date, datetime
+from typing import Any, Dict, List, Mapping, Optional, Tuple, Type, Union, get_origin
+
+from notion_self_management.expression.base_variable import BaseVariable
+from notion_self_management.expression.bind import BindVariable
+from notion_self_management.expression.bool_expression import Condition, ConditionList, ConditionType
+from notion_self_management.expression.const import Const, empty, false, true
+from notion_self_management.expression.cron import Cron
+from notion_self_management.expression.expression import Expression
+from notion_self_management.expression.ops import BoolOperator, LogicalOperator
+from notion_self_management.expression.variable import Variable
+
+VERSION = 1
+MAGIC = b"NSMR"
+
+Buffer = Union[bytes, bytearray, memoryview, mmap.mmap]
+
+# types of variables which can be restored, others are restored as `object`
+_TYPES = {t.__name__: t for t in (str, int, float, bool, list, dict, set, tuple, datetime, date)}
+_CONSTS = {"true": true, "false": false, "empty": empty}
+
+
+def _type_name(t: Any) -> Optional[str]:
+    t = get_origin(t) or t
+    name = getattr(t, "__name__", None)
+    return name if _TYPES.get(name) is t else None
+
+
+def _const(c: Any) -> Optional[Const]:
+    """const instances or classes, `and_` used to insert classes"""
+    for kind in (true, false, empty):
+        if c is kind or isinstance(c, kind):
+            return kind()
+    return None
+
+
+class _Variables:
+    """variables of the same name and type are shared while loading"""
+
+    def __init__(self) -> None:
+        self.cache: Dict[Tuple[str, Optional[str]], Variable] = {}
+
+    def get(self, name: str, type_name: Optional[str]) -> Variable:
+        v = self.cache.get((name, type_name))
+        if v is None:
+            v = self.cache[(name, type_name)] = Variable(_TYPES.get(type_name, object), name)
+        return v
+
+
+# JSON
+def to_dict(e: Any) -> Any:
+    """
+    convert an expression into a JSON compatible object.
+
+    nodes are objects with a tag key, such as `{"op": "eq", "left": ..., "right": ...}`,
+    values are kept as they are except datetimes and containers other than
+    lists, which are tagged as well, so a plain JSON object is always a node.
+    """
+    if isinstance(e, bool) or e is None or isinstance(e, (str, int, float)):
+        return e
+    if isinstance(e, BaseVariable):
+        node: Dict[str, Any] = {"var": e.name}
+        type_name = _type_name(e.type)
+        if type_name:
+            node["type"] = type_name
+        return node
+    if isinstance(e, Condition):
+        return {"op": e.op.name, "left": to_dict(e.left), "right": to_dict(e.right)}
+    if isinstance(e, ConditionList):
+        return {"list": e.op.name.rstrip("_"), "not": e._inv, "clauses": [to_dict(c) for c in e.clauses]}
+    const = _const(e)
+    if const is not None:
+        return {"const": type(const).__name__}
+    if isinstance(e, BindVariable):
+        return {"bind": e.variable, "value": to_dict(e.value)}
+    if isinstance(e, Cron):
+        return {"cron": e.expr}
+    if isinstance(e, datetime):
+        return {"datetime": e.isoformat()}
+    if isinstance(e, date):
+        return {"date": e.isoformat()}
+    if isinstance(e, list):
+        return [to_dict(v) for v in e]
+    if isinstance(e, tuple):
+        return {"tuple": [to_dict(v) for v in e]}
+    if isinstance(e, (set, frozenset)):
+        return {"set": [to_dict(v) for v in e]}
+    if isinstance(e, dict):
+        return {"dict": [[to_dict(k), to_dict(v)] for k, v in e.items()]}
+    raise TypeError(f"{type(e).__name__} can't be serialized")
+
+
+def _from_dict(data: Any, variables: _Variables) -> Any:
+    if isinstance(data, list):
+        return [_from_dict(v, variables) for v in data]
+    if not isinstance(data, dict):
+        return data
+    if "op" in data:
+        return Condition(BoolOperator[data["op"]], _from_dict(data["left"], variables),
+                         _from_dict(data["right"], variables))
+    if "var" in data:
+        return variables.get(data["var"], data.get("type"))
+    if "list" in data:
+        c = ConditionList(LogicalOperator[data["list"] + "_"], [_from_dict(v, variables) for v in data["clauses"]])
+        c._inv = data.get("not", False)
+        return c
+    if "const" in data:
+        return _CONSTS[data["const"]]()
+    if "bind" in data:
+        return BindVariable(data["bind"], _from_dict(data["value"], variables))
+    if "cron" in data:
+        return Cron(data["cron"])
+    if "datetime" in data:
+        return datetime.fromisoformat(data["datetime"])
+    if "date" in data:
+        return date.fromisoformat(data["date"])
+    if "tuple" in data:
+        return tuple(_from_dict(v, variables) for v in data["tuple"])
+    if "set" in data:
+        return {_from_dict(v, variables) for v in data["set"]}
+    if "dict" in data:
+        return {_from_dict(k, variables): _from_dict(v, variables) for k, v in data["dict"]}
+    raise ValueError(f"unknown node {data}")
+
+
+def from_dict(data: Any) -> Any:
+    """See `to_dict`"""
+    return _from_dict(data, _Variables())
+
+
+def dumps(e: Expression) -> str:
+    return json.dumps(to_dict(e), ensure_ascii=False, separators=(",", ":"))
+
+
+def loads(json_str: str, expected: Type[Any] = Expression) -> Any:
+    """load an expression from JSON, `TypeError` is raised if it's not an instance of `expected`"""
+    e = from_dict(json.loads(json_str))
+    if not isinstance(e, expected):
+        raise TypeError(f"expect {expected.__name__}, got {type(e).__name__}")
+    return e
+
+
+# binary
+#
+# header:  MAGIC, version u8, strings count u32, strings (u32 length + utf-8), rules count u32
+# rule:    name u32 (index of strings), stream length u32, stream
+# stream:  nodes in post-order, every node is a u8 opcode with its operands, a node's
+#          children are popped from a stack, the last node left is the rule. Conditions
+#          of a variable and a string or an int, the most common ones, are a single node.
+(
+    _VAR,
+    _STR,
+    _INT,
+    _BIGINT,
+    _FLOAT,
+    _TRUE,
+    _FALSE,
+    _NONE,
+    _DATETIME,
+    _DATE,
+    _LIST,
+    _TUPLE,
+    _SET,
+    _DICT,
+    _COND,
+    _CLAUSES,
+    _CONST,
+    _BIND,
+    _VAR_STR_COND,
+    _VAR_INT_COND,
+) = range(20)
+
+_OPS = list(BoolOperator)
+_OP_CODES = {op: i for i, op in enumerate(_OPS)}
+_CONST_CODES = [true, false, empty]
+_TYPE_NAMES: List[Optional[str]] = [None] + list(_TYPES)
+_TYPE_CODES = {name: i for i, name in enumerate(_TYPE_NAMES)}
+
+_u8 = struct.Struct("<B")
+_u32 = struct.Struct("<I")
+_u8u32 = struct.Struct("<BI")
+_u8u8 = struct.Struct("<BB")
+_u8q = struct.Struct("<Bq")
+_u8d = struct.Struct("<Bd")
+_u8u32u8 = struct.Struct("<BIB")
+_var_str_cond = struct.Struct("<BIBBI")
+_var_int_cond = struct.Struct("<BIBBq")
+_var_cond = struct.Struct("<IBB")
+_q = struct.Struct("<q")
+_d = struct.Struct("<d")
+_INT64 = 2**63
+
+
+class _Encoder:
+
+    def __init__(self) -> None:
+        self.strings: Dict[str, int] = {}
+
+    def string(self, s: str) -> int:
+        i = self.strings.get(s)
+        if i is None:
+            i = self.strings[s] = len(self.strings)
+        return i
+
+    def encode(self, e: Any, out: bytearray):
+        const = _const(e)
+        if const is not None:
+            out += _u8u8.pack(_CONST, _CONST_CODES.index(type(const)))
+        elif e is True or e is False:
+            out += _u8.pack(_TRUE if e else _FALSE)
+        elif e is None:
+            out += _u8.pack(_NONE)
+        elif isinstance(e, str):
+            out += _u8u32.pack(_STR, self.string(e))
+        elif isinstance(e, int):
+            if -_INT64 <= e < _INT64:
+                out += _u8q.pack(_INT, e)
+            else:
+                out += _u8u32.pack(_BIGINT, self.string(str(e)))
+        elif isinstance(e, float):
+            out += _u8d.pack(_FLOAT, e)
+        elif isinstance(e, BaseVariable):
+            out += _u8u32u8.pack(_VAR, self.string(e.name), _TYPE_CODES[_type_name(e.type)])
+        elif isinstance(e, Condition) and isinstance(e.left, BaseVariable) and type(e.right) in (str, int) \
+                and (type(e.right) is str or -_INT64 <= e.right < _INT64):
+            if type(e.right) is str:
+                code, fmt, value = _VAR_STR_COND, _var_str_cond, self.string(e.right)
+            else:
+                code, fmt, value = _VAR_INT_COND, _var_int_cond, e.right
+            name, type_code = self.string(e.left.name), _TYPE_CODES[_type_name(e.left.type)]
+            out += fmt.pack(code, name, type_code, _OP_CODES[e.op], value)
+        elif isinstance(e, Condition):
+            self.encode(e.left, out)
+            self.encode(e.right, out)
+            out += _u8u8.pack(_COND, _OP_CODES[e.op])
+        elif isinstance(e, ConditionList):
+            for c in e.clauses:
+                self.encode(c, out)
+            flags = (e.op == LogicalOperator.or_) | (e._inv << 1)
+            out += _u8u32u8.pack(_CLAUSES, len(e.clauses), flags)
+        elif isinstance(e, BindVariable):
+            self.encode(e.value, out)
+            out += _u8u32.pack(_BIND, self.string(e.variable))
+        elif isinstance(e, datetime):
+            out += _u8u32.pack(_DATETIME, self.string(e.isoformat()))
+        elif isinstance(e, date):
+            out += _u8u32.pack(_DATE, self.string(e.isoformat()))
+        elif isinstance(e, (list, tuple, set, frozenset)):
+            for v in e:
+                self.encode(v, out)
+            code = _LIST if isinstance(e, list) else _TUPLE if isinstance(e, tuple) else _SET
+            out += _u8u32.pack(code, len(e))
+        elif isinstance(e, dict):
+            for k, v in e.items():
+                self.encode(k, out)
+                self.encode(v, out)
+            out += _u8u32.pack(_DICT, len(e))
+        else:
+            raise TypeError(f"{type(e).__name__} can't be serialized")
+
+
+def dump_rules_binary(rules: Mapping[str, ConditionType]) -> bytes:
+    """
+    serialize named rules into the compact binary form.
+
+    strings, including names of rules and variables, are stored once
+    in a table, nodes refer to them by index.
+    """
+    encoder = _Encoder()
+    body = bytearray()
+    for name, rule in rules.items():
+        stream = bytearray()
+        encoder.encode(rule, stream)
+        body += _u32.pack(encoder.string(name))
+        body += _u32.pack(len(stream))
+        body += stream
+
+    out = bytearray(MAGIC)
+    out += _u8.pack(VERSION)
+    out += _u32.pack(len(encoder.strings))
+    for s in encoder.strings:
+        b = s.encode()
+        out += _u32.pack(len(b))
+        out += b
+    out += _u32.pack(len(rules))
+    out += body
+    return bytes(out)
+
+
+def _decode(buf: Buffer, pos: int, end: int, strings: List[str], variables: _Variables, parsed: Dict[int, Any]) -> Any:
+    stack: List[Any] = []
+    push, pop = stack.append, stack.pop
+    u32, q, d, var_cond = _u32.unpack_from, _q.unpack_from, _d.unpack_from, _var_cond.unpack_from
+    while pos < end:
+        code = buf[pos]
+        pos += 1
+        if code == _VAR_STR_COND or code == _VAR_INT_COND:
+            name, type_code, op = var_cond(buf, pos)
+            if code == _VAR_STR_COND:
+                value = strings[u32(buf, pos + 6)[0]]
+                pos += 10
+            else:
+                value = q(buf, pos + 6)[0]
+                pos += 14
+            push(Condition(_OPS[op], variables.get(strings[name], _TYPE_NAMES[type_code]), value))
+        elif code == _STR:
+            push(strings[u32(buf, pos)[0]])
+            pos += 4
+        elif code == _VAR:
+            push(variables.get(strings[u32(buf, pos)[0]], _TYPE_NAMES[buf[pos + 4]]))
+            pos += 5
+        elif code == _COND:
+            right = pop()
+            push(Condition(_OPS[buf[pos]], pop(), right))
+            pos += 1
+        elif code == _CLAUSES:
+            n, flags = u32(buf, pos)[0], buf[pos + 4]
+            pos += 5
+            clauses = stack[len(stack) - n:] if n else []
+            del stack[len(stack) - n:]
+            c = ConditionList(LogicalOperator.or_ if flags & 1 else LogicalOperator.and_, clauses)
+            c._inv = bool(flags & 2)
+            push(c)
+        elif code == _INT:
+            push(q(buf, pos)[0])
+            pos += 8
+        elif code == _FLOAT:
+            push(d(buf, pos)[0])
+            pos += 8
+        elif code == _TRUE or code == _FALSE:
+            push(code == _TRUE)
+        elif code == _NONE:
+            push(None)
+        elif code == _CONST:
+            push(_CONST_CODES[buf[pos]]())
+            pos += 1
+        elif code == _BIGINT:
+            push(int(strings[u32(buf, pos)[0]]))
+            pos += 4
+        elif code == _DATETIME or code == _DATE:
+            i = u32(buf, pos)[0]
+            value = parsed.get(i)
+            if value is None:
+                value = parsed[i] = (datetime if code == _DATETIME else date).fromisoformat(strings[i])
+            push(value)
+            pos += 4
+        elif code == _BIND:
+            push(BindVariable(strings[u32(buf, pos)[0]], pop()))
+            pos += 4
+        elif code in (_LIST, _TUPLE, _SET, _DICT):
+            n = u32(buf, pos)[0]
+            pos += 4
+            size = 2 * n if code == _DICT else n
+            items = stack[len(stack) - size:] if size else []
+            del stack[len(stack) - size:]
+            if code == _LIST:
+                push(items)
+            elif code == _TUPLE:
+                push(tuple(items))
+            elif code == _SET:
+                push(set(items))
+            else:
+                push(dict(zip(items[::2], items[1::2])))
+        else:
+            raise ValueError(f"unknown opcode {code} at {pos - 1}")
+    if len(stack) != 1:
+        raise ValueError("broken rule stream")
+    return stack[0]
+
+
+def load_rules_binary(buf: Buffer) -> Dict[str, ConditionType]:
+    """
+    load all rules of the binary form in a single pass.
+
+    `buf` can be a `mmap`, only the bytes of strings are copied,
+    nodes are decoded from the buffer directly.
+    """
+    if bytes(buf[:4]) != MAGIC:
+        raise ValueError("not a rules file")
+    if buf[4] != VERSION:
+        raise ValueError(f"unsupported version {buf[4]}")
+
+    u32 = _u32.unpack_from
+    count, pos = u32(buf, 5)[0], 9
+    strings: List[str] = []
+    for _ in range(count):
+        n = u32(buf, pos)[0]
+        strings.append(str(buf[pos + 4:pos + 4 + n], "utf-8"))
+        pos += 4 + n
+
+    variables = _Variables()
+    parsed: Dict[int, Any] = {}  # datetimes are immutable, they are parsed once
+    rules: Dict[str, ConditionType] = {}
+    count, pos = u32(buf, pos)[0], pos + 4
+    for _ in range(count):
+        name, size = strings[u32(buf, pos)[0]], u32(buf, pos + 4)[0]
+        pos += 8
+        rules[name] = _decode(buf, pos, pos + size, strings, variables, parsed)
+        pos += size
+    return rules
+
+
+def dump_rules(rules: Mapping[str, ConditionType], binary: bool = False) -> Union[str, bytes]:
+    """serialize named rules, into JSON by default"""
+    if binary:
+        return dump_rules_binary(rules)
+    return json.dumps({"version": VERSION, "rules": {k: to_dict(v) for k, v in rules.items()}},
+                      ensure_ascii=False,
+                      separators=(",", ":"))
+
+
+def load_rules(data: Union[str, Buffer]) -> Dict[str, ConditionType]:
+    """load rules of `dump_rules`, the form is detected"""
+    if not isinstance(data, str):
+        if bytes(data[:4]) == MAGIC:
+            return load_rules_binary(data)
+        data = str(data, "utf-8")
+    content = json.loads(data)
+    if content.get("version") != VERSION:
+        raise ValueError(f"unsupported version {content.get('version')}")
+    variables = _Variables()
+    return {k: _from_dict(v, variables) for k, v in content["rules"].items()}
+
+
+def load_rules_file(path: str) -> Dict[str, ConditionType]:
+    """
+    load a rules file of either form, binary files are memory-mapped.
+
+    ```python
+    with open("rules.bin", "wb") as f:
+        f.write(dump_rules(rules, binary=True))
+
+    rules = load_rules_file("rules.bin")
+    ```
+    """
+    with open(path, "rb") as f:
+        if f.read(4) != MAGIC:
+            f.seek(0)
+            return load_rules(f.read())
+        with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as buf:
+            return load_rules_binary(buf)
@@ -0,0 +1,179 @@
+import asyncio
+import itertools
+import logging
+import time
+from collections import deque
+from dataclasses import dataclass, field
+from enum import IntEnum
+from typing import Any, Awaitable, Callable, Deque, Hashable, List, NamedTuple, Optional, Tuple
+
+logger = logging.getLogger("Dispatcher")
+
+
+class Lane(IntEnum):
+    """work of a lower lane is taken first"""
+    cron = 0
+    event = 1
+
+
+@dataclass
+class Stat:
+    count: int = 0
+    total: float = 0.0
+    max: float = 0.0
+
+    def observe(self, value: float):
+        self.count += 1
+        self.total += value
+        self.max = max(self.max, value)
+
+    @property
+    def mean(self) -> float:
+        return self.total / self.count if self.count else 0.0
+
+
+@dataclass
+class HandlerMetrics:
+    depth: int = 0  # work waiting in the queue
+    running: int = 0  # work being handled
+    processed: int = 0
+    failed: int = 0
+    timeouts: int = 0
+    dropped: int = 0  # work which found the queue full for too long
+    wait_time: Stat = field(default_factory=Stat)  # seconds from enqueued to started
+    latency: Stat = field(default_factory=Stat)  # seconds the handler took
+
+
+class _Work(NamedTuple):
+    args: Tuple[Any, ...]
+    enqueued_at: float
+
+
+class HandlerQueue:
+
+    def __init__(
+        self,
+        name: str,
+        handler: Callable[..., Awaitable[Any]],
+        concurrency: int = 1,
+        maxsize: int = 1000,
+        timeout: Optional[float] = None,
+        clock: Callable[[], float] = time.monotonic,
+    ) -> None:
+        """
+        a bounded queue of one handler with its own workers.
+
+        work is sharded to workers by key, so work of the same key,
+        such as a task's id, is handled one by one in order. Every
+        worker takes work of lower lanes first.
+
+        `put` waits while the queue is full, callers are slowed down
+        instead of piling up work. A handler only blocks its own queue,
+        unrelated handlers keep running.
+
+        :param name: used in logs.
+        :param handler: an async function.
+        :param concurrency: workers count.
+        :param maxsize: work waiting in the queue at most.
+        :param timeout: seconds a handler can take, it's cancelled then.
+        :param clock: monotonic clock, injectable for testing.
+        """
+        self.name = name
+        self.handler = handler
+        self.concurrency = concurrency
+        self.timeout = timeout
+        self.clock = clock
+        self.metrics = HandlerMetrics()
+        self._shards: List[List[Deque[_Work]]] = [[deque() for _ in Lane] for _ in range(concurrency)]
+        self._ready = [asyncio.Event() for _ in range(concurrency)]
+        self._slots = asyncio.Semaphore(maxsize)
+        self._idle = asyncio.Event()
+        self._idle.set()
+        self._round_robin = itertools.cycle(range(concurrency))
+        self._workers: List[asyncio.Task] = []
+
+    def _shard(self, key: Optional[Hashable]) -> int:
+        if key is None:
+            return next(self._round_robin)
+        return hash(key) % self.concurrency
+
+    async def put(
+        self,
+        args: Tuple[Any, ...],
+        key: Optional[Hashable] = None,
+        lane: Lane = Lane.event,
+        timeout: Optional[float] = None,
+    ) -> bool:
+        """
+        enqueue arguments of the handler.
+
+        :param key: work of the same key is handled in order, `None` means any worker.
+        :param timeout: seconds to wait for room, the work is dropped then. `None` means no limit.
+        :return: `False` if dropped.
+        """
+        try:
+            await asyncio.wait_for(self._slots.acquire(), timeout)
+        except asyncio.TimeoutError:
+            self.metrics.dropped += 1
+            logger.warning(f"queue of {self.name} is full, work is dropped")
+            return False
+
+        shard = self._shard(key)
+        self._shards[shard][lane].append(_Work(args, self.clock()))
+        self.metrics.depth += 1
+        self._idle.clear()
+        self._ready[shard].set()
+        return True
+
+    async def _handle(self, work: _Work):
+        m = self.metrics
+        start = self.clock()
+        m.wait_time.observe(start - work.enqueued_at)
+        try:
+            if self.timeout is None:
+                await self.handler(*work.args)
+            else:
+                await asyncio.wait_for(self.handler(*work.args), self.timeout)
+            m.processed += 1
+        except asyncio.TimeoutError:
+            m.timeouts += 1
+            logger.error(f"{self.name} timed out after {self.timeout}s")
+        except Exception:
+            m.failed += 1
+            logger.exception(f"{self.name} failed")
+        finally:
+            m.latency.observe(self.clock() - start)
+
+    async def _work(self, i: int):
+        lanes, ready, m = self._shards[i], self._ready[i], self.metrics
+        while True:
+            lane = next((lane for lane in lanes if lane), None)
+            if lane is None:
+                ready.clear()
+                await ready.wait()
+                continue
+            work = lane.popleft()
+            m.depth -= 1
+            m.running += 1
+            self._slots.release()
+            try:
+                await self._handle(work)
+            finally:
+                m.running -= 1
+                if not m.depth and not m.running:
+                    self._idle.set()
+
+    def start(self):
+        if not self._workers:
+            self._workers = [asyncio.ensure_future(self._work(i)) for i in range(self.concurrency)]
+
+    async def join(self):
+        """wait until all work is handled"""
+        await self._idle.wait()
+
+    async def stop(self):
+        """stop workers, work in the queue is left"""
+        workers, self._workers = self._workers, []
+        for w in workers:
+            w.cancel()
+        await asyncio.gather(*workers, return_exceptions=True)
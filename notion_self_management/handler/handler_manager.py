@@ -0,0 +1,199 @@
+import asyncio
+import logging
+from dataclasses import dataclass
+from typing import Any, Awaitable, Callable, Dict, Iterable, List, Mapping, Optional, Union
+
+from notion_self_management.expression.bool_expression import ConditionType
+from notion_self_management.expression.cron import Cron
+from notion_self_management.handler.dispatcher import HandlerMetrics, HandlerQueue, Lane
+from notion_self_management.handler.rule_index import RuleIndex
+from notion_self_management.handler.scheduler import MissedPolicy, Scheduler
+from notion_self_management.task_manager.note import Note, changed_fields
+from notion_self_management.task_manager.task import Task
+
+logger = logging.getLogger("HandlerManager")
+
+Handler = Callable[..., Awaitable[Any]]
+
+
+@dataclass
+class Rule:
+    """
+    an automation, `handler` runs when `condition` is satisfied,
+    or at fire times if `condition` is a `Cron`.
+    """
+    name: str
+    condition: Union[ConditionType, Cron]
+    handler: Handler
+    queue: HandlerQueue
+
+
+class HandlerManager:
+
+    def __init__(
+        self,
+        concurrency: int = 1,
+        maxsize: int = 1000,
+        timeout: Optional[float] = None,
+        put_timeout: Optional[float] = None,
+        scheduler: Optional[Scheduler] = None,
+    ) -> None:
+        """
+        HandlerManager keeps automation rules and finds
+        the rules which an event satisfies.
+
+        rules are indexed by `RuleIndex`, so matching an
+        event doesn't check every rule.
+
+        every rule has a bounded `HandlerQueue` with its own workers.
+        Notes of the same task are handled in order, cron work is
+        taken before event work. Dispatching waits while a queue is
+        full, which slows down `TaskManager` and the change feed feeding it.
+
+        ```python
+        handlers = HandlerManager(concurrency=4, timeout=30)
+        handlers.register("done", Task.status == "done", notify)  # notify(note, previous)
+        handlers.register_cron("report", Cron("0 9 * * *"), report)  # report(fire_time)
+        manager.add_listener(handlers.dispatch)
+        handlers.start()
+        ```
+
+        :param concurrency: default workers of a rule.
+        :param maxsize: default queue size of a rule.
+        :param timeout: default seconds a handler can take.
+        :param put_timeout: seconds to wait for a full queue, work is dropped
+                            then. `None` means waiting until there is room.
+        :param scheduler: fires cron rules, a `Scheduler` is created if not given.
+        """
+        self.rules = {}  # type: Dict[str, Rule]
+        self.index = RuleIndex()
+        self.concurrency = concurrency
+        self.maxsize = maxsize
+        self.timeout = timeout
+        self.put_timeout = put_timeout
+        self.scheduler = scheduler or Scheduler()
+        self._started = False
+        self._scheduler_task = None  # type: Optional[asyncio.Task]
+
+    def _add(
+        self,
+        name: str,
+        condition: Union[ConditionType, Cron],
+        handler: Handler,
+        concurrency: Optional[int],
+        maxsize: Optional[int],
+        timeout: Optional[float],
+    ) -> Rule:
+        if name in self.rules:
+            self.unregister(name)
+        queue = HandlerQueue(
+            name,
+            handler,
+            concurrency or self.concurrency,
+            maxsize or self.maxsize,
+            timeout if timeout is not None else self.timeout,
+        )
+        rule = self.rules[name] = Rule(name, condition, handler, queue)
+        if self._started:
+            queue.start()
+        return rule
+
+    def register(
+        self,
+        name: str,
+        condition: ConditionType,
+        handler: Handler,
+        concurrency: Optional[int] = None,
+        maxsize: Optional[int] = None,
+        timeout: Optional[float] = None,
+    ) -> Rule:
+        """
+        register a rule, a rule with the same name is replaced.
+
+        `handler` takes the new note and the previous one of the task.
+        """
+        rule = self._add(name, condition, handler, concurrency, maxsize, timeout)
+        self.index.add(name, condition)
+        return rule
+
+    def register_cron(
+        self,
+        name: str,
+        cron: Cron,
+        handler: Handler,
+        policy: MissedPolicy = MissedPolicy.coalesce,
+        concurrency: Optional[int] = None,
+        maxsize: Optional[int] = None,
+        timeout: Optional[float] = None,
+    ) -> Rule:
+        """register a cron rule, `handler` takes the fire time"""
+        rule = self._add(name, cron, handler, concurrency, maxsize, timeout)
+
+        async def fire(when):
+            await rule.queue.put((when, ), lane=Lane.cron, timeout=self.put_timeout)
+
+        self.scheduler.add(name, cron, fire, policy)
+        return rule
+
+    def unregister(self, name: str):
+        rule = self.rules.pop(name)
+        if isinstance(rule.condition, Cron):
+            self.scheduler.remove(name)
+        else:
+            self.index.remove(name)
+        if self._started:
+            asyncio.ensure_future(rule.queue.stop())
+
+    def match(self, values: Mapping[str, Any], changed: Optional[Iterable[str]] = None) -> List[Rule]:
+        """
+        rules whose conditions are satisfied by values of an event.
+
+        :param values: values of variables.
+        :param changed: fields changed by the event, rules which read
+                        none of them are skipped. `None` means unknown.
+        """
+        return [self.rules[name] for name in self.index.match(values, changed)]
+
+    def match_task(self, task: Task, previous: Optional[Note] = None) -> List[Rule]:
+        """rules triggered by a task's change since its previous note"""
+        changed = changed_fields(task, previous)
+        if not changed:
+            return []
+        return self.match(vars(task), changed)
+
+    async def dispatch(self, note: Note, previous: Optional[Note] = None) -> List[Rule]:
+        """
+        enqueue a note to the handlers of rules it triggers, it's
+        a listener of `TaskManager`.
+
+        queues are waited concurrently, a full queue doesn't keep
+        work from the others.
+        """
+        rules = self.match_task(note, previous)
+        await asyncio.gather(*(
+            r.queue.put((note, previous), key=note.task_id, lane=Lane.event, timeout=self.put_timeout)
+            for r in rules))
+        return rules
+
+    def start(self):
+        """start workers of all rules and the scheduler"""
+        self._started = True
+        for rule in self.rules.values():
+            rule.queue.start()
+        if self._scheduler_task is None:
+            self._scheduler_task = asyncio.ensure_future(self.scheduler.run())
+
+    async def join(self):
+        """wait until all queued work is handled"""
+        await asyncio.gather(*(r.queue.join() for r in self.rules.values()))
+
+    async def stop(self):
+        self._started = False
+        if self._scheduler_task is not None:
+            await self.scheduler.stop()
+            await self._scheduler_task
+            self._scheduler_task = None
+        await asyncio.gather(*(r.queue.stop() for r in self.rules.values()))
+
+    def metrics(self) -> Dict[str, HandlerMetrics]:
+        return {name: r.queue.metrics for name, r in self.rules.items()}
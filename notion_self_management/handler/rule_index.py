@@ -0,0 +1,231 @@
+import logging
+from bisect import bisect_left, bisect_right
+from collections import defaultdict
+from datetime import date, datetime
+from typing import Any, Dict, FrozenSet, Hashable, Iterable, List, Mapping, Optional, Set, Tuple
+
+from notion_self_management.expression.bool_expression import Condition, ConditionList, ConditionType
+from notion_self_management.expression.compiler import Compiled, compile_condition
+from notion_self_management.expression.const import false, true
+from notion_self_management.expression.dependency import referenced_variables
+from notion_self_management.expression.ops import BoolOperator, BoolOperatorMirror, BoolOperatorNegate, LogicalOperator
+from notion_self_management.expression.variable import Variable
+
+logger = logging.getLogger("RuleIndex")
+
+# an atom is a test of one variable against a value, like `a > 1`
+Atom = Tuple[str, BoolOperator, Any]
+
+_RANGE_OPS = (BoolOperator.lt, BoolOperator.le, BoolOperator.gt, BoolOperator.ge)
+
+
+def _family(value: Any) -> Optional[Hashable]:
+    """values of the same family can be ordered together"""
+    if isinstance(value, (int, float)):  # bool as well
+        return float
+    if isinstance(value, datetime):
+        return (datetime, value.tzinfo is None)
+    if isinstance(value, (str, date)):
+        return type(value)
+    return None
+
+
+def _hashable(value: Any) -> bool:
+    try:
+        hash(value)
+    except TypeError:
+        return False
+    return True
+
+
+def _atom(c: Condition, negate: bool) -> Optional[Atom]:
+    left, right, op = c.left, c.right, c.op
+    if negate:
+        op = BoolOperatorNegate[op]
+    if isinstance(right, Variable) and not isinstance(left, Variable):
+        left, right, op = right, left, BoolOperatorMirror[op]
+    if not isinstance(left, Variable) or isinstance(right, Variable):
+        return None
+    if op == BoolOperator.eq and _hashable(right):
+        return left.name, op, right
+    if op in _RANGE_OPS and _family(right) is not None:
+        return left.name, op, right
+    return None  # `!=` matches nearly everything, it's not worth indexing
+
+
+def _cover(c: ConditionType, negate: bool = False) -> Optional[List[Atom]]:
+    """
+    atoms of which at least one must be true if `c` is true.
+
+    `None` means there is no such atoms, the rule has to be
+    checked for every event. an empty list means `c` is never true.
+    """
+    if c is true or isinstance(c, true):
+        return [] if negate else None
+    if c is false or isinstance(c, false):
+        return None if negate else []
+    if isinstance(c, Condition):
+        atom = _atom(c, negate)
+        return None if atom is None else [atom]
+    if not isinstance(c, ConditionList):
+        return None
+
+    negate = negate != c._inv
+    is_and = (c.op == LogicalOperator.and_) != negate  # De Morgan
+    covers = [_cover(clause, negate) for clause in c.clauses]
+    if is_and:
+        # any clause's cover works, prefer the most selective one
+        candidates = [cv for cv in covers if cv is not None]
+        if not candidates:
+            return None
+        return min(candidates, key=lambda cv: (len(cv), any(a[1] != BoolOperator.eq for a in cv)))
+    if any(cv is None for cv in covers):
+        return None
+    return [a for cv in covers for a in cv]
+
+
+class _Range:
+    """thresholds of one variable and one operator, sorted for bisecting"""
+
+    def __init__(self) -> None:
+        self.keys: List[Any] = []
+        self.rules: List[int] = []
+
+    def add(self, key: Any, rule: int):
+        i = bisect_right(self.keys, key)
+        self.keys.insert(i, key)
+        self.rules.insert(i, rule)
+
+    def remove(self, key: Any, rule: int):
+        i = bisect_left(self.keys, key)
+        while self.rules[i] != rule:
+            i += 1
+        del self.keys[i]
+        del self.rules[i]
+
+    def match(self, op: BoolOperator, value: Any) -> List[int]:
+        # `a > key` is true for keys before `value`
+        if op == BoolOperator.gt:
+            return self.rules[:bisect_left(self.keys, value)]
+        if op == BoolOperator.ge:
+            return self.rules[:bisect_right(self.keys, value)]
+        if op == BoolOperator.lt:
+            return self.rules[bisect_right(self.keys, value):]
+        return self.rules[bisect_left(self.keys, value):]
+
+
+class RuleIndex:
+
+    def __init__(self) -> None:
+        """
+        RuleIndex finds rules whose conditions an event may satisfy
+        without checking every rule.
+
+        every rule's condition is decomposed into a few atoms, at least
+        one of them must be true if the condition is true. Equality atoms
+        are kept in hash tables and range atoms in sorted arrays of each
+        variable, so an event only touches the rules it can satisfy.
+        Candidates are verified with the compiled condition at last.
+
+        variables read by every rule are recorded as well, if fields changed
+        by an edit are given, rules which don't read any of them are skipped.
+
+        ```python
+        index = RuleIndex()
+        index.add("done", Task.status == "done")
+        index.add("almost", (Task.percent >= 90) & (Task.is_done == False))
+        index.match({"status": "doing", "percent": 95, "is_done": False})  # ["almost"]
+        index.match({"status": "done", "percent": 95, "is_done": False}, changed={"percent"})  # ["almost"]
+        ```
+        """
+        self._seq = 0
+        self._ids: Dict[Hashable, int] = {}
+        self._rules: Dict[int, Tuple[Hashable, Compiled, Optional[List[Atom]]]] = {}
+        self._eq: Dict[str, Dict[Any, Set[int]]] = defaultdict(lambda: defaultdict(set))
+        self._ranges: Dict[Tuple[str, Hashable], Dict[BoolOperator, _Range]] = defaultdict(dict)
+        self._unindexed: Set[int] = set()
+        self._readers: Dict[str, Set[int]] = defaultdict(set)
+        self._constants: Set[int] = set()
+        self._dependencies: Dict[int, FrozenSet[str]] = {}
+
+    def __len__(self) -> int:
+        return len(self._rules)
+
+    def __contains__(self, key: Hashable) -> bool:
+        return key in self._ids
+
+    def add(self, key: Hashable, condition: ConditionType):
+        """add a rule, a rule with the same key is replaced"""
+        if key in self._ids:
+            self.remove(key)
+        self._seq += 1
+        rid = self._seq
+        cover = _cover(condition)
+        self._ids[key] = rid
+        self._rules[rid] = (key, compile_condition(condition), cover)
+
+        dependencies = referenced_variables(condition)
+        self._dependencies[rid] = dependencies
+        for name in dependencies:
+            self._readers[name].add(rid)
+        if not dependencies:
+            self._constants.add(rid)  # matches every change or none
+
+        if cover is None:
+            self._unindexed.add(rid)
+            return
+        for name, op, value in cover:
+            if op == BoolOperator.eq:
+                self._eq[name][value].add(rid)
+            else:
+                self._ranges[(name, _family(value))].setdefault(op, _Range()).add(value, rid)
+
+    def remove(self, key: Hashable):
+        rid = self._ids.pop(key)
+        _, _, cover = self._rules.pop(rid)
+        for name in self._dependencies.pop(rid):
+            self._readers[name].discard(rid)
+        self._constants.discard(rid)
+        if cover is None:
+            self._unindexed.discard(rid)
+            return
+        for name, op, value in cover:
+            if op == BoolOperator.eq:
+                self._eq[name][value].discard(rid)
+            else:
+                self._ranges[(name, _family(value))][op].remove(value, rid)
+
+    def candidates(self, values: Mapping[str, Any], changed: Optional[Iterable[str]] = None) -> Set[int]:
+        """rules which may be satisfied by `values` and read any of the `changed` fields if given"""
+        if changed is not None:
+            changed = frozenset(changed)
+            readers = [self._readers.get(name, ()) for name in changed]
+            if sum(map(len, readers)) <= len(values):
+                # few rules read the changed fields, cheaper than looking up the index
+                return self._constants.union(*readers)
+        found = set(self._unindexed)
+        for name, value in values.items():
+            by_value = self._eq.get(name)
+            if by_value and _hashable(value):
+                found.update(by_value.get(value, ()))
+            ranges = self._ranges.get((name, _family(value)))
+            if ranges:
+                for op, r in ranges.items():
+                    found.update(r.match(op, value))
+        if changed is None:
+            return found
+        return {rid for rid in found if rid in self._constants or not self._dependencies[rid].isdisjoint(changed)}
+
+    def match(self, values: Mapping[str, Any], changed: Optional[Iterable[str]] = None) -> List[Hashable]:
+        """keys of rules satisfied by `values`, in the order they are added"""
+        matched = []
+        for rid in sorted(self.candidates(values, changed)):
+            key, f, _ = self._rules[rid]
+            try:
+                if f(values):
+                    matched.append(key)
+            except ValueError:  # a variable of the rule is not in the event
+                continue
+            except Exception as ex:  # such as comparing `None`, other rules still match
+                logger.warning(f"rule {key!r} failed on the event: {ex!r}")
+        return matched
@@ -0,0 +1,239 @@
+import asyncio
+import heapq
+import logging
+from dataclasses import dataclass
+from datetime import datetime, timedelta
+from enum import Enum
+from typing import Any, Awaitable, Callable, Dict, Hashable, Iterable, List, Optional, Set, Tuple
+
+from notion_self_management.client.watermark import WatermarkStore
+from notion_self_management.expression.cron import Cron
+
+logger = logging.getLogger("Scheduler")
+
+Clock = Callable[[], datetime]
+JobCallback = Callable[[datetime], Awaitable[Any]]
+
+
+class MissedPolicy(Enum):
+    """what to do with fire times missed while the scheduler was down"""
+    skip = "skip"
+    coalesce = "coalesce"  # fire once at the latest missed time
+    replay = "replay"  # fire every missed time in order
+
+
+@dataclass
+class Job:
+    key: Hashable
+    cron: Cron
+    callback: JobCallback
+    policy: MissedPolicy = MissedPolicy.coalesce
+    next_time: Optional[datetime] = None
+    last_fired: Optional[datetime] = None
+    # the sequence of its latest heap entry, stale entries are skipped
+    generation: int = 0
+
+
+class Scheduler:
+
+    def __init__(
+        self,
+        clock: Clock = datetime.now,
+        store: Optional[WatermarkStore] = None,
+        key_prefix: str = "cron:",
+    ) -> None:
+        """
+        Scheduler fires cron jobs with a single timer heap.
+
+        the heap holds the next fire time of every job, adding and
+        firing a job cost O(log n). Removed or rescheduled jobs leave
+        stale entries which are skipped when popped.
+
+        ```python
+        scheduler = Scheduler()
+        scheduler.add("daily report", Cron("0 9 * * *"), report)
+        await scheduler.run()
+        ```
+
+        if a store is given, the last fire time of every job is persisted.
+        When a job is added again after a restart, fire times missed since
+        then are handled by the job's `MissedPolicy`. They are enumerated
+        lazily from the cron expression, coalescing costs the same however
+        long the scheduler was down.
+
+        ```python
+        scheduler = Scheduler(store=FileWatermarkStore("cron.json"))
+        scheduler.add("daily report", Cron("0 9 * * *"), report, MissedPolicy.replay)
+        await scheduler.run()  # reports missed since the last run are sent first
+        ```
+
+        :param clock: returns now, it can be replaced in tests.
+        :param store: persists the last fire time of jobs.
+        :param key_prefix: prefix of keys in the store, job keys are
+                           converted to strings.
+        """
+        self.clock = clock
+        self.store = store
+        self.key_prefix = key_prefix
+        self.jobs: Dict[Hashable, Job] = {}
+        self._heap: List[Tuple[datetime, int, Hashable]] = []
+        self._seq = 0
+        self._wakeup = asyncio.Event()
+        self._stopped = asyncio.Event()
+        self._running: Set[asyncio.Task] = set()
+        self._restoring: Dict[Hashable, Job] = {}
+
+    def __len__(self) -> int:
+        return len(self.jobs)
+
+    def _push(self, job: Job, when: datetime):
+        self._seq += 1
+        job.generation = self._seq
+        job.next_time = when
+        heapq.heappush(self._heap, (when, self._seq, job.key))
+        self._wakeup.set()
+
+    def add(
+        self,
+        key: Hashable,
+        cron: Cron,
+        callback: JobCallback,
+        policy: MissedPolicy = MissedPolicy.coalesce,
+        after: Optional[datetime] = None,
+    ) -> Job:
+        """
+        schedule a job, a job with the same key is replaced.
+
+        with a store, the job is scheduled by `restore` which
+        `run` calls, missed fire times are handled then.
+
+        :param callback: an async function which takes the fire time.
+        :param policy: how to handle fire times missed while the scheduler was down.
+        :param after: fires later than it, defaults to now.
+        """
+        job = Job(key, cron, callback, policy)
+        self.jobs[key] = job
+        if self.store is not None and after is None:
+            self._restoring[key] = job
+            job.generation = -1  # not in the heap yet
+            self._wakeup.set()
+        else:
+            self._push(job, cron.next(after or self.clock()))
+        return job
+
+    def remove(self, key: Hashable):
+        self.jobs.pop(key)
+        self._restoring.pop(key, None)
+
+    def _store_key(self, job: Job) -> str:
+        return f"{self.key_prefix}{job.key}"
+
+    async def _save(self, job: Job, when: datetime):
+        if job.last_fired is not None and when <= job.last_fired:
+            return  # a later fire finished first
+        job.last_fired = when
+        if self.store is not None:
+            await self.store.save(self._store_key(job), {"last_fired": when.isoformat()})
+
+    async def restore(self):
+        """load last fire times of added jobs, and fire what they missed"""
+        restoring, self._restoring = self._restoring, {}
+        for job in restoring.values():
+            watermark = await self.store.load(self._store_key(job))  # type: ignore
+            now = self.clock()
+            if not watermark:
+                await self._save(job, now)  # fire times after now will be caught up
+                self._push(job, job.cron.next(now))
+                continue
+
+            job.last_fired = datetime.fromisoformat(watermark["last_fired"])
+            if job.policy == MissedPolicy.replay:
+                missed: Iterable[datetime] = job.cron.iter(job.last_fired, now)
+            elif job.policy == MissedPolicy.coalesce:
+                # the latest fire time no later than now
+                latest = job.cron.prev(now.replace(second=0, microsecond=0) + timedelta(minutes=1))
+                missed = [latest] if latest > job.last_fired else []
+            else:
+                missed = []
+            self._spawn(self._catch_up(job, missed, now))
+
+    async def _catch_up(self, job: Job, missed: Iterable[datetime], now: datetime):
+        count = 0
+        for when in missed:
+            await self._fire(job, when)
+            count += 1
+        if count:
+            logger.info(f"job {job.key} caught up {count} missed fires")
+        if self.jobs.get(job.key) is job:
+            self._push(job, job.cron.next(max(now, job.last_fired or now)))
+
+    def _pop(self, now: datetime) -> Optional[Tuple[Job, datetime]]:
+        """pop a due job"""
+        while self._heap and self._heap[0][0] <= now:
+            when, seq, key = heapq.heappop(self._heap)
+            job = self.jobs.get(key)
+            if job is None or job.generation != seq:
+                continue  # removed or rescheduled
+            return job, when
+        return None
+
+    def _peek(self) -> Optional[datetime]:
+        while self._heap:
+            when, seq, key = self._heap[0]
+            job = self.jobs.get(key)
+            if job is not None and job.generation == seq:
+                return when
+            heapq.heappop(self._heap)
+        return None
+
+    async def _fire(self, job: Job, when: datetime):
+        try:
+            await job.callback(when)
+        except Exception:
+            logger.exception(f"job {job.key} failed at {when}")
+            return
+        await self._save(job, when)
+
+    def _spawn(self, coro: Awaitable[Any]):
+        task = asyncio.ensure_future(coro)
+        self._running.add(task)
+        task.add_done_callback(self._running.discard)
+
+    def run_pending(self) -> List[Tuple[Hashable, datetime]]:
+        """
+        start jobs which are due, their next fire times are scheduled.
+
+        jobs run concurrently in tasks, a fire time passed while the
+        scheduler is blocked only fires once.
+        """
+        now = self.clock()
+        fired = []
+        while True:
+            popped = self._pop(now)
+            if popped is None:
+                return fired
+            job, when = popped
+            self._spawn(self._fire(job, when))
+            fired.append((job.key, when))
+            self._push(job, job.cron.next(max(when, now)))
+
+    async def run(self):
+        """run jobs until `stop` is called"""
+        self._stopped.clear()
+        while not self._stopped.is_set():
+            if self._restoring:
+                await self.restore()
+            self.run_pending()
+            self._wakeup.clear()
+            when = self._peek()
+            timeout = None if when is None else max((when - self.clock()).total_seconds(), 0)
+            waits = [asyncio.ensure_future(self._wakeup.wait()), asyncio.ensure_future(self._stopped.wait())]
+            await asyncio.wait(waits, timeout=timeout, return_when=asyncio.FIRST_COMPLETED)
+            for w in waits:
+                w.cancel()
+
+    async def stop(self, wait: bool = True):
+        """stop running, running jobs are awaited if `wait`"""
+        self._stopped.set()
+        if wait and self._running:
+            await asyncio.gather(*self._running, return_exceptions=True)
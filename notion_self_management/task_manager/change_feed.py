@@ -0,0 +1,143 @@
+import asyncio
+import datetime
+import hashlib
+import json
+import logging
+from dataclasses import asdict
+from typing import Any, Awaitable, Callable, Dict, Iterable, List, Optional
+
+from notion_self_management.client.notion_client.client import Notion
+from notion_self_management.client.watermark import WatermarkStore
+from notion_self_management.task_manager.task import Task
+
+logger = logging.getLogger("ChangeFeed")
+
+
+def _digest(task: Task) -> str:
+    """a digest of a task's content, stable across processes"""
+    content = json.dumps(asdict(task), sort_keys=True, default=str)
+    return hashlib.blake2b(content.encode(), digest_size=8).hexdigest()
+
+
+class ChangeFeed:
+
+    def __init__(
+        self,
+        source: Notion,
+        sink: Callable[[Task], Awaitable[Any]],
+        store: WatermarkStore,
+        interval: float = 30.0,
+        checkpoint_every: int = 100,
+    ) -> None:
+        """
+        ChangeFeed polls a Notion database for changed tasks.
+
+        a `last_edited_time` watermark is persisted for the database,
+        every poll only queries tasks edited since the watermark in
+        ascending order, so the cost of a poll grows with the number
+        of changes instead of the size of the database.
+
+        Notion's `last_edited_time` is rounded to minutes, several tasks
+        or edits can share the watermark's timestamp. Ids and digests of
+        tasks at the watermark are kept, the next poll skips a task only
+        if it's unchanged, so an edit in the same minute is still sent.
+        `TaskManager`'s default idempotent function compares `update_time`
+        only, give it one comparing content to note such edits, like
+        `lambda t, n: not changed_fields(t, n)`.
+
+        ```python
+        feed = ChangeFeed(notion, manager.take_note, FileWatermarkStore("watermarks.json"))
+        await feed.run()
+        ```
+
+        :param source: a Notion client whose model is `Task`.
+        :param sink: receives every changed task, usually `TaskManager.take_note`.
+        :param store: persists the watermark.
+        :param interval: seconds between polls.
+        :param checkpoint_every: the watermark is saved every this many
+                                 changes, a crash only re-emits changes
+                                 since the last checkpoint.
+        """
+        self.source = source
+        self.sink = sink
+        self.store = store
+        self.interval = interval
+        self.checkpoint_every = checkpoint_every
+        self.key = f"change_feed:{source.database_id}"
+        self._stopped = asyncio.Event()
+
+    async def _load(self):
+        watermark = await self.store.load(self.key) or {}
+        since = watermark.get("time")
+        seen = watermark.get("seen") or {}
+        if isinstance(seen, list):  # ids only, written by an earlier version, they are sent again
+            seen = {}
+        return (since and datetime.datetime.fromisoformat(since)), seen
+
+    async def _save(self, since: Optional[datetime.datetime], seen: Dict[str, str]):
+        value: Dict[str, Any] = {"time": since and since.isoformat(), "seen": dict(sorted(seen.items()))}
+        await self.store.save(self.key, value)
+
+    async def poll(self) -> List[Task]:
+        """query tasks changed since the watermark and send them to the sink"""
+        since, seen = await self._load()
+        conditions = (Task.update_time >= since) if since else None
+
+        changed = []
+        async for task in self.source.iter_rows(conditions, order_by=[Task.update_time]):
+            digest = _digest(task)
+            if since and (task.update_time < since or (task.update_time == since and seen.get(task.task_id) == digest)):
+                continue
+
+            await self.sink(task)
+            changed.append(task)
+
+            if task.update_time != since:
+                since, seen = task.update_time, {}
+            seen[task.task_id] = digest
+
+            if len(changed) % self.checkpoint_every == 0:
+                await self._save(since, seen)
+
+        if changed:
+            await self._save(since, seen)
+            logger.debug(f"{len(changed)} tasks changed, watermark is {since}")
+        return changed
+
+    async def refresh(self, ids: Iterable[str]) -> List[Task]:
+        """
+        fetch tasks by ids and send them to the sink, such as pages
+        named by webhook notifications, without waiting for a poll.
+
+        the watermark is untouched, the next poll may send these tasks
+        again, `TaskManager.take_note` skips tasks which are unchanged.
+        Tasks which can't be fetched are left to the next poll.
+        """
+        ids = list(ids)
+        results = await asyncio.gather(*(self.source.get(i) for i in ids), return_exceptions=True)
+        changed = []
+        for t_id, task in zip(ids, results):
+            if isinstance(task, BaseException):
+                logger.error(f"fetching task {t_id} failed: {task!r}")
+                continue
+            if task is None:
+                continue  # not found
+            await self.sink(task)
+            changed.append(task)
+        return changed
+
+    async def run(self):
+        """poll until `stop` is called"""
+        self._stopped.clear()
+        while not self._stopped.is_set():
+            try:
+                await self.poll()
+            except Exception:
+                logger.exception("polling changes failed")
+            try:
+                await asyncio.wait_for(self._stopped.wait(), self.interval)
+            except asyncio.TimeoutError:
+                pass
+
+    def stop(self):
+        self._stopped.set()
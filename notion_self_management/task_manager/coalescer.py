@@ -0,0 +1,135 @@
+import asyncio
+import logging
+import time
+from dataclasses import dataclass
+from typing import Any, Awaitable, Callable, Dict, List, Set
+
+from notion_self_management.task_manager.task import Task
+from notion_self_management.task_manager.timer_wheel import TimerWheel
+
+logger = logging.getLogger("Coalescer")
+
+
+@dataclass
+class CoalescerMetrics:
+    submitted: int = 0
+    coalesced: int = 0  # submitted while an earlier change of the task was pending
+    flushed: int = 0
+    failed: int = 0
+
+
+class Coalescer:
+
+    def __init__(
+        self,
+        sink: Callable[[Task], Awaitable[Any]],
+        quiet: float = 2.0,
+        max_delay: float = 10.0,
+        resolution: float = 0.05,
+        slots: int = 1024,
+        concurrency: int = 16,
+        clock: Callable[[], float] = time.monotonic,
+    ) -> None:
+        """
+        Coalescer collapses rapid changes of a task into one, it's put
+        in front of `TaskManager.take_note`.
+
+        a submitted task is held until no change of it is submitted for
+        `quiet` seconds, then only its latest state is sent to the sink.
+        A task which keeps changing is sent `max_delay` seconds after its
+        first pending change at the latest.
+
+        deadlines are kept in a `TimerWheel`, so submitting costs O(1)
+        however many tasks are pending. Due tasks are sent in background,
+        at most `concurrency` at a time, so a slow sink doesn't delay other
+        deadlines. `TaskManager` keeps notes of a task in order.
+
+        ```python
+        coalescer = Coalescer(manager.take_note, quiet=2, max_delay=10)
+        manager.set_note_sink(coalescer.submit)
+        asyncio.ensure_future(coalescer.run())
+        ```
+
+        held changes are lost if the process stops before they are sent,
+        so it mustn't be the sink of a feed which saves a durable watermark,
+        such as `ChangeFeed`, the watermark would move past them.
+
+        :param sink: receives the latest state of a task, usually `TaskManager.take_note`.
+        :param quiet: seconds without changes before a task is sent.
+        :param max_delay: seconds a change is held at most.
+        :param resolution: seconds of a tick of the timer wheel, deadlines are rounded up to it.
+        :param slots: slots of the timer wheel.
+        :param concurrency: tasks sent to the sink at the same time at most.
+        :param clock: monotonic clock, injectable for testing.
+        """
+        self.sink = sink
+        self.quiet = quiet
+        self.max_delay = max_delay
+        self.clock = clock
+        self.metrics = CoalescerMetrics()
+        self._pending: Dict[str, Task] = {}
+        self._first: Dict[str, float] = {}  # when the first pending change was submitted
+        self._wheel: TimerWheel[str] = TimerWheel(resolution, slots, clock())
+        self._semaphore = asyncio.Semaphore(concurrency)
+        self._sending: Set[asyncio.Future] = set()
+        self._wakeup = asyncio.Event()
+        self._stopped = asyncio.Event()
+
+    def __len__(self) -> int:
+        return len(self._pending)
+
+    async def submit(self, task: Task):
+        """hold a change of a task, it never waits"""
+        now = self.clock()
+        self.metrics.submitted += 1
+        first = self._first.get(task.task_id)
+        if first is None:
+            first = self._first[task.task_id] = now
+        else:
+            self.metrics.coalesced += 1
+        self._pending[task.task_id] = task
+        self._wheel.schedule(task.task_id, min(now + self.quiet, first + self.max_delay))
+        self._wakeup.set()
+
+    async def _send(self, task: Task):
+        async with self._semaphore:
+            try:
+                await self.sink(task)
+            except Exception:
+                self.metrics.failed += 1
+                logger.exception(f"sending task {task.task_id} failed")
+
+    def _take(self, task_ids: List[str]) -> List[Task]:
+        tasks = []
+        for task_id in task_ids:
+            self._first.pop(task_id, None)
+            self._wheel.cancel(task_id)
+            tasks.append(self._pending.pop(task_id))
+        self.metrics.flushed += len(tasks)
+        return tasks
+
+    async def flush(self):
+        """send all pending tasks now"""
+        await asyncio.gather(*(self._send(t) for t in self._take(list(self._pending))))
+
+    async def run(self):
+        """send due tasks until `stop` is called, pending tasks are sent then"""
+        self._stopped.clear()
+        while not self._stopped.is_set():
+            self._wakeup.clear()
+            if not len(self._wheel):
+                waits = [asyncio.ensure_future(self._wakeup.wait()), asyncio.ensure_future(self._stopped.wait())]
+                await asyncio.wait(waits, return_when=asyncio.FIRST_COMPLETED)
+                for w in waits:
+                    w.cancel()
+                continue
+            await asyncio.sleep(self._wheel.resolution)
+            for task in self._take(self._wheel.advance(self.clock())):
+                sending = asyncio.ensure_future(self._send(task))
+                self._sending.add(sending)
+                sending.add_done_callback(self._sending.discard)
+        await self.flush()
+        await asyncio.gather(*self._sending)
+
+    def stop(self):
+        self._stopped.set()
@@ -0,0 +1,229 @@
+import asyncio
+import heapq
+import logging
+import time
+from dataclasses import dataclass
+from datetime import datetime, timedelta
+from typing import Callable, Dict, List, Optional, Tuple
+
+from notion_self_management.task_manager.note import Note
+from notion_self_management.task_manager.note_chain import NoteChain
+from notion_self_management.task_manager.task_manager import TaskManager
+
+logger = logging.getLogger("Compactor")
+
+
+@dataclass
+class RetentionPolicy:
+    """
+    notes a task keeps, a note is deleted if either limit is
+    exceeded. The latest note is always kept.
+    """
+    max_notes: Optional[int] = 100
+    max_age: Optional[timedelta] = None
+
+
+@dataclass
+class CompactionMetrics:
+    observed: int = 0  # notes taken
+    tracked: int = 0  # tasks whose note counts are known
+    queued: int = 0  # tasks waiting to be compacted or counted
+    compacted: int = 0  # tasks compacted
+    deleted: int = 0  # notes deleted
+    failed: int = 0
+    busy_seconds: float = 0.0
+
+
+class Compactor:
+
+    def __init__(
+        self,
+        manager: TaskManager,
+        policy: Optional[RetentionPolicy] = None,
+        batch_size: int = 100,
+        idle_delay: float = 1.0,
+        max_delay: float = 60.0,
+        clock: Callable[[], float] = time.monotonic,
+        now: Callable[[], datetime] = datetime.now,
+    ) -> None:
+        """
+        Compactor deletes old notes in background, so taking notes
+        doesn't wait for counting or deleting them.
+
+        it listens to notes taken by `manager` and counts notes of every
+        task incrementally, a task is counted by a query once it's seen.
+        Tasks over `max_notes` are kept in a priority queue, the task with
+        the most extra notes is compacted first. Tasks with notes older
+        than `max_age` are queued by the time their oldest note expires.
+
+        compaction waits until no note is taken for `idle_delay` seconds,
+        or at most `max_delay` seconds if the manager is never idle. Notes
+        are deleted by `TaskManager.prune_notes` in batches of `batch_size`.
+
+        ```python
+        compactor = Compactor(manager, RetentionPolicy(max_notes=100, max_age=timedelta(days=90)))
+        asyncio.ensure_future(compactor.run())
+        ```
+
+        :param policy: defaults to `manager.maximum_notes` notes.
+        :param clock: monotonic clock of idle time, injectable for testing.
+        :param now: the current time which ages of notes are compared to.
+        """
+        self.manager = manager
+        self.policy = policy or RetentionPolicy(max_notes=manager.maximum_notes)
+        self.batch_size = batch_size
+        self.idle_delay = idle_delay
+        self.max_delay = max_delay
+        self.clock = clock
+        self.now = now
+        self.metrics = CompactionMetrics()
+
+        self._counts: Dict[str, int] = {}
+        self._oldest: Dict[str, datetime] = {}
+        self._uncounted: Dict[str, None] = {}  # an ordered set
+        # heaps of `(priority, seq, task_id)`, an entry is valid if its seq is the latest of the task
+        self._over: List[Tuple[int, int, str]] = []
+        self._over_seq: Dict[str, int] = {}
+        self._expiring: List[Tuple[datetime, int, str]] = []
+        self._expiring_seq: Dict[str, int] = {}
+        self._seq = 0
+        self._last_activity = float("-inf")
+        self._wakeup = asyncio.Event()
+        self._stopped = asyncio.Event()
+        manager.add_listener(self.observe)
+
+    def _update_gauges(self):
+        self.metrics.tracked = len(self._counts)
+        self.metrics.queued = len(self._over_seq) + len(self._expiring_seq) + len(self._uncounted)
+
+    def _schedule(self, task_id: str):
+        count, policy = self._counts[task_id], self.policy
+        if policy.max_notes and count > policy.max_notes:
+            self._seq += 1
+            self._over_seq[task_id] = self._seq
+            heapq.heappush(self._over, (policy.max_notes - count, self._seq, task_id))
+        if policy.max_age and count > 1 and task_id not in self._expiring_seq:
+            self._seq += 1
+            self._expiring_seq[task_id] = self._seq
+            heapq.heappush(self._expiring, (self._oldest[task_id] + policy.max_age, self._seq, task_id))
+        self._update_gauges()
+
+    async def observe(self, note: Note, previous: Optional[Note] = None):
+        """a listener of `TaskManager`, it never waits"""
+        self.metrics.observed += 1
+        self._last_activity = self.clock()
+        count = self._counts.get(note.task_id)
+        if count is None:
+            self._uncounted[note.task_id] = None
+            self._update_gauges()
+        else:
+            # truncated notes are not seen, a count is corrected when the task is compacted
+            self._counts[note.task_id] = count + 1
+            self._schedule(note.task_id)
+        self._wakeup.set()
+
+    def _next_due(self) -> Optional[str]:
+        """the task to compact or count next"""
+        while self._over:
+            _, seq, task_id = heapq.heappop(self._over)
+            if self._over_seq.get(task_id) == seq:
+                del self._over_seq[task_id]
+                return task_id
+        now = self.now()
+        while self._expiring and self._expiring[0][0] <= now:
+            _, seq, task_id = heapq.heappop(self._expiring)
+            if self._expiring_seq.get(task_id) == seq:
+                del self._expiring_seq[task_id]
+                return task_id
+        if self._uncounted:
+            task_id = next(iter(self._uncounted))
+            del self._uncounted[task_id]
+            return task_id
+        return None
+
+    def _expired(self, chain: NoteChain) -> int:
+        """count of notes to delete by the policy"""
+        policy, count = self.policy, 0
+        if policy.max_notes:
+            count = len(chain) - policy.max_notes
+        if policy.max_age:
+            count = max(count, chain.count_before(self.now() - policy.max_age))
+        return min(count, len(chain) - 1)
+
+    async def compact(self, task_id: str) -> int:
+        """delete notes of a task beyond the policy, return the count deleted"""
+        chain = await self.manager.get_chain(task_id)
+        deleted = 0
+        while True:
+            count = min(self._expired(chain), self.batch_size)
+            if count <= 0:
+                break
+            pruned = await self.manager.prune_notes(task_id, count)
+            deleted += pruned
+            if pruned < count:
+                break  # failures are logged by the manager
+            await asyncio.sleep(0)  # let others run between batches
+
+        self._over_seq.pop(task_id, None)
+        self._expiring_seq.pop(task_id, None)
+        self._counts[task_id] = len(chain)
+        if len(chain):
+            self._oldest[task_id] = chain.time_at(0)
+        self._schedule(task_id)
+
+        if deleted:
+            self.metrics.compacted += 1
+            self.metrics.deleted += deleted
+            logger.debug(f"{deleted} notes of task {task_id} are deleted")
+        return deleted
+
+    async def _wait(self, timeout: Optional[float]):
+        waits = [asyncio.ensure_future(self._wakeup.wait()), asyncio.ensure_future(self._stopped.wait())]
+        await asyncio.wait(waits, timeout=timeout, return_when=asyncio.FIRST_COMPLETED)
+        for w in waits:
+            w.cancel()
+
+    async def _wait_idle(self):
+        deadline = self.clock() + self.max_delay
+        while not self._stopped.is_set():
+            idle_at = min(self._last_activity + self.idle_delay, deadline)
+            if self.clock() >= idle_at:
+                return
+            await asyncio.sleep(idle_at - self.clock())
+
+    def _until_expiring(self) -> Optional[float]:
+        """seconds until the oldest note of a task expires"""
+        while self._expiring:
+            when, seq, task_id = self._expiring[0]
+            if self._expiring_seq.get(task_id) == seq:
+                return max((when - self.now()).total_seconds(), 0)
+            heapq.heappop(self._expiring)
+        return None
+
+    async def run(self):
+        """compact tasks until `stop` is called"""
+        self._stopped.clear()
+        while not self._stopped.is_set():
+            self._wakeup.clear()
+            if not self._over_seq and not self._uncounted:
+                timeout = self._until_expiring()
+                if timeout is None or timeout > 0:
+                    await self._wait(timeout)
+                    continue
+
+            await self._wait_idle()
+            task_id = self._next_due()
+            if task_id is None:
+                continue
+            start = self.clock()
+            try:
+                await self.compact(task_id)
+            except Exception:
+                self.metrics.failed += 1
+                logger.exception(f"compacting notes of task {task_id} failed")
+            finally:
+                self.metrics.busy_seconds += self.clock() - start
+                self._update_gauges()
+
+    def stop(self):
+        self._stopped.set()
@@ -0,0 +1,48 @@
+import asyncio
+from contextlib import asynccontextmanager
+from typing import AsyncIterator, Dict, Generic, Hashable, TypeVar
+
+K = TypeVar("K", bound=Hashable)
+
+
+class KeyedLock(Generic[K]):
+
+    def __init__(self) -> None:
+        """
+        an asyncio lock for every key, such as a task id.
+
+        holders of the same key run one by one in the order they
+        arrived, different keys don't wait for each other. A lock
+        is dropped once nobody holds or waits for it, so only keys
+        in use take memory.
+
+        ```python
+        locks = KeyedLock()
+        async with locks.hold(task.task_id):
+            ...
+        ```
+        """
+        self._locks: Dict[K, asyncio.Lock] = {}
+        self._users: Dict[K, int] = {}
+
+    def __len__(self) -> int:
+        return len(self._locks)
+
+    def locked(self, key: K) -> bool:
+        lock = self._locks.get(key)
+        return lock is not None and lock.locked()
+
+    @asynccontextmanager
+    async def hold(self, key: K) -> AsyncIterator[None]:
+        lock = self._locks.get(key)
+        if lock is None:
+            lock = self._locks[key] = asyncio.Lock()
+        self._users[key] = self._users.get(key, 0) + 1
+        try:
+            async with lock:
+                yield
+        finally:
+            self._users[key] -= 1
+            if not self._users[key]:
+                del self._users[key]
+                del self._locks[key]
@@ -1,6 +1,6 @@
-from dataclasses import dataclass
+from dataclasses import fields
 from datetime import datetime
-from typing import Optional
+from typing import FrozenSet, List, Optional
 
 from notion_self_management.expression.utils import dataclass_filter
 from notion_self_management.task_manager.task import Task
@@ -22,3 +22,20 @@ class Note(Task):
     note_time: datetime
     previous: Optional[str]  # a previous version str
     # following: Optional[str]
+    # fields stored in a delta note, others are inherited from the previous
+    # note. `None` means a full note, see `DeltaNoteClient`.
+    delta: Optional[List[str]] = None
+    depth: int = 0  # notes since the last full note
+
+
+_TASK_FIELDS = tuple(f.name for f in fields(Task))
+
+
+def changed_fields(task: Task, note: Optional[Note]) -> FrozenSet[str]:
+    """
+    fields of a task which differ from its previous note,
+    all fields are changed if there is no note yet.
+    """
+    if note is None:
+        return frozenset(_TASK_FIELDS)
+    return frozenset(name for name in _TASK_FIELDS if getattr(task, name) != getattr(note, name))
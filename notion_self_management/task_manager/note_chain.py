@@ -0,0 +1,74 @@
+from bisect import bisect_left, insort
+from datetime import datetime
+from typing import Dict, Iterable, List, Optional, Tuple
+
+from notion_self_management.task_manager.note import Note
+
+
+class NoteChain:
+
+    def __init__(self, notes: Iterable[Note] = ()) -> None:
+        """
+        versions of a task's notes sorted by note time.
+
+        a task's notes form a single chain since `take_note` truncates
+        branches, so sorting by note time orders them as the chain.
+        The position of a version is found by bisecting, jumping to the
+        k-th note or finding notes after a version doesn't walk the
+        chain through `previous`.
+
+        ```python
+        chain = NoteChain(await note_db.lists_all(Note.task_id == "t1"))
+        chain.version_at(-2)  # the note before the head
+        chain.after("v2")  # versions following v2
+        ```
+        """
+        self._keys: List[Tuple[datetime, str]] = sorted((n.note_time, n.version) for n in notes)
+        self._times: Dict[str, datetime] = {version: time for time, version in self._keys}
+
+    def __len__(self) -> int:
+        return len(self._keys)
+
+    def __contains__(self, version: str) -> bool:
+        return version in self._times
+
+    def add(self, note: Note):
+        if note.version in self._times:
+            self.remove(note.version)
+        insort(self._keys, (note.note_time, note.version))
+        self._times[note.version] = note.note_time
+
+    def remove(self, version: str):
+        time = self._times.pop(version, None)
+        if time is not None:
+            del self._keys[self.position(version, time)]
+
+    def position(self, version: str, time: Optional[datetime] = None) -> int:
+        """index of a version in the chain, `KeyError` is raised if it's not in"""
+        key = (time or self._times[version], version)
+        i = bisect_left(self._keys, key)
+        if i == len(self._keys) or self._keys[i] != key:
+            raise KeyError(version)
+        return i
+
+    def version_at(self, k: int) -> str:
+        """the k-th version from the oldest, negative counts from the head"""
+        return self._keys[k][1]
+
+    def time_at(self, k: int) -> datetime:
+        return self._keys[k][0]
+
+    def count_before(self, time: datetime) -> int:
+        """count of notes taken before a time"""
+        return bisect_left(self._keys, (time, ""))
+
+    def versions(self, start: int = 0, stop: Optional[int] = None) -> List[str]:
+        return [version for _, version in self._keys[start:stop]]
+
+    def after(self, version: str) -> List[str]:
+        """versions following a version, they are truncated if it's reverted to"""
+        return self.versions(self.position(version) + 1)
+
+    @property
+    def head(self) -> Optional[str]:
+        return self._keys[-1][1] if self._keys else None
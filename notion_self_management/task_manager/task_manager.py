@@ -1,15 +1,25 @@
+import asyncio
 import datetime
 import logging
-import time
 from dataclasses import asdict
-from typing import Callable, List, Optional
+from typing import Any, Awaitable, Callable, List, Optional
 
 from notion_self_management.client.client import Client
+from notion_self_management.expression.bool_expression import and_
+from notion_self_management.task_manager.cache import LRUCache
+from notion_self_management.task_manager.locks import KeyedLock
 from notion_self_management.task_manager.note import Note
+from notion_self_management.task_manager.note_chain import NoteChain
 from notion_self_management.task_manager.task import Task
+from notion_self_management.task_manager.version import VersionGenerator
 
 logger = logging.getLogger("TaskManager")
 
+# takes a new note and the previous note of the task
+NoteListener = Callable[[Note, Optional[Note]], Awaitable[Any]]
+# takes an updated task, it's noted later
+NoteSink = Callable[[Task], Awaitable[Any]]
+
 
 class TaskManager:
 
@@ -17,8 +27,11 @@ class TaskManager:
         self,
         data_client: Client[Task],
         note_client: Client[Note],
-        maximum_notes: int = 100,
+        maximum_notes: Optional[int] = 100,
         idempotent_function: Callable[[Task, Note], bool] = lambda t, n: t.update_time == n.update_time,
+        head_cache_size: int = 1024,
+        chain_cache_size: int = 256,
+        version_generator: Optional[VersionGenerator] = None,
     ) -> None:
         """
         TaskManager is a core role in this project
@@ -36,22 +49,64 @@ class TaskManager:
 
         :param data_client: user data client
         :param note_client: note data client
-        :param maximum_note: After a note is taken, TaskManager will check
-                             if a task's notes have reach them maximum count.
-                             the oldest note will be deleted permanently.
-                             `None` means there is not limits.
-                             defaults to 100
+        :param maximum_notes: notes of a task are kept at most, the oldest
+                              notes are deleted permanently by `Compactor`
+                              in background, taking notes never waits for it.
+                              `None` means there is not limits.
+                              defaults to 100
         :param idempotent_function: when a note is taken, `idempotent_function` is
                                     used to determine weather a note is actually
                                     modified. default idempotent function will com-
                                     pare Task's `update_date` with it's latest note's
                                     `idempotent_function` is a Callable takes a `Note`
                                     instance and a `Task` instance and return bool type.
+        :param head_cache_size: the latest note of recently used tasks are cached,
+                                the cache is kept up to date by notes taken or
+                                deleted by this manager. If notes are modified
+                                elsewhere, call `invalidate` to drop the cache.
+                                `0` means no cache. defaults to 1024
+        :param chain_cache_size: `NoteChain` of recently used tasks are cached,
+                                 they are loaded by a query and kept up to date
+                                 like the latest notes. defaults to 256
+        :param version_generator: generates versions of notes, give every process
+                                  sharing a note client a distinct `node`.
         """
         self.task_db = data_client
         self.note_db = note_client
-        self._maximum_notes = maximum_notes
+        self.maximum_notes = maximum_notes
         self._is_idempotent = idempotent_function
+        self._heads = LRUCache(head_cache_size)  # type: LRUCache[str, Note]
+        self._chains = LRUCache(chain_cache_size)  # type: LRUCache[str, NoteChain]
+        self._versions = version_generator or VersionGenerator()
+        self._locks = KeyedLock()  # type: KeyedLock[str]
+        self._listeners = []  # type: List[NoteListener]
+        self._note_sink = None  # type: Optional[NoteSink]
+
+    def add_listener(self, listener: NoteListener):
+        """
+        listeners are awaited in order after a new note is taken,
+        such as `HandlerManager.dispatch`. A slow listener slows
+        down taking notes, errors of listeners are only logged.
+        """
+        self._listeners.append(listener)
+
+    def remove_listener(self, listener: NoteListener):
+        self._listeners.remove(listener)
+
+    def set_note_sink(self, sink: Optional[NoteSink]):
+        """
+        tasks updated by `update_task_later` are sent to the sink
+        instead of being noted at once, such as `Coalescer.submit`
+        which collapses rapid edits of a task into one note. `None`
+        takes notes at once again.
+
+        ```python
+        coalescer = Coalescer(manager.take_note)
+        manager.set_note_sink(coalescer.submit)
+        asyncio.ensure_future(coalescer.run())
+        ```
+        """
+        self._note_sink = sink
 
     async def get_task_by_id(self, task_id: str) -> Optional[Task]:
         """
@@ -77,11 +132,25 @@ class TaskManager:
     async def update_task(self, task: Task) -> Optional[Note]:
         """
         Update task will return the current note of the task.
+        The note is always taken at once, see `update_task_later`.
         """
         t = await self._update_task(task)
         if not t:
             return
-        return self.take_note(t)
+        return await self.take_note(t)
+
+    async def update_task_later(self, task: Task) -> Optional[Task]:
+        """
+        update a task and send it to the note sink, its note is taken
+        later. The note is taken at once if no sink is set.
+
+        :return: the updated task, `None` if it's not found.
+        """
+        t = await self._update_task(task)
+        if not t:
+            return None
+        await (self._note_sink or self.take_note)(t)
+        return t
 
     async def delete_task(self, task: Task) -> Optional[Note]:
         """
@@ -92,11 +161,29 @@ class TaskManager:
         return await self.update_task(task)
 
     # NOTES METHODS
+    def invalidate(self, task_id: Optional[str] = None):
+        """
+        drop the cached latest note of a task, or of all
+        tasks if `task_id` is `None`. It should be called
+        when notes are modified without this manager.
+        """
+        if task_id is None:
+            self._heads.clear()
+            self._chains.clear()
+        else:
+            self._heads.pop(task_id)
+            self._chains.pop(task_id)
+
     async def get_current_note_by_task(self, task_id: str) -> Optional[Note]:
         """Get the latest Note of a Task"""
-        notes = await self.note_db.lists(Note.task_id == task_id, limit=1, order_by=[Note.note_time])
+        head = self._heads.get(task_id)
+        if head is not None:
+            return head
+
+        notes = await self.note_db.lists(Note.task_id == task_id, limit=1, order_by=[Note.note_time], desc=True)
         if not notes:
             return
+        self._heads.put(task_id, notes[0])
         return notes[0]
 
     async def get_note(self, version: str) -> Optional[Note]:
@@ -118,24 +205,102 @@ class TaskManager:
             return
         return notes[0]
 
-    async def _check_maximum(self, note: Note):
-        if self._maximum_notes:
-            outdate_note = await self.note_db.lists(
-                Note.task_id == note.task_id,
-                offset=self._maximum_notes,
-                order_by=[Note.note_time],
-            )
-            await self.delete_notes(outdate_note)
+    async def get_chain(self, task_id: str) -> NoteChain:
+        """versions of a task's notes in order, it's loaded by one query and cached"""
+        chain = self._chains.get(task_id)
+        if chain is None:
+            chain = NoteChain(await self.note_db.lists_all(Note.task_id == task_id))
+            self._chains.put(task_id, chain)
+        return chain
+
+    async def get_note_at(self, task_id: str, k: int) -> Optional[Note]:
+        """
+        the k-th note of a task from the oldest, negative counts
+        from the latest, such as `-2` for the note before it.
+        """
+        chain = await self.get_chain(task_id)
+        if not -len(chain) <= k < len(chain):
+            return None
+        return await self.get_note(chain.version_at(k))
+
+    async def list_notes(self, task_id: str, start: int = 0, stop: Optional[int] = None) -> List[Note]:
+        """notes of a task from the `start`-th to the `stop`-th in order, by one query"""
+        chain = await self.get_chain(task_id)
+        versions = chain.versions(start, stop)
+        if not versions:
+            return []
+        # stores like MongoDB keep milliseconds while notes taken here keep microseconds,
+        # the bounds are widened to milliseconds and notes are picked by version
+        lower, upper = chain.time_at(chain.position(versions[0])), chain.time_at(chain.position(versions[-1]))
+        notes = await self.note_db.lists(
+            and_(Note.task_id == task_id, Note.note_time >= lower.replace(microsecond=lower.microsecond // 1000 * 1000),
+                 Note.note_time <= upper),
+        )
+        wanted = set(versions)
+        notes = [n for n in notes if n.version in wanted]
+        notes.sort(key=lambda n: chain.position(n.version))
+        return notes
+
+    async def prune_notes(self, task_id: str, count: int) -> int:
+        """
+        delete the oldest `count` notes of a task *permanently*,
+        the latest note is always kept.
+
+        unlike `delete_notes`, the notes are followed by others,
+        the oldest note left becomes the root of the chain.
+
+        ```text
+        v1 -> v2 -> v3 -> v4
+
+        prune_notes(task_id, 2)
 
-    @staticmethod
-    def _get_notes_version() -> str:
+        v3 -> v4
+        ```
+
+        :return: count of notes deleted.
+        """
+        async with self._locks.hold(task_id):
+            return await self._prune_notes(task_id, count)
+
+    async def _prune_notes(self, task_id: str, count: int) -> int:
+        chain = await self.get_chain(task_id)
+        count = min(count, len(chain) - 1)
+        if count <= 0:
+            return 0
+        versions, root_version = set(chain.versions(0, count)), chain.version_at(count)
+        notes = await self.list_notes(task_id, 0, count + 1)
+        root = next((n for n in notes if n.version == root_version), None)
+        if root is None:
+            root = await self.note_db.get(root_version)
+        if root is None:
+            # the chain is stale, it's reloaded by the next call
+            logger.warning(f"note {root_version} of task {task_id} is missing, notes are not pruned")
+            self.invalidate(task_id)
+            return 0
+
+        results = await self.note_db.delete_many([n for n in notes if n.version in versions])
+        deleted = 0
+        for r in results:
+            if not r.ok:
+                logger.error(f"failed to delete note {r.item.version}: {r.error!r}")
+                continue
+            chain.remove(r.item.version)
+            deleted += 1
+
+        if root.previous is not None and root.previous not in chain:
+            root.previous = None
+            await self.note_db.update(root)
+            head = self._heads.get(task_id)
+            if head is not None and head.version == root.version:
+                self._heads.put(task_id, root)
+        return deleted
+
+    def _get_notes_version(self) -> str:
         """
         a note's version is a sortable
-        string.
-        default to the string of millisecond
-        timestamp.
+        string, see `VersionGenerator`.
         """
-        return str(int(time.time() * 1000))
+        return self._versions.new()
 
     async def take_note(self, task: Task, previous_version: Optional[str] = None) -> Note:
         """
@@ -168,9 +333,33 @@ class TaskManager:
                    ^(head)
         ```
 
+        notes of the same task are taken one by one in order,
+        notes of different tasks can be taken concurrently.
+
         :param task: task which will be noted.
         :param previous_version: a truncate point.
         """
+        async with self._locks.hold(task.task_id):
+            return await self._take_note(task, previous_version)
+
+    async def take_notes(self, tasks: List[Task], concurrency: int = 16) -> List[Note]:
+        """
+        take notes of tasks concurrently, notes of the same task are
+        still taken in the order of `tasks`.
+
+        :param concurrency: notes taken at the same time at most,
+                            it should match what the note client allows.
+        :return: notes in the order of `tasks`.
+        """
+        semaphore = asyncio.Semaphore(concurrency)
+
+        async def take(task: Task) -> Note:
+            async with semaphore:
+                return await self.take_note(task)
+
+        return list(await asyncio.gather(*(take(t) for t in tasks)))
+
+    async def _take_note(self, task: Task, previous_version: Optional[str]) -> Note:
         if previous_version:
             previous_note = await self.get_note(previous_version)
         else:
@@ -185,14 +374,28 @@ class TaskManager:
         note = Note(version=self._get_notes_version(),
                     note_time=datetime.datetime.now(),
                     previous=previous,
-                    following=None,
                     **asdict(task))  # type: ignore
 
-        if previous is not None:
-            deleted_notes = await self.note_db.lists_all(Note.note_time > previous)
-            await self.delete_notes(deleted_notes)
-
-        return await self.note_db.create(note)
+        # nothing follows the head, so only a revert needs truncating
+        head = self._heads.get(task.task_id)
+        if previous_note is not None and (head is None or head.version != previous):
+            chain = await self.get_chain(task.task_id)
+            if previous not in chain or chain.after(previous):
+                deleted_notes = await self.note_db.lists_all(
+                    and_(Note.task_id == task.task_id, Note.note_time > previous_note.note_time))
+                await self.delete_notes(deleted_notes)
+
+        note = await self.note_db.create(note)
+        self._heads.put(task.task_id, note)
+        chain = self._chains.get(task.task_id)
+        if chain is not None:
+            chain.add(note)
+        for listener in self._listeners:
+            try:
+                await listener(note, previous_note)
+            except Exception:
+                logger.exception(f"listener failed on note {note.version}")
+        return note
 
     async def delete_notes(
         self,
@@ -209,7 +412,8 @@ class TaskManager:
 
         if v2 is deleted, v3's dependency is broken.
 
-        return true if deleted perform successfully.
+        notes are deleted in a batch, return true if all of them are
+        deleted successfully.
 
         :param notes: notes which need to be deleted
         :param check_dependency: check if version dependency will broke
@@ -226,10 +430,28 @@ class TaskManager:
             previous = n
 
         if previous:  # check
-            if await self.get_following_note(previous.version):  # raise if the last has a following note
+            head = self._heads.get(previous.task_id)
+            chain = self._chains.get(previous.task_id)
+            if chain is not None and previous.version in chain:
+                has_following = bool(chain.after(previous.version))
+            else:
+                is_head = head is not None and head.version == previous.version
+                has_following = not is_head and await self.get_following_note(previous.version)
+            # raise if the last has a following note
+            if has_following:
                 return False
 
+        results = await self.note_db.delete_many(notes)
         for n in notes:
-            await self.note_db.delete(n)
-
-        return True
+            head = self._heads.get(n.task_id)
+            if head is not None and head.version == n.version:
+                self._heads.pop(n.task_id)
+        for r in results:
+            if not r.ok:
+                logger.error(f"failed to delete note {r.item.version}: {r.error!r}")
+                continue
+            chain = self._chains.get(r.item.task_id)
+            if chain is not None:
+                chain.remove(r.item.version)
+
+        return all(r.ok for r in results)
@@ -0,0 +1,74 @@
+import math
+from typing import Dict, Generic, Hashable, List, Tuple, TypeVar
+
+K = TypeVar("K", bound=Hashable)
+
+
+class TimerWheel(Generic[K]):
+
+    def __init__(self, resolution: float = 0.05, slots: int = 1024, start: float = 0.0) -> None:
+        """
+        a hashed timing wheel of deadlines by key.
+
+        time is divided into ticks of `resolution` seconds, a key is kept
+        in the slot of its deadline's tick modulo `slots`. Scheduling,
+        rescheduling and cancelling a key cost O(1) however many keys are
+        pending, advancing only visits slots of the ticks passed. Deadlines
+        are rounded up to ticks, a key never expires early.
+
+        ```python
+        wheel = TimerWheel(resolution=0.1)
+        wheel.schedule("t1", clock() + 2)
+        wheel.advance(clock())  # keys whose deadlines passed
+        ```
+
+        :param resolution: seconds of a tick.
+        :param slots: slots of the wheel, deadlines further than
+                      `slots` ticks share slots with nearer ones.
+        :param start: the current time.
+        """
+        self.resolution = resolution
+        self._slots: List[Dict[K, int]] = [{} for _ in range(slots)]  # key -> tick
+        self._slot_of: Dict[K, int] = {}
+        self._tick = math.floor(start / resolution)  # the next tick to advance
+
+    def __len__(self) -> int:
+        return len(self._slot_of)
+
+    def __contains__(self, key: K) -> bool:
+        return key in self._slot_of
+
+    def schedule(self, key: K, deadline: float):
+        """schedule or reschedule a key"""
+        self.cancel(key)
+        tick = max(math.ceil(deadline / self.resolution), self._tick)
+        i = tick % len(self._slots)
+        self._slots[i][key] = tick
+        self._slot_of[key] = i
+
+    def cancel(self, key: K) -> bool:
+        i = self._slot_of.pop(key, None)
+        if i is None:
+            return False
+        del self._slots[i][key]
+        return True
+
+    def advance(self, now: float) -> List[K]:
+        """pop keys whose deadlines are no later than `now`, earlier deadlines first"""
+        target = math.floor(now / self.resolution)
+        if target < self._tick:
+            return []
+        expired: List[Tuple[int, K]] = []
+        # every slot is visited once at most, even if many ticks passed
+        for tick in range(self._tick, min(target + 1, self._tick + len(self._slots))):
+            slot = self._slots[tick % len(self._slots)]
+            if not slot:
+                continue
+            due = [(t, key) for key, t in slot.items() if t <= target]
+            for _, key in due:
+                del slot[key]
+                del self._slot_of[key]
+            expired.extend(due)
+        self._tick = target + 1
+        expired.sort(key=lambda e: e[0])
+        return [key for _, key in expired]
@@ -0,0 +1,76 @@
+import hashlib
+import os
+import socket
+import threading
+import time
+from typing import Callable, Optional
+
+# Crockford's base32, digits sort in the same order as their values
+ALPHABET = "0123456789ABCDEFGHJKMNPQRSTVWXYZ"
+TIME_BITS, NODE_BITS, SEQ_BITS = 48, 16, 16
+LENGTH = (TIME_BITS + NODE_BITS + SEQ_BITS) // 5  # 16 characters
+# versions were strings of milliseconds before, a letter sorts after any of them
+PREFIX = "V"
+
+
+def encode(value: int, length: int = LENGTH) -> str:
+    chars = []
+    for _ in range(length):
+        value, digit = divmod(value, 32)
+        chars.append(ALPHABET[digit])
+    return "".join(reversed(chars))
+
+
+def default_node() -> int:
+    """
+    a node id of this process from the host name and the pid, processes of
+    a host get different ids unless their pids are `2 ** 16` apart.
+    """
+    host = int.from_bytes(hashlib.blake2b(socket.gethostname().encode(), digest_size=2).digest(), "big")
+    return (host + os.getpid()) % (1 << NODE_BITS)
+
+
+class VersionGenerator:
+
+    def __init__(self, node: Optional[int] = None, clock: Callable[[], float] = time.time) -> None:
+        """
+        generates sortable and unique versions of notes, like ULID.
+
+        a version is `V` and 48 bits of milliseconds since epoch, 16 bits
+        of the node and 16 bits of a sequence, written in fixed width base32,
+        so versions sort as strings by the time they are generated. They
+        also sort after versions of earlier releases, which are strings of
+        milliseconds like `1656000000000`, so existing notes need no migration.
+
+        versions of a generator are strictly increasing, even if many are
+        generated in a millisecond or the clock goes backwards, the time
+        part runs ahead of the clock then. Generators of different nodes
+        never collide.
+
+        the default node only tells processes of a host apart, node ids of
+        different hosts are hashed to 16 bits and may be the same. If notes
+        are taken on several hosts, give each process a distinct node.
+
+        ```python
+        versions = VersionGenerator()
+        versions.new()  # 'V06GMS46ZGM00A000'
+        ```
+
+        :param node: an id of the process, `default_node()` if not given.
+        :param clock: returns seconds since epoch.
+        """
+        if node is None:
+            node = default_node()
+        if not 0 <= node < 1 << NODE_BITS:
+            raise ValueError(f"node must be in [0, {1 << NODE_BITS})")
+        self.node = node
+        self.clock = clock
+        self._last = 0  # millisecond and sequence of the last version
+        self._lock = threading.Lock()
+
+    def new(self) -> str:
+        with self._lock:
+            now = int(self.clock() * 1000) << SEQ_BITS
+            self._last = max(now, self._last + 1)
+            ms, seq = divmod(self._last, 1 << SEQ_BITS)
+        return PREFIX + encode((ms << (NODE_BITS + SEQ_BITS)) | (self.node << SEQ_BITS) | seq)
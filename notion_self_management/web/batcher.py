@@ -0,0 +1,131 @@
+import asyncio
+import itertools
+import logging
+import time
+from dataclasses import dataclass
+from typing import Any, Awaitable, Callable, Dict, Hashable, List, Optional
+
+logger = logging.getLogger("MicroBatcher")
+
+
+@dataclass
+class BatcherMetrics:
+    received: int = 0
+    coalesced: int = 0  # keys which were already pending
+    rejected: int = 0  # keys which found the batcher full
+    batches: int = 0
+    flushed: int = 0
+    failed: int = 0  # batches the sink failed on
+
+
+class MicroBatcher:
+
+    def __init__(
+        self,
+        sink: Callable[[List[Any]], Awaitable[Any]],
+        window: float = 0.5,
+        max_batch: int = 100,
+        max_pending: int = 10000,
+        clock: Callable[[], float] = time.monotonic,
+    ) -> None:
+        """
+        MicroBatcher coalesces keys added in a short window and
+        sends them to the sink in batches.
+
+        `add` never waits, a key which is already pending is only kept
+        once, so a burst of notifications of the same page costs a single
+        fetch. A batch is sent when its oldest key has waited `window`
+        seconds or when `max_batch` keys are pending, keys added while
+        the sink is running go to the next batch.
+
+        ```python
+        batcher = MicroBatcher(feed.refresh, window=0.5)
+        asyncio.ensure_future(batcher.run())
+        batcher.add(page_id)
+        ```
+
+        :param sink: an async function which takes a list of keys.
+        :param window: seconds a key waits for others at most.
+        :param max_batch: keys of a batch at most.
+        :param max_pending: `add` refuses keys beyond it, so a stalled
+                            sink doesn't exhaust memory.
+        :param clock: monotonic clock, injectable for testing.
+        """
+        self.sink = sink
+        self.window = window
+        self.max_batch = max_batch
+        self.max_pending = max_pending
+        self.clock = clock
+        self.metrics = BatcherMetrics()
+        self._pending: Dict[Hashable, float] = {}  # key -> time added, in the order of adding
+        self._wakeup = asyncio.Event()
+        self._stopped = asyncio.Event()
+
+    def __len__(self) -> int:
+        return len(self._pending)
+
+    def add(self, key: Hashable) -> bool:
+        """
+        add a key to the next batch.
+
+        :return: `False` if the batcher is full and the key is dropped.
+        """
+        m = self.metrics
+        m.received += 1
+        if key in self._pending:
+            m.coalesced += 1
+            return True
+        if len(self._pending) >= self.max_pending:
+            m.rejected += 1
+            return False
+
+        self._pending[key] = self.clock()
+        if len(self._pending) == 1 or len(self._pending) == self.max_batch:
+            self._wakeup.set()
+        return True
+
+    def _due(self) -> Optional[float]:
+        """seconds until the next batch is due, `None` if nothing is pending"""
+        if not self._pending:
+            return None
+        if len(self._pending) >= self.max_batch:
+            return 0
+        oldest = next(iter(self._pending.values()))
+        return max(oldest + self.window - self.clock(), 0)
+
+    async def flush(self) -> List[Hashable]:
+        """send the oldest pending keys as a batch now"""
+        batch = list(itertools.islice(self._pending, self.max_batch))
+        if not batch:
+            return batch
+        for key in batch:
+            del self._pending[key]
+
+        m = self.metrics
+        m.batches += 1
+        m.flushed += len(batch)
+        try:
+            await self.sink(batch)
+        except Exception:
+            m.failed += 1
+            logger.exception(f"sink failed on a batch of {len(batch)} keys")
+        return batch
+
+    async def run(self):
+        """send batches until `stop` is called, pending keys are flushed then"""
+        self._stopped.clear()
+        while not self._stopped.is_set():
+            self._wakeup.clear()
+            due = self._due()
+            if due == 0:
+                await self.flush()
+                continue
+            waits = [asyncio.ensure_future(self._wakeup.wait()), asyncio.ensure_future(self._stopped.wait())]
+            await asyncio.wait(waits, timeout=due, return_when=asyncio.FIRST_COMPLETED)
+            for w in waits:
+                w.cancel()
+        while self._pending:
+            await self.flush()
+
+    def stop(self):
+        self._stopped.set()
@@ -0,0 +1,118 @@
+import hashlib
+import hmac
+import json
+import logging
+from typing import Any, Dict, Optional
+
+from notion_self_management.web.batcher import MicroBatcher
+from sanic import Request, Sanic
+from sanic.response import HTTPResponse, empty
+from sanic.response import json as json_response
+
+logger = logging.getLogger("Server")
+
+# notifications are small, a larger body is refused before it's read
+MAX_BODY_SIZE = 64 * 1024
+SIGNATURE_HEADER = "X-Notion-Signature"
+
+
+def verify_signature(body: bytes, secret: str, signature: Optional[str]) -> bool:
+    """`signature` is `sha256=` and the hex HMAC-SHA256 of the body keyed by the verification token"""
+    if not signature:
+        return False
+    expected = "sha256=" + hmac.new(secret.encode(), body, hashlib.sha256).hexdigest()
+    return hmac.compare_digest(expected, signature)
+
+
+def _normalize_id(page_id: str) -> str:
+    return page_id.replace("-", "")
+
+
+def page_of(event: Dict[str, Any], database_id: Optional[str] = None) -> Optional[str]:
+    """
+    the page id a notification is about, `None` if it's not about
+    a page of the database.
+    """
+    entity = event.get("entity")
+    if not isinstance(entity, dict) or entity.get("type") != "page" or not isinstance(entity.get("id"), str):
+        return None
+    if database_id is not None:
+        parent = (event.get("data") or {}).get("parent") or {}
+        if parent.get("id") and _normalize_id(parent["id"]) != _normalize_id(database_id):
+            return None
+    return entity["id"]
+
+
+def create_app(
+    batcher: MicroBatcher,
+    secret: Optional[str] = None,
+    database_id: Optional[str] = None,
+    name: str = "notion_self_management",
+) -> Sanic:
+    """
+    a Sanic app which ingests Notion webhook notifications.
+
+    a notification is acknowledged as soon as its page is added to
+    `batcher`, pages are fetched later in batches. Requests only do
+    cheap checks: the body size, the signature and the page id,
+    so acknowledging stays fast under bursts.
+
+    ```python
+    feed = ChangeFeed(notion, manager.take_note, FileWatermarkStore("watermarks.json"))
+    app = create_app(MicroBatcher(feed.refresh), secret=token, database_id=notion.database_id)
+    app.run(port=8000)
+    ```
+
+    responses:
+        - 202, the page will be refreshed.
+        - 200, the notification is ignored, or it's the verification request.
+        - 400, the body is not a notification.
+        - 401, the signature is wrong.
+        - 503, too many pages are pending, Notion retries later.
+
+    :param batcher: receives page ids, it runs with the server.
+    :param secret: the verification token signing notifications, unsigned
+                   notifications are accepted if it's `None`.
+    :param database_id: notifications of pages out of it are ignored.
+    """
+    app = Sanic(name)
+    app.config.REQUEST_MAX_SIZE = MAX_BODY_SIZE
+
+    @app.before_server_start
+    async def start_batcher(app: Sanic, _):
+        app.add_task(batcher.run())
+
+    @app.before_server_stop
+    async def stop_batcher(app: Sanic, _):
+        batcher.stop()
+
+    @app.post("/webhook")
+    async def webhook(request: Request) -> HTTPResponse:
+        body = request.body
+        if secret is not None and not verify_signature(body, secret, request.headers.get(SIGNATURE_HEADER)):
+            return empty(status=401)
+        try:
+            event = json.loads(body)
+        except ValueError:
+            return empty(status=400)
+        if not isinstance(event, dict):
+            return empty(status=400)
+
+        if "verification_token" in event:
+            if secret is None:
+                # sent unsigned once when subscribing, the token is the secret to configure
+                logger.info(f"verification token of the webhook subscription: {event['verification_token']}")
+            return empty(status=200)
+
+        page_id = page_of(event, database_id)
+        if page_id is None:
+            return empty(status=200)
+        if not batcher.add(page_id):
+            return empty(status=503)
+        return empty(status=202)
+
+    @app.get("/health")
+    async def health(_: Request) -> HTTPResponse:
+        return json_response({"pending": len(batcher), **vars(batcher.metrics)})
+
+    return app
@@ -1,7 +1,10 @@
 import logging
 import os
 import sys
+from datetime import datetime
+from itertools import count
 from pathlib import Path
+from typing import Optional
 
 logging.basicConfig(level="DEBUG")
 
@@ -16,3 +19,53 @@ if env.exists():
         l = l.strip()
         k, v = l.split("=")
         os.environ[k] = v
+
+# project imports need the path above
+from notion_self_management.client.client import Client
+from notion_self_management.client.memory_client import MemoryClient
+from notion_self_management.task_manager.note import Note
+from notion_self_management.task_manager.task import Task
+from notion_self_management.task_manager.task_manager import TaskManager
+from pytest import fixture
+
+
+def _make_task(task_id: str = "t1", **kwargs) -> Task:
+    now = datetime(2022, 1, 1)
+    data = dict(task_id=task_id, create_time=now, update_time=now, create_by="", update_by="", title="", content="",
+                status="todo", due_date=now, start_date=now, Tags=[], is_done=False, active=True, percent=0,
+                extras_field={})
+    data.update(kwargs)
+    return Task(**data)
+
+
+def _make_note(version: str, previous: Optional[str] = None, note_time: Optional[datetime] = None, **kwargs) -> Note:
+    task = _make_task(**kwargs)
+    return Note(version=version, note_time=note_time or datetime.now(), previous=previous, **vars(task))
+
+
+def _make_manager(notes: Optional[Client[Note]] = None, **kwargs) -> TaskManager:
+    """a manager on memory clients, versions of notes are `0000`, `0001`, ..."""
+    manager = TaskManager(MemoryClient(), notes or MemoryClient(id_field="version"), **kwargs)
+    versions = count()
+    manager._get_notes_version = lambda: f"{next(versions):04}"
+    return manager
+
+
+@fixture
+def make_task():
+    return _make_task
+
+
+@fixture
+def make_note():
+    return _make_note
+
+
+@fixture
+def make_manager():
+    return _make_manager
+
+
+@fixture
+def manager() -> TaskManager:
+    return _make_manager()
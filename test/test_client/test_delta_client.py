@@ -0,0 +1,72 @@
+import datetime
+from dataclasses import replace
+
+from notion_self_management.client.delta_client import DeltaNoteClient
+from notion_self_management.client.memory_client import MemoryClient
+from notion_self_management.task_manager.note import _TASK_FIELDS, Note
+from notion_self_management.task_manager.task import Task
+
+
+def as_task(note: Note) -> Task:
+    return Task(**{k: v for k, v in vars(note).items() if k in _TASK_FIELDS})
+
+
+async def test_delta_notes(make_task, make_manager):
+    stored = MemoryClient(id_field="version")
+    manager = make_manager(DeltaNoteClient(stored, snapshot_every=3, cache_size=0), head_cache_size=0)
+
+    tasks = []
+    task = make_task(content="long content " * 100)
+    for i in range(7):
+        task = replace(task, update_time=task.update_time + datetime.timedelta(minutes=1), percent=i * 10)
+        if i == 4:
+            task.content = "edited"
+        tasks.append(task)
+        await manager.take_note(task)
+
+    items = list(stored.items.values())
+    assert [n.depth for n in items] == [0, 1, 2, 0, 1, 2, 0]
+    assert items[1].delta == ["percent", "update_time"] and items[1].content is None
+    assert items[4].content == "edited"
+
+    for i, t in enumerate(tasks):
+        note = await manager.get_note(f"{i:04}")
+        assert as_task(note) == t and note.delta is None
+    assert as_task(await manager.get_current_note_by_task("t1")) == tasks[-1]
+
+    # revert to 0002 and edit, 0003 to 0006 are truncated
+    edited = replace(tasks[2], update_time=tasks[-1].update_time + datetime.timedelta(minutes=1), title="revert")
+    note = await manager.take_note(edited, previous_version="0002")
+    assert sorted(stored.items) == ["0000", "0001", "0002", "0007"]
+    assert note.previous == "0002" and stored.items["0007"].depth == 0
+    assert as_task(await manager.get_current_note_by_task("t1")) == edited
+
+
+async def test_rebase_on_delete(make_task, make_manager):
+    stored = MemoryClient(id_field="version")
+    notes = DeltaNoteClient(stored, snapshot_every=10, cache_size=0)
+    manager = make_manager(notes, head_cache_size=0)
+    task = make_task()
+    for i in range(4):
+        task = replace(task, update_time=task.update_time + datetime.timedelta(minutes=1), title=str(i))
+        await manager.take_note(task)
+
+    # the oldest notes are deleted, 0002 becomes a full note
+    await notes.delete_many([stored.items["0000"], stored.items["0001"]])
+    assert sorted(stored.items) == ["0002", "0003"]
+    assert stored.items["0002"].delta is None
+    assert (await notes.get("0003")).title == "3"
+    assert (await notes.get("0002")).update_time == task.update_time - datetime.timedelta(minutes=1)
+
+
+async def test_create_copies(make_note):
+    notes = DeltaNoteClient(MemoryClient(id_field="version"))
+    first = await notes.create(make_note("0000", title="0"))
+    note = replace(make_note("0001", "0000", title="1"), delta=["title"], depth=5)
+    created = await notes.create(note)
+    assert (note.delta, note.depth) == (["title"], 5)  # the caller's note is untouched
+    assert (created.delta, created.depth) == (None, 1) and created is not note
+
+    created.title = "changed"
+    assert (await notes.get("0001")).title == "1"
+    assert first.depth == 0
@@ -0,0 +1,49 @@
+import datetime
+
+from notion_self_management.client.mongo_client.client import MongoClient
+from notion_self_management.task_manager.note import Note
+from pytest import fixture, importorskip
+
+
+@fixture
+def notes() -> MongoClient:
+    mongomock_motor = importorskip("mongomock_motor")
+    return MongoClient(mongomock_motor.AsyncMongoMockClient()["notion"]["notes"])
+
+
+async def test_await_client(notes):
+    assert await notes is notes
+    assert "task_id_1_note_time_-1" in await notes.collection.index_information()
+
+
+async def test_crud(notes, make_note):
+    note = make_note("1", note_time=datetime.datetime(2022, 1, 1), title="first")  # mongo keeps milliseconds
+    assert await notes.create(note) is note
+    assert await notes.get("1") == note
+    assert await notes.get("missing") is None
+
+    note.title = "edited"
+    assert await notes.update(note) == note
+    assert (await notes.get("1")).title == "edited"
+    assert await notes.update(make_note("missing")) is None
+
+    assert await notes.delete(note) == note
+    assert await notes.get("1") is None
+    assert await notes.delete(note) is None
+
+
+async def test_batch_and_lists(notes, make_note):
+    start = datetime.datetime(2022, 1, 1)
+    batch = [make_note(str(i), note_time=start + datetime.timedelta(minutes=i), percent=i) for i in range(5)]
+    results = await notes.create_many(batch + [batch[0]])  # a duplicated id fails alone
+    assert [r.ok for r in results] == [True] * 5 + [False]
+
+    assert [n.version for n in await notes.lists(Note.percent >= 2, order_by=[Note.note_time], desc=True)] == \
+        ["4", "3", "2"]
+    assert [n.version for n in await notes.lists(None, limit=2, offset=1, order_by=[Note.note_time])] == ["1", "2"]
+    assert await notes.lists(None, limit=0) == []
+    assert len(await notes.lists_all(Note.task_id == "t1")) == 5
+
+    results = await notes.delete_many([batch[0], batch[1], make_note("missing")])
+    assert [r.result is not None for r in results] == [True, True, False]
+    assert len(await notes.lists_all(None)) == 3
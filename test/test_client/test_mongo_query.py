@@ -0,0 +1,21 @@
+from datetime import datetime
+
+from notion_self_management.client.mongo_client.query import NOTHING, compile_query
+from notion_self_management.expression.bool_expression import and_, or_
+from notion_self_management.expression.const import false
+from notion_self_management.task_manager.note import Note
+
+
+def test_compile_query():
+    now = datetime.now()
+    assert compile_query(Note.task_id == "t1") == {"task_id": {"$eq": "t1"}}
+    assert compile_query(and_(Note.task_id == "t1", Note.note_time > now)) == {
+        "$and": [{"task_id": {"$eq": "t1"}}, {"note_time": {"$gt": now}}]
+    }
+    assert compile_query(~((Note.percent <= 1) | (Note.title == Note.content))) == {
+        "$nor": [{"$or": [{"percent": {"$lte": 1}}, {"$expr": {"$eq": ["$title", "$content"]}}]}]
+    }
+    assert compile_query(false()) == NOTHING
+    assert compile_query(and_()) == {}  # MongoDB refuses an empty `$and`
+    assert compile_query(or_()) == NOTHING
+    assert compile_query(~and_()) == NOTHING
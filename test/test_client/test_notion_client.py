@@ -1,6 +1,17 @@
+import asyncio
+import json
 import os
-from notion_self_management.client.notion_client.client import Notion
-from pytest import mark, fixture
+
+import httpx
+from benchmark.fake_notion import FakeNotion
+from benchmark.fixtures import make_pages
+from notion_self_management.client.notion_client.client import AsyncClient, Notion
+from notion_self_management.client.notion_client.datatypes.page import Page
+from notion_self_management.client.notion_client.exceptions import RateLimitException, UnexpectedResponseException
+from notion_self_management.client.notion_client import transport
+from notion_self_management.client.notion_client.rate_limit import RateLimiter
+from notion_self_management.task_manager.task import Task
+from pytest import mark, fixture, raises
 
 
 @fixture
@@ -15,3 +26,171 @@ def notion_database_id() -> str:
 
 async def test_client(notion_key, notion_database_id):
     notion = await Notion(notion_key, notion_database_id)
+
+
+def make_page(i: int) -> dict:
+    user = {"object": "user", "id": "u1"}
+    return {
+        "object": "page",
+        "id": f"page-{i}",
+        "created_time": "2022-06-19T17:43:00.000Z",
+        "created_by": user,
+        "last_edited_time": "2022-06-19T17:43:00.000Z",
+        "last_edited_by": user,
+        "archived": False,
+        "parent": {"type": "database_id", "database_id": "db"},
+        "url": f"https://www.notion.so/page-{i}",
+        "properties": {
+            "title": {"type": "title", "title": [{"plain_text": f"task {i}"}]},
+            "percent": {"type": "number", "number": i},
+            "status": {"type": "select", "select": {"name": "done" if i % 2 else "todo"}},
+        },
+    }
+
+
+@fixture
+def paginated_notion():
+    pages = [make_page(i) for i in range(250)]
+    requests = []
+
+    def handler(request: httpx.Request) -> httpx.Response:
+        body = json.loads(request.content)
+        requests.append(body)
+        start = int(body.get("start_cursor") or 0)
+        end = start + body["page_size"]
+        has_more = end < len(pages)
+        return httpx.Response(200, json={
+            "object": "list",
+            "results": pages[start:end],
+            "has_more": has_more,
+            "next_cursor": str(end) if has_more else None,
+        })
+
+    notion = Notion("key", "db", model=Task)
+    notion.client = AsyncClient(transport=httpx.MockTransport(handler))
+    return notion, requests
+
+
+async def test_iter_rows_follow_cursor(paginated_notion):
+    notion, requests = paginated_notion
+    tasks = [t async for t in notion.iter_rows()]
+
+    assert len(tasks) == 250
+    assert len(requests) == 3
+    assert tasks[0].task_id == "page-0"
+    assert tasks[0].title == "task 0"
+    assert tasks[0].update_time.year == 2022
+
+
+async def test_lists_stop_early(paginated_notion):
+    notion, requests = paginated_notion
+    tasks = await notion.lists(Task.status == "done", limit=3, offset=1)
+
+    assert [t.percent for t in tasks] == [3, 5, 7]
+    # without the schema, status is filtered locally, so pages are not shrunk
+    assert [r["page_size"] for r in requests] == [100]
+    assert len(await notion.lists_all(Task.status == "todo")) == 125
+
+
+class FakeClock:
+
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self) -> float:
+        return self.now
+
+    async def sleep(self, seconds: float):
+        self.now += seconds
+
+
+async def test_rate_limiter_spacing():
+    clock = FakeClock()
+    limiter = RateLimiter(rate=3, burst=3, clock=clock, sleep=clock.sleep)
+    for _ in range(9):
+        await limiter.acquire()
+
+    assert abs(clock.now - 2) < 1e-6  # 3 at once, then 3 per second
+    assert limiter.stats.queued == 6
+
+
+async def test_retry_on_429_and_5xx():
+    clock = FakeClock()
+    limiter = RateLimiter(clock=clock, sleep=clock.sleep, backoff_max=1)
+    fake = FakeNotion(make_pages(3))
+    fake.errors = [httpx.Response(429, headers={"Retry-After": "2"}), httpx.Response(502)]
+    notion = fake.client(model=Task, rate_limiter=limiter)
+
+    task = await notion.get("page-00000001")
+    assert task.title == "task 1"
+    assert fake.requests == 3
+    assert clock.now >= 2
+    assert limiter.stats.retried == 2
+    assert limiter.stats.throttled == 1
+
+
+def test_rate_limiter_across_loops():
+    clock = FakeClock()
+    limiter = RateLimiter(rate=3, burst=1, clock=clock, sleep=clock.sleep)
+    fake = FakeNotion(make_pages(3))
+
+    async def job():  # a client per loop, as `asyncio.run` per job does
+        notion = fake.client(model=Task, rate_limiter=limiter)
+        return await asyncio.gather(*(notion.get(f"page-{i:08d}") for i in range(3)))
+
+    assert len(asyncio.run(job())) == 3
+    assert len(asyncio.run(job())) == 3
+    assert limiter.stats.queued == 2 + 3  # the bucket is still empty for the second job
+
+
+async def test_no_retry_on_5xx_of_create():
+    requests = []
+
+    def handler(request: httpx.Request) -> httpx.Response:
+        requests.append(request)
+        return httpx.Response(502)
+
+    clock = FakeClock()
+    client = AsyncClient(transport=httpx.MockTransport(handler),
+                         rate_limiter=RateLimiter(clock=clock, sleep=clock.sleep))
+    res = await client.request("POST", "https://api.notion.com/v1/pages", json={}, retry_5xx=False)
+    assert res.status_code == 502
+    assert len(requests) == 1
+
+
+async def test_raise_after_retries():
+    clock = FakeClock()
+    limiter = RateLimiter(max_retries=2, clock=clock, sleep=clock.sleep)
+    client = AsyncClient(transport=httpx.MockTransport(lambda r: httpx.Response(429)), rate_limiter=limiter)
+
+    with raises(RateLimitException):
+        await client.get("https://api.notion.com/v1/users")
+    assert limiter.stats.throttled == 3
+
+
+async def test_shared_transport():
+    n1 = Notion("key", "db1", base_url="https://notion.test")
+    n2 = Notion("key", "db2", base_url="https://notion.test")
+    assert n1.client._transport.transport is n2.client._transport.transport
+
+    await n1.client.aclose()  # pool is still used by n2
+    assert "https://notion.test" in transport._transports
+
+    await transport.close_transports()
+    assert not transport._transports
+
+
+async def test_batch_partial_failure():
+
+    def handler(request: httpx.Request) -> httpx.Response:
+        if request.url.path.endswith("page-1"):
+            return httpx.Response(400, json={})
+        return httpx.Response(200, json=make_page(int(request.url.path.rsplit("-", 1)[1])))
+
+    notion = Notion("key", "db", model=Task)
+    notion.client = AsyncClient(transport=httpx.MockTransport(handler))
+    results = await notion.delete_many([Page.from_dict(make_page(i)) for i in range(5)])
+
+    assert [r.ok for r in results] == [True, False, True, True, True]
+    assert isinstance(results[1].error, UnexpectedResponseException)
+    assert results[2].result.task_id == "page-2"
@@ -0,0 +1,69 @@
+from datetime import datetime
+from types import SimpleNamespace
+
+from notion_self_management.client.notion_client.datatypes.properties import PropertyType
+from notion_self_management.client.notion_client.filter import compile_filter
+from notion_self_management.expression.bool_expression import and_, or_
+from notion_self_management.task_manager.task import Task
+from pytest import fixture
+
+
+@fixture
+def properties() -> dict:
+    return {
+        "title": SimpleNamespace(type=PropertyType.title),
+        "percent": SimpleNamespace(type=PropertyType.number),
+        "status": SimpleNamespace(type=PropertyType.select),
+        "Tags": SimpleNamespace(type=PropertyType.multi_select),
+    }
+
+
+def test_single_condition(properties):
+    f, residual = compile_filter(Task.percent > 50, properties)
+    assert f == {"property": "percent", "number": {"greater_than": 50}}
+    assert residual is None
+
+
+def test_nested_and_or(properties):
+    cond = (Task.status == "done") & ((Task.percent >= 10) | (Task.title != "a")) & (Task.percent < 90)
+    f, residual = compile_filter(cond, properties)
+    assert residual is None
+    assert f == {
+        "and": [
+            {"property": "status", "select": {"equals": "done"}},
+            {"or": [
+                {"property": "percent", "number": {"greater_than_or_equal_to": 10}},
+                {"property": "title", "title": {"does_not_equal": "a"}},
+            ]},
+            {"property": "percent", "number": {"less_than": 90}},
+        ]
+    }
+
+
+def test_negation(properties):
+    f, residual = compile_filter(~or_(Task.percent > 50, Task.status == "done"), properties)
+    assert residual is None
+    assert f == {
+        "and": [
+            {"property": "percent", "number": {"less_than_or_equal_to": 50}},
+            {"property": "status", "select": {"does_not_equal": "done"}},
+        ]
+    }
+
+
+def test_residual(properties):
+    unknown = Task.content == "a"
+    f, residual = compile_filter(and_(Task.percent > 50, unknown, Task.title == Task.status), properties)
+    assert f == {"property": "percent", "number": {"greater_than": 50}}
+    assert residual.evaluate(content="a", title="t", status="t")
+
+    f, residual = compile_filter(or_(Task.percent > 50, unknown), properties)
+    assert f is None
+    assert residual.evaluate(content="a", percent=0)
+
+
+def test_timestamps(properties):
+    now = datetime(2022, 6, 19, 17, 43)
+    f, residual = compile_filter(Task.update_time >= now, properties, {"update_time": "last_edited_time"})
+    assert f == {"timestamp": "last_edited_time", "last_edited_time": {"on_or_after": now.isoformat()}}
+    assert residual is None
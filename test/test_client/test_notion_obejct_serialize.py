@@ -1,7 +1,12 @@
+from dataclasses import dataclass
+from enum import Enum
 from pathlib import Path
+from typing import Optional, Union
 
 import ujson
+from dacite import Config, from_dict
 from notion_self_management.client.notion_client.datatypes.database import DataBase
+from notion_self_management.client.notion_client.datatypes.decoder import get_decoder
 from notion_self_management.client.notion_client.datatypes.properties import CreateTimeProperty
 from pytest import fixture
 
@@ -14,3 +19,31 @@ def database_json() -> dict:
 def test_deserialized(database_json):
     db = DataBase.from_dict(database_json)
     assert isinstance(db.properties["createTime"], CreateTimeProperty)
+
+
+def test_same_as_dacite(database_json):
+    expected = from_dict(DataBase, database_json, config=Config(cast=[Enum]))
+    assert DataBase.from_dict(database_json) == expected
+    assert {k: type(v) for k, v in DataBase.from_dict(database_json).properties.items()} == \
+        {k: type(v) for k, v in expected.properties.items()}
+
+
+@dataclass
+class Link:
+    type: str
+    link: Optional[str] = None
+
+
+@dataclass
+class Mail:
+    type: str
+    mail: Optional[str] = None
+
+
+def test_union_dispatch_on_type():
+    decode = get_decoder(Union[Link, Mail])
+    # both members accept any keys, `type` picks the member
+    assert decode({"type": "mail", "mail": "a@b.c"}) == Mail("mail", "a@b.c")
+    assert decode({"type": "link", "link": "https://b.c"}) == Link("link", "https://b.c")
+    # an unknown type falls back to the order of members
+    assert decode({"type": "phone"}) == Link("phone")
@@ -0,0 +1,47 @@
+from datetime import datetime, timedelta
+
+from notion_self_management.expression import columnar
+from notion_self_management.expression.bool_expression import and_, or_
+from notion_self_management.expression.columnar import evaluate_columns, to_columns
+from notion_self_management.expression.utils import dataclass_filter
+from notion_self_management.expression.variable import Variable
+from pytest import fixture, mark
+
+
+@dataclass_filter
+class Row:
+    name = Variable(str)
+    score: int
+    ratio: float
+    done: bool
+    time: datetime
+    tags: list
+
+
+@fixture
+def rows():
+    now = datetime(2022, 1, 1)
+    return [
+        Row(name=f"n{i % 3}", score=i, ratio=i / 7, done=i % 2 == 0, time=now + timedelta(hours=i), tags=[i])
+        for i in range(50)
+    ]
+
+
+EXPRESSIONS = [
+    Row.score > 10,
+    (Row.name == "n1") & (Row.ratio <= 3.5),
+    ~or_(Row.done == True, Row.time >= datetime(2022, 1, 2)),  # noqa: E712
+    and_(Row.score != Row.score, Row.name != "n0"),
+    Row.tags == [3],
+    or_(Row.name == "n2"),
+]
+
+
+@mark.parametrize("numpy", [True, False])
+def test_evaluate_columns(rows, monkeypatch, numpy):
+    if not numpy:
+        monkeypatch.setattr(columnar, "np", None)
+    columns = to_columns(rows)
+    for e in EXPRESSIONS:
+        mask = evaluate_columns(e, columns)
+        assert [bool(m) for m in mask] == [e.evaluate(**vars(r)) for r in rows]
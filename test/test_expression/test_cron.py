@@ -0,0 +1,39 @@
+from datetime import datetime, timedelta
+from random import Random
+
+from notion_self_management.expression.cron import Cron
+from pytest import raises
+
+
+def brute_next(cron: Cron, t: datetime) -> datetime:
+    t = t.replace(second=0, microsecond=0) + timedelta(minutes=1)
+    while not cron.evaluate(t):
+        if not cron.evaluate(t.replace(hour=cron.hours.bit_length() - 1, minute=cron.minutes.bit_length() - 1)):
+            t = t.replace(hour=0, minute=0) + timedelta(days=1)  # not a day to fire
+        else:
+            t += timedelta(minutes=1)
+    return t
+
+
+def test_next():
+    rnd = Random(0)
+    for expr in ("*/15 9-18 * * mon-fri", "0 0 29 2 *", "30 2 * * 7", "0 12 1,15 * 1", "5 4 31 * *", "@hourly",
+                 "*/7 */5 */3 */2 *", "0 0 13 * fri", "59 23 31 dec *", "0 8-20/4 * jun-aug 0-2"):
+        cron = Cron(expr)
+        for _ in range(5):
+            t = datetime(2022, 1, 1) + timedelta(minutes=rnd.randint(0, 60 * 24 * 365 * 2), seconds=rnd.randint(0, 59))
+            assert cron.next(t) == brute_next(cron, t)
+
+    assert Cron("*/15 9-18 * * mon-fri").next(datetime(2022, 7, 1, 18, 50)) == datetime(2022, 7, 4, 9)
+    assert list(Cron("0 0 * * *").iter(datetime(2022, 1, 1), datetime(2022, 1, 3))) == [
+        datetime(2022, 1, 2), datetime(2022, 1, 3)
+    ]
+
+
+def test_invalid():
+    for expr in ("* * * *", "60 * * * *", "* * 0 * *", "* * * foo *", "*/0 * * * *", "5-1 * * * *"):
+        with raises(ValueError):
+            Cron(expr)
+    with raises(ValueError):
+        Cron("0 0 30 2 *").next(datetime(2022, 1, 1))
+    assert Cron.from_json(Cron("@daily").to_json()).fingerprint() == Cron("0 0 * * *").fingerprint()
@@ -4,8 +4,10 @@ from io import StringIO
 from typing import Union
 
 from notion_self_management.expression.bool_expression import Condition, ConditionList, and_, or_
+from notion_self_management.expression.intern import Interner
 from notion_self_management.expression.utils import dataclass_filter
 from notion_self_management.expression.variable import Variable
+from pytest import raises
 
 
 @dataclass_filter
@@ -75,3 +77,64 @@ def parse_condition_list(expression: Union[ConditionList, Condition], result=Non
     t = f" {expression.op.value} ".join(tmp)
     result.write(f"({t})")
     return result
+
+
+def test_compile():
+    now = datetime.now()
+    rows = [
+        asdict(Book(name=name, author=author, publish_date=now)) for name in ("Python", "Java", "Go")
+        for author in ("Lu", "Zink", "Python")
+    ]
+    expressions = [
+        Book.name == "Python",
+        "Java" == Book.name,
+        (Book.name == "Python") & (Book.author != "Lu"),
+        ~((Book.name == "Java") | (Book.author == Book.name)),
+        and_(Book.name == "Go", or_(Book.author == "Lu", and_(Book.author == "Zink", Book.name != "Java"))),
+        and_(Book.name == "Go"),
+        or_(Book.name == "Go"),
+        ~and_(Book.name == "Python", Book.author == "Lu", Book.name != "Go", Book.author != "Zink"),
+    ]
+    for e in expressions:
+        f = e.compile()
+        for row in rows:
+            assert f(row) == e.evaluate(**row)
+
+
+def test_compile_unbound():
+    f = ((Book.name == "Python") & (Book.author == "Lu")).compile()
+    assert not f({"name": "Java"})  # short-circuit
+    with raises(ValueError):
+        f({"name": "Python"})
+
+
+def test_fingerprint():
+    build = [
+        lambda: (Book.name == "Python") & (Book.author != "Lu"),
+        lambda: ~and_(Book.name == "Go"),
+        lambda: and_(Book.name == "Go"),
+        lambda: Book.name == 1,
+        lambda: Book.name == True,  # noqa: E712
+        lambda: Book.name == [1, 2],
+        lambda: Book.name == (1, 2),
+        lambda: Book.name == Book.author,
+    ]
+    keys = [b().fingerprint() for b in build]
+    assert keys == [b().fingerprint() for b in build]
+    assert len(set(keys)) == len(keys)
+    assert {keys[0]: 1}[((Book.name == "Python") & (Book.author != "Lu")).fingerprint()] == 1
+
+    assert (Book.name == "Go").compile() is (Book.name == "Go").compile()
+    assert (Book.name == {1: [{2}]}).fingerprint() == (Book.name == {1: [{2}]}).fingerprint()
+    with raises(TypeError):
+        (Book.name == bytearray(b"Go")).fingerprint()
+
+
+def test_intern():
+    intern = Interner()
+    a = intern((Book.name == "Python") & (Book.author == "Lu"))
+    b = intern(or_(Book.author == "Lu", Book.name == "Python"))
+    assert a.clauses[0] is b.clauses[1]
+    assert a.clauses[1] is b.clauses[0]
+    assert intern((Book.name == "Python") & (Book.author == "Lu")) is a
+    assert intern(Book.name == {"a": []}).evaluate(name={"a": []})
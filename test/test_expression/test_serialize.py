@@ -0,0 +1,61 @@
+from datetime import date, datetime
+
+from notion_self_management.expression.bind import BindVariable
+from notion_self_management.expression.bool_expression import Condition, ConditionList, and_, or_
+from notion_self_management.expression.const import empty, false, true
+from notion_self_management.expression.serialize import dump_rules, load_rules, load_rules_file
+from notion_self_management.expression.utils import dataclass_filter
+from notion_self_management.expression.variable import Variable
+from pytest import raises
+
+
+@dataclass_filter
+class Book:
+    name = Variable(str)
+    author = Variable(str)
+    pages: int
+    publish_date: datetime
+
+
+RULES = {
+    "eq": Book.name == "Python",
+    "mirror": "Java" == Book.name,
+    "vars": Book.name != Book.author,
+    "and": and_(Book.pages > 100, Book.publish_date < datetime(2022, 1, 1, 8, 30)),
+    "nested": ~or_((Book.name == "Go") & (Book.pages <= -2**70), Book.author == "露", and_(Book.pages >= 1.5)),
+    "values": and_(Book.name == [1, "a", None, True], Book.author == (1, {2}), Book.pages == {"a": [date(2022, 1, 1)]}),
+    "const": or_(true(), false()),
+}
+
+
+def test_json():
+    for e in RULES.values():
+        loaded = type(e).from_json(e.to_json())
+        assert loaded.fingerprint() == e.fingerprint()
+        assert loaded.to_json() == e.to_json()
+
+    assert true.from_json(true().to_json()) is true()
+    assert empty.from_json(empty().to_json()) is empty()
+    v = Variable.from_json(Book.pages.to_json())
+    assert (v.name, v.type) == ("pages", int)
+    bind = BindVariable.from_json(BindVariable("pages", 1).to_json())
+    assert (bind.variable, bind.value) == ("pages", 1)
+    with raises(TypeError):
+        Condition.from_json(RULES["and"].to_json())
+
+
+def test_rules(tmp_path):
+    for binary in (False, True):
+        data = dump_rules(RULES, binary=binary)
+        path = tmp_path / f"rules{binary}"
+        path.write_bytes(data if binary else data.encode())
+        for rules in (load_rules(data), load_rules_file(str(path))):
+            assert list(rules) == list(RULES)
+            for k, e in RULES.items():
+                assert rules[k].fingerprint() == e.fingerprint()
+            # variables are shared
+            assert rules["eq"].left is rules["mirror"].left
+            assert isinstance(rules["nested"], ConditionList) and rules["nested"]._inv
+
+    with raises(ValueError):
+        load_rules(b"NSMR\x09")
@@ -0,0 +1,65 @@
+import asyncio
+
+from notion_self_management.handler.dispatcher import HandlerQueue, Lane
+from notion_self_management.handler.handler_manager import HandlerManager
+from notion_self_management.task_manager.task import Task
+
+
+async def test_lanes_and_order():
+    handled = []
+
+    async def handler(key, i):
+        await asyncio.sleep(0)
+        handled.append((key, i))
+
+    queue = HandlerQueue("q", handler, concurrency=3)
+    for i in range(5):
+        for key in "abcd":
+            await queue.put((key, i), key=key)
+    await queue.put(("cron", 0), lane=Lane.cron)
+    queue.start()
+    await queue.join()
+    await queue.stop()
+
+    assert ("cron", 0) in handled[:3]  # taken first by its worker
+    for key in "abcd":
+        assert [i for k, i in handled if k == key] == list(range(5))
+    m = queue.metrics
+    assert (m.processed, m.depth, m.running, m.wait_time.count, m.latency.count) == (21, 0, 0, 21, 21)
+
+
+async def test_slow_handler(make_task, manager):
+    release = asyncio.Event()
+    slow, fast = [], []
+
+    async def slow_handler(note, previous):
+        await release.wait()
+        slow.append(note.task_id)
+
+    async def fast_handler(note, previous):
+        fast.append(note.task_id)
+
+    async def hanging(note, previous):
+        await asyncio.sleep(10)
+
+    handlers = HandlerManager(maxsize=2, put_timeout=0.01)
+    handlers.register("slow", Task.status == "done", slow_handler)
+    handlers.register("fast", Task.status == "done", fast_handler, maxsize=100)
+    handlers.register("hanging", Task.percent > 50, hanging, timeout=0.01)
+    handlers.start()
+
+    manager.add_listener(handlers.dispatch)
+    for i in range(10):
+        await manager.take_note(make_task(f"t{i}", status="done", percent=i * 10))
+    await asyncio.sleep(0.05)
+
+    # the slow handler only slows down itself
+    assert fast == [f"t{i}" for i in range(10)]
+    metrics = handlers.metrics()
+    assert metrics["slow"].dropped > 0 and metrics["slow"].depth == 2
+    assert metrics["hanging"].timeouts == 4
+
+    release.set()
+    await handlers.join()
+    assert len(slow) == 10 - metrics["slow"].dropped
+    await handlers.stop()
@@ -0,0 +1,86 @@
+import datetime
+import random
+
+from notion_self_management.expression.bool_expression import and_, or_
+from notion_self_management.expression.const import true
+from notion_self_management.expression.dependency import referenced_variables
+from notion_self_management.handler.handler_manager import HandlerManager
+from notion_self_management.task_manager.note import Note
+from notion_self_management.task_manager.task import Task
+
+
+async def noop(*args):
+    ...
+
+
+def test_rule_index_same_as_evaluate():
+    rnd = random.Random(0)
+    manager = HandlerManager()
+    conditions = [
+        Task.status == "done",
+        (Task.percent >= 90) & (Task.is_done == False),  # noqa: E712
+        or_(Task.percent < 10, Task.status == "todo"),
+        ~((Task.percent <= 50) | (Task.title == "a")),
+        and_(Task.status != "done"),
+        (Task.title == Task.content) & (Task.percent > 20),
+        50 < Task.percent,
+    ]
+    for i, c in enumerate(conditions):
+        manager.register(str(i), c, noop)
+    manager.register("0", Task.status == "doing", noop)  # replace
+    conditions[0] = Task.status == "doing"
+
+    for _ in range(200):
+        values = {
+            "status": rnd.choice(["todo", "doing", "done"]),
+            "percent": rnd.randint(0, 100),
+            "is_done": rnd.random() < 0.5,
+            "title": rnd.choice(["a", "b"]),
+            "content": rnd.choice(["a", "b"]),
+        }
+        expected = [str(i) for i, c in enumerate(conditions) if c.evaluate(**values)]
+        assert sorted(r.name for r in manager.match(values)) == expected
+
+    manager.unregister("6")
+    assert "6" not in [r.name for r in manager.match({"percent": 100, "status": "x", "is_done": True})]
+
+
+def test_referenced_variables():
+    assert referenced_variables(Task.status == "done") == {"status"}
+    e = ~(Task.title == Task.content) | and_(5 < Task.percent)
+    assert referenced_variables(e) == {"title", "content", "percent"}
+    assert referenced_variables(true()) == set()
+
+
+def test_skip_unchanged_fields(make_task):
+    manager = HandlerManager()
+    manager.register("done", Task.status == "done", noop)
+    manager.register("almost", (Task.percent >= 90) & (Task.status != "done"), noop)
+    manager.register("always", true(), noop)
+
+    task = make_task(status="done", percent=95)
+    previous = Note(version="1", note_time=datetime.datetime.now(), previous=None, **vars(task))
+    assert [r.name for r in manager.match_task(task)] == ["done", "always"]
+    assert manager.match_task(task, previous) == []
+
+    previous.content = "changed"
+    assert [r.name for r in manager.match_task(task, previous)] == ["always"]
+    previous.percent = 0
+    assert [r.name for r in manager.match_task(task, previous)] == ["always"]
+    previous.status = "doing"
+    assert [r.name for r in manager.match_task(task, previous)] == ["done", "always"]
+
+    # unchanged rules are skipped even if they are satisfied
+    values = {"status": "doing", "percent": 95}
+    assert [r.name for r in manager.match(values, {"content"})] == ["always"]
+    assert [r.name for r in manager.match(values, {"percent"})] == ["almost", "always"]
+
+
+def test_rule_failure_is_isolated(make_task):
+    manager = HandlerManager()
+    manager.register("over", Task.percent > 50, noop)
+    manager.register("range", (Task.percent >= 10) & (Task.percent <= 20), noop)
+    manager.register("done", Task.status == "done", noop)
+
+    task = make_task(status="done", percent=None)  # comparing None raises TypeError
+    assert [r.name for r in manager.match_task(task)] == ["done"]
@@ -0,0 +1,104 @@
+import asyncio
+from datetime import datetime, timedelta
+
+from notion_self_management.client.watermark import FileWatermarkStore
+from notion_self_management.expression.cron import Cron
+from notion_self_management.handler.scheduler import MissedPolicy, Scheduler
+
+
+class FakeClock:
+
+    def __init__(self, now: datetime) -> None:
+        self.now = now
+
+    def __call__(self) -> datetime:
+        return self.now
+
+
+async def test_run_pending():
+    clock = FakeClock(datetime(2022, 1, 1))
+    scheduler = Scheduler(clock)
+    fired = []
+
+    async def job(when):
+        fired.append(when)
+
+    for i in range(1000):
+        scheduler.add(i, Cron(f"{i % 60} * * * *"), job)
+    scheduler.add("removed", Cron("* * * * *"), job)
+    scheduler.remove("removed")
+    scheduler.add(0, Cron("0 12 * * *"), job)  # replaced
+
+    assert scheduler.run_pending() == []
+    clock.now += timedelta(minutes=5)
+    assert sorted(k for k, _ in scheduler.run_pending()) == [i for i in range(1000) if 0 < i % 60 <= 5]
+    await asyncio.sleep(0)
+    assert len(fired) == 85 and set(fired) == {datetime(2022, 1, 1, 0, i) for i in range(1, 6)}
+
+    # missed fire times while blocked fire once
+    clock.now += timedelta(hours=3)
+    assert len(scheduler.run_pending()) == 999
+    clock.now = datetime(2022, 1, 1, 12)
+    assert (0, datetime(2022, 1, 1, 12)) in scheduler.run_pending()
+    assert scheduler.jobs[1].next_time == datetime(2022, 1, 1, 12, 1)
+
+
+async def test_run():
+    clock = FakeClock(datetime(2022, 1, 1, 0, 0, 59, 990000))
+    scheduler = Scheduler(clock)
+    fired = asyncio.Event()
+
+    async def job(when):
+        fired.set()
+
+    scheduler.add("job", Cron("* * * * *"), job)
+    runner = asyncio.ensure_future(scheduler.run())
+    await asyncio.sleep(0)
+    clock.now = datetime(2022, 1, 1, 0, 1)
+    await asyncio.wait_for(fired.wait(), 1)
+    await scheduler.stop()
+    await asyncio.wait_for(runner, 1)
+
+
+async def test_catch_up(tmp_path):
+    start = datetime(2022, 1, 1)
+    store = FileWatermarkStore(tmp_path / "cron.json")
+    fired = {}
+
+    def record(key):
+
+        async def job(when):
+            fired.setdefault(key, []).append(when)
+
+        return job
+
+    def scheduler_at(now):
+        scheduler = Scheduler(FakeClock(now), FileWatermarkStore(store.path))
+        for policy in MissedPolicy:
+            scheduler.add(policy.value, Cron("*/10 * * * *"), record(policy.value), policy)
+        return scheduler
+
+    scheduler = scheduler_at(start)
+    await scheduler.restore()
+    scheduler.clock.now += timedelta(minutes=10)
+    scheduler.run_pending()
+    await scheduler.stop()
+    assert fired == {p.value: [datetime(2022, 1, 1, 0, 10)] for p in MissedPolicy}
+
+    # restarted an hour later
+    fired.clear()
+    scheduler = scheduler_at(datetime(2022, 1, 1, 1, 15))
+    await scheduler.restore()
+    await scheduler.stop()
+    assert fired == {
+        "coalesce": [datetime(2022, 1, 1, 1, 10)],
+        "replay": [start + timedelta(minutes=m) for m in range(20, 71, 10)],
+    }
+    assert all(j.next_time == datetime(2022, 1, 1, 1, 20) for j in scheduler.jobs.values())
+
+    # nothing is missed
+    fired.clear()
+    scheduler = scheduler_at(datetime(2022, 1, 1, 1, 19))
+    await scheduler.restore()
+    await scheduler.stop()
+    assert fired == {}
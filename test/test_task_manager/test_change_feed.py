@@ -0,0 +1,93 @@
+import json
+
+import httpx
+from notion_self_management.client.notion_client.client import AsyncClient, Notion
+from notion_self_management.client.watermark import FileWatermarkStore
+from notion_self_management.task_manager.change_feed import ChangeFeed
+from notion_self_management.task_manager.task import Task
+
+
+def make_page(page_id: str, edited: str, editor: str = "u1") -> dict:
+    user = {"object": "user", "id": editor}
+    return {
+        "object": "page",
+        "id": page_id,
+        "created_time": "2022-06-19T17:00:00.000Z",
+        "created_by": user,
+        "last_edited_time": edited,
+        "last_edited_by": user,
+        "archived": False,
+        "parent": {"type": "database_id", "database_id": "db"},
+        "url": "",
+        "properties": {},
+    }
+
+
+async def test_poll_since_watermark(tmp_path):
+    pages = {
+        "a": make_page("a", "2022-06-19T17:01:00.000Z"),
+        "b": make_page("b", "2022-06-19T17:02:00.000Z"),
+        "c": make_page("c", "2022-06-19T17:02:00.000Z"),
+    }
+    bodies = []
+
+    def handler(request: httpx.Request) -> httpx.Response:
+        body = json.loads(request.content)
+        bodies.append(body)
+        since = body.get("filter", {}).get("last_edited_time", {}).get("on_or_after", "")
+        results = sorted((p for p in pages.values() if p["last_edited_time"] >= since.replace("+00:00", ".000Z")),
+                         key=lambda p: p["last_edited_time"])
+        return httpx.Response(200, json={"results": results, "has_more": False, "next_cursor": None})
+
+    notion = Notion("key", "db", model=Task)
+    notion.client = AsyncClient(transport=httpx.MockTransport(handler))
+    received = []
+
+    async def sink(task: Task):
+        received.append(task.task_id)
+
+    feed = ChangeFeed(notion, sink, FileWatermarkStore(tmp_path / "watermarks.json"))
+    await feed.poll()
+    assert received == ["a", "b", "c"]
+    assert bodies[0]["sorts"] == [{"timestamp": "last_edited_time", "direction": "ascending"}]
+
+    # a new feed reads the persisted watermark
+    feed = ChangeFeed(notion, sink, FileWatermarkStore(tmp_path / "watermarks.json"))
+    assert await feed.poll() == []
+
+    pages["a"] = make_page("a", "2022-06-19T17:03:00.000Z")
+    await feed.poll()
+    assert received == ["a", "b", "c", "a"]
+    assert bodies[-1]["filter"] == {
+        "timestamp": "last_edited_time",
+        "last_edited_time": {"on_or_after": "2022-06-19T17:02:00+00:00"}
+    }
+
+    # edited again in the same minute
+    pages["a"] = make_page("a", "2022-06-19T17:03:00.000Z", editor="u2")
+    await feed.poll()
+    assert received == ["a", "b", "c", "a", "a"]
+    assert await feed.poll() == []
+
+
+async def test_refresh(tmp_path):
+    pages = {"a": make_page("a", "2022-06-19T17:01:00.000Z"), "b": make_page("b", "2022-06-19T17:02:00.000Z")}
+
+    def handler(request: httpx.Request) -> httpx.Response:
+        page = pages.get(request.url.path.rsplit("/", 1)[-1])
+        if page is None:
+            return httpx.Response(404, json={"object": "error"})
+        return httpx.Response(200, json=page)
+
+    notion = Notion("key", "db", model=Task)
+    notion.client = AsyncClient(transport=httpx.MockTransport(handler))
+    received = []
+
+    async def sink(task: Task):
+        received.append(task.task_id)
+
+    store = FileWatermarkStore(tmp_path / "watermarks.json")
+    feed = ChangeFeed(notion, sink, store)
+    refreshed = await feed.refresh(["b", "missing", "a"])
+    assert [t.task_id for t in refreshed] == received == ["b", "a"]
+    assert await store.load(feed.key) is None
@@ -0,0 +1,100 @@
+import asyncio
+import datetime
+
+from notion_self_management.task_manager.coalescer import Coalescer
+from notion_self_management.task_manager.task import Task
+from notion_self_management.task_manager.timer_wheel import TimerWheel
+
+
+def test_timer_wheel():
+    wheel = TimerWheel(resolution=1, slots=8)
+    for i in range(20):
+        wheel.schedule(i, i + 0.5)
+    wheel.schedule(3, 30)  # rescheduled
+    assert wheel.cancel(4) and not wheel.cancel(4)
+    assert wheel.advance(0.9) == []
+    assert wheel.advance(2) == [0, 1]
+    assert wheel.advance(11) == [2, 5, 6, 7, 8, 9, 10]
+    assert wheel.advance(100) == list(range(11, 20)) + [3]  # ticks beyond a round
+    assert len(wheel) == 0
+
+    wheel.schedule("late", 50)  # in the past, it's due at the next tick
+    assert wheel.advance(101) == ["late"]
+
+
+async def test_coalesce(make_task):
+    sent = []
+
+    async def sink(task: Task):
+        sent.append((task.task_id, task.title))
+
+    coalescer = Coalescer(sink, quiet=0.05, max_delay=0.15, resolution=0.01)
+    runner = asyncio.ensure_future(coalescer.run())
+    for i in range(3):
+        await coalescer.submit(make_task("t1", title=str(i)))
+    await coalescer.submit(make_task("t2", title="0"))
+    await asyncio.sleep(0.1)
+    assert sorted(sent) == [("t1", "2"), ("t2", "0")]
+
+    # a task which keeps changing is sent after max_delay
+    sent.clear()
+    for i in range(10):
+        await coalescer.submit(make_task("t1", title=str(i)))
+        await asyncio.sleep(0.03)
+    assert sent and sent[0][0] == "t1" and len(sent) < 4
+
+    coalescer.stop()
+    await runner
+    assert sent[-1] == ("t1", "9")
+    m = coalescer.metrics
+    assert (m.submitted, m.flushed, m.coalesced) == (14, len(sent) + 2, 14 - len(sent) - 2)
+
+
+async def test_send_in_background(make_task):
+    sent = []
+    release = asyncio.Event()
+
+    async def sink(task: Task):
+        if task.task_id == "t1":
+            await release.wait()
+        await asyncio.sleep(0.01)
+        sent.append(task.task_id)
+
+    coalescer = Coalescer(sink, quiet=0.02, max_delay=0.1, resolution=0.01, concurrency=2)
+    runner = asyncio.ensure_future(coalescer.run())
+    await coalescer.submit(make_task("t1"))
+    await asyncio.sleep(0.05)
+    for task_id in ["t2", "t3", "t4"]:
+        await coalescer.submit(make_task(task_id))
+    await asyncio.sleep(0.1)
+    assert sent == ["t2", "t3", "t4"]  # t1 doesn't hold up others, one of them is sent at a time
+
+    coalescer.stop()
+    await asyncio.sleep(0.01)
+    assert not runner.done()  # waits for t1
+    release.set()
+    await runner
+    assert sent[-1] == "t1"
+
+
+async def test_update_task_through_coalescer(make_task, manager):
+    coalescer = Coalescer(manager.take_note, quiet=0.02, max_delay=0.1, resolution=0.01)
+    manager.set_note_sink(coalescer.submit)
+    runner = asyncio.ensure_future(coalescer.run())
+    task = await manager.task_db.create(make_task())
+    for i in range(3):
+        task.title, task.update_time = str(i), task.update_time + datetime.timedelta(seconds=1)
+        assert (await manager.update_task_later(task)).title == str(i)
+    assert manager.note_db.items == {}
+
+    await asyncio.sleep(0.05)
+    assert [n.title for n in manager.note_db.items.values()] == ["2"]
+
+    # update_task still takes the note at once
+    task.title, task.update_time = "3", task.update_time + datetime.timedelta(seconds=1)
+    note = await manager.update_task(task)
+    assert note.title == "3" and note.version in manager.note_db.items
+    task.update_time += datetime.timedelta(seconds=1)
+    assert (await manager.delete_task(task)).active is False
+    coalescer.stop()
+    await runner
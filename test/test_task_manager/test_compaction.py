@@ -0,0 +1,49 @@
+import asyncio
+import datetime
+
+from notion_self_management.task_manager.compaction import Compactor, RetentionPolicy
+from notion_self_management.task_manager.task import Task
+from notion_self_management.task_manager.task_manager import TaskManager
+
+
+async def take_notes(manager: TaskManager, task: Task, count: int):
+    for _ in range(count):
+        task.update_time += datetime.timedelta(seconds=1)
+        await manager.take_note(task)
+
+
+async def test_count_policy(make_task, manager):
+    compactor = Compactor(manager, RetentionPolicy(max_notes=3), batch_size=2, idle_delay=0.01)
+    runner = asyncio.ensure_future(compactor.run())
+    await take_notes(manager, make_task("t1"), 8)
+    await take_notes(manager, make_task("t2"), 2)
+    await asyncio.sleep(0.1)
+
+    notes = sorted(manager.note_db.items.values(), key=lambda n: n.note_time)
+    assert [n.version for n in notes if n.task_id == "t1"] == ["0005", "0006", "0007"]
+    assert notes[0].previous is None  # the new root
+    assert len([n for n in notes if n.task_id == "t2"]) == 2
+    m = compactor.metrics
+    assert (m.observed, m.tracked, m.queued, m.compacted, m.deleted) == (10, 2, 0, 1, 5)
+
+    # counted tasks are compacted without queries
+    await take_notes(manager, make_task("t1", update_time=datetime.datetime(2022, 1, 2)), 1)
+    await asyncio.sleep(0.1)
+    assert (await manager.get_chain("t1")).versions() == ["0006", "0007", "0010"]
+    compactor.stop()
+    await runner
+
+
+async def test_age_policy(make_task, manager):
+    now = datetime.datetime.now()
+    compactor = Compactor(manager, RetentionPolicy(max_notes=None, max_age=datetime.timedelta(hours=1)),
+                          idle_delay=0, now=lambda: now)
+    await take_notes(manager, make_task("t1"), 3)
+    assert await compactor.compact("t1") == 0
+
+    now += datetime.timedelta(hours=2)
+    runner = asyncio.ensure_future(compactor.run())
+    await asyncio.sleep(0.05)
+    assert list(manager.note_db.items) == ["0002"]  # the latest is kept
+    compactor.stop()
+    await runner
@@ -0,0 +1,166 @@
+import asyncio
+import datetime
+import os
+from dataclasses import replace
+
+from notion_self_management.client.memory_client import MemoryClient
+from notion_self_management.task_manager.version import VersionGenerator
+
+
+async def test_delete_notes(manager, make_note):
+    notes = [make_note("1"), make_note("2", "1"), make_note("3", "2")]
+    await manager.note_db.create_many(notes)
+
+    assert not await manager.delete_notes([notes[0]])  # v1 has a following note
+    assert await manager.delete_notes(notes[1:])
+    assert list(manager.note_db.items) == ["1"]
+
+
+class CountingClient(MemoryClient):
+
+    def __init__(self, *args, **kwargs) -> None:
+        super().__init__(*args, **kwargs)
+        self.reads = 0
+
+    async def get(self, t_id):
+        self.reads += 1
+        return await super().get(t_id)
+
+    async def lists(self, *args, **kwargs):
+        self.reads += 1
+        return await super().lists(*args, **kwargs)
+
+
+async def test_head_cache(make_task, make_manager):
+    notes = CountingClient(id_field="version")
+    manager = make_manager(notes)
+    task = make_task()
+    first = await manager.take_note(task)
+    assert notes.reads == 1
+
+    assert (await manager.take_note(task)).version == first.version  # idempotent
+    task.update_time += datetime.timedelta(seconds=1)
+    task.title = "edited"
+    second = await manager.take_note(task)
+    assert notes.reads == 1
+    assert second.previous == first.version
+
+    manager.invalidate(task.task_id)
+    assert (await manager.get_current_note_by_task(task.task_id)).title == "edited"
+    assert notes.reads == 2
+
+
+async def test_note_chain(make_task, make_manager):
+    notes = CountingClient(id_field="version")
+    manager = make_manager(notes)
+    task = make_task()
+    for i in range(6):
+        task.update_time += datetime.timedelta(seconds=1)
+        task.title = str(i)
+        await manager.take_note(task)
+
+    chain = await manager.get_chain(task.task_id)
+    assert chain.versions() == ["0000", "0001", "0002", "0003", "0004", "0005"]
+    reads = notes.reads
+    assert (await manager.get_note_at(task.task_id, -2)).title == "4"
+    assert [n.title for n in await manager.list_notes(task.task_id, 1, 4)] == ["1", "2", "3"]
+    assert notes.reads == reads + 2
+
+    # revert to 0002, the chain tells what to truncate
+    task.update_time += datetime.timedelta(seconds=1)
+    note = await manager.take_note(task, previous_version="0002")
+    assert chain.versions() == ["0000", "0001", "0002", "0006"]
+    assert sorted(notes.items) == chain.versions()
+    assert note.previous == "0002"
+    assert chain.after("0001") == ["0002", "0006"]
+    assert not await manager.delete_notes([await manager.get_note("0001")])
+
+
+def test_versions():
+    now = [1656000000.0]
+    versions = VersionGenerator(node=1, clock=lambda: now[0])
+    generated = [versions.new() for _ in range(3)]
+    now[0] -= 10  # the clock goes backwards
+    generated.append(versions.new())
+    now[0] += 20
+    generated.append(versions.new())
+    assert generated == sorted(generated) and len(set(generated)) == 5
+    assert VersionGenerator(node=2, clock=lambda: now[0]).new() != versions.new()
+    assert str(int(now[0] * 1000)) < generated[0]  # versions of earlier releases sort before
+    assert "9999999999999" < generated[0]
+
+
+def test_default_node(monkeypatch):
+    nodes = set()
+    for pid in range(1000, 1100):
+        monkeypatch.setattr(os, "getpid", lambda: pid)
+        nodes.add(VersionGenerator().node)
+    assert len(nodes) == 100  # processes of a host don't collide
+
+
+class SlowClient(MemoryClient):
+
+    def __init__(self, *args, **kwargs) -> None:
+        super().__init__(*args, **kwargs)
+        self.running = self.max_running = 0
+
+    async def create(self, t):
+        self.running += 1
+        self.max_running = max(self.max_running, self.running)
+        await asyncio.sleep(0.01)
+        self.running -= 1
+        return await super().create(t)
+
+
+async def test_take_notes_concurrently(make_task, make_manager):
+    notes = SlowClient(id_field="version")
+    manager = make_manager(notes)
+    tasks = []
+    for i in range(3):
+        for task_id in ["t1", "t2", "t3", "t4"]:
+            tasks.append(make_task(task_id, title=str(i), update_time=datetime.datetime(2022, 1, 1, i)))
+
+    taken = await manager.take_notes(tasks, concurrency=8)
+    assert [n.title for n in taken] == [t.title for t in tasks]
+    assert notes.max_running == 4  # a task's notes are taken one by one
+    for task_id in ["t1", "t2", "t3", "t4"]:
+        chain = await manager.get_chain(task_id)
+        chained = [await manager.get_note(v) for v in chain.versions()]
+        assert [n.title for n in chained] == ["0", "1", "2"]
+        assert [n.previous for n in chained] == [None] + chain.versions()[:2]
+
+
+class MillisecondClient(MemoryClient):
+    """keeps note times in milliseconds like MongoDB"""
+
+    async def create(self, t):
+        t = replace(t, note_time=t.note_time.replace(microsecond=t.note_time.microsecond // 1000 * 1000))
+        return await super().create(t)
+
+
+async def test_notes_in_milliseconds(make_task, make_manager):
+    manager = make_manager(MillisecondClient(id_field="version"))
+    task = make_task()
+    await manager.get_chain(task.task_id)  # times of notes taken from now on are in microseconds
+    for i in range(3):
+        task.update_time += datetime.timedelta(seconds=1)
+        task.title = str(i)
+        await manager.take_note(task)
+
+    assert [n.title for n in await manager.list_notes(task.task_id)] == ["0", "1", "2"]
+    assert [n.title for n in await manager.list_notes(task.task_id, 1, 2)] == ["1"]
+    assert await manager.prune_notes(task.task_id, 1) == 1
+    assert [n.title for n in await manager.list_notes(task.task_id)] == ["1", "2"]
+
+
+async def test_prune_without_root(make_task, manager):
+    task = make_task()
+    for i in range(3):
+        task.update_time += datetime.timedelta(seconds=1)
+        await manager.take_note(task)
+
+    await manager.get_chain(task.task_id)
+    del manager.note_db.items["0001"]  # deleted without the manager
+    assert await manager.prune_notes(task.task_id, 1) == 0
+    assert sorted(manager.note_db.items) == ["0000", "0002"]
+    assert (await manager.get_chain(task.task_id)).versions() == ["0000", "0002"]  # reloaded
@@ -0,0 +1,46 @@
+import asyncio
+
+from notion_self_management.web.batcher import MicroBatcher
+
+
+async def test_batcher():
+    batches = []
+
+    async def sink(keys):
+        batches.append(keys)
+
+    batcher = MicroBatcher(sink, window=0.05, max_batch=3, max_pending=5)
+    runner = asyncio.ensure_future(batcher.run())
+    for key in "aabab":
+        assert batcher.add(key)
+    assert len(batcher) == 2
+    await asyncio.sleep(0.01)
+    assert batches == []  # waiting for the window
+
+    await asyncio.sleep(0.08)
+    assert batches == [["a", "b"]]
+
+    # full batches don't wait for the window
+    for key in "cdefg":
+        batcher.add(key)
+    await asyncio.sleep(0.01)
+    assert batches[1:] == [["c", "d", "e"]]
+
+    batcher.stop()
+    await runner  # pending keys are flushed
+    assert batches[1:] == [["c", "d", "e"], ["f", "g"]]
+    m = batcher.metrics
+    assert (m.received, m.coalesced, m.batches, m.flushed) == (10, 3, 3, 7)
+
+
+async def test_reject_when_full():
+
+    async def sink(keys):
+        ...
+
+    batcher = MicroBatcher(sink, max_pending=2)
+    assert batcher.add(1) and batcher.add(2) and batcher.add(1)
+    assert not batcher.add(3)
+    assert batcher.metrics.rejected == 1
+    assert await batcher.flush() == [1, 2]
+    assert batcher.add(3)
@@ -0,0 +1,72 @@
+import hashlib
+import hmac
+import json
+
+from notion_self_management.web.batcher import MicroBatcher
+from pytest import importorskip
+
+importorskip("sanic")
+importorskip("sanic_testing")
+
+from notion_self_management.web.server import SIGNATURE_HEADER, create_app, page_of, verify_signature
+
+
+def sign(body: bytes, secret: str) -> str:
+    return "sha256=" + hmac.new(secret.encode(), body, hashlib.sha256).hexdigest()
+
+
+def notification(page_id: str, parent: str = "db-1") -> dict:
+    return {"type": "page.properties_updated", "entity": {"id": page_id, "type": "page"},
+            "data": {"parent": {"id": parent, "type": "database"}}}
+
+
+async def sink(pages):
+    pass
+
+
+def test_verify_signature():
+    body = b'{"a": 1}'
+    assert verify_signature(body, "secret", sign(body, "secret"))
+    assert not verify_signature(body, "secret", sign(body, "other"))
+    assert not verify_signature(body + b" ", "secret", sign(body, "secret"))
+    assert not verify_signature(body, "secret", None)
+
+
+def test_page_of():
+    assert page_of(notification("p1")) == "p1"
+    assert page_of(notification("p1"), "db1") == "p1"  # dashes don't matter
+    assert page_of(notification("p1"), "db2") is None
+    assert page_of({"entity": {"id": "c1", "type": "comment"}}) is None
+    assert page_of({"entity": "p1"}) is None
+    assert page_of({}) is None
+
+
+async def test_webhook(caplog):
+    batcher = MicroBatcher(sink, max_pending=1)
+    app = create_app(batcher, secret="secret", database_id="db1", name="test_webhook")
+
+    async def post(event, secret="secret"):
+        body = event if isinstance(event, bytes) else json.dumps(event).encode()
+        _, res = await app.asgi_client.post("/webhook", content=body, headers={SIGNATURE_HEADER: sign(body, secret)})
+        return res.status
+
+    assert await post(notification("p1"), secret="other") == 401
+    assert await post(b"not json") == 400
+    assert await post([1, 2]) == 400
+    assert await post({"verification_token": "token"}) == 200
+    assert "token" not in caplog.text  # it's the configured secret
+    assert await post(notification("p1", parent="db2")) == 200  # another database
+    assert await post(notification("p1")) == 202
+    assert await post(notification("p1")) == 202  # coalesced
+    assert await post(notification("p2")) == 503  # the batcher is full
+    assert len(batcher) == 1 and batcher.metrics.rejected == 1
+
+
+async def test_verification_token(caplog):
+    app = create_app(MicroBatcher(sink), name="test_verification_token")
+    with caplog.at_level("INFO", logger="Server"):
+        _, res = await app.asgi_client.post("/webhook", content=json.dumps({"verification_token": "token"}))
+    assert res.status == 200
+    assert "token" in caplog.text
+    _, res = await app.asgi_client.post("/webhook", content=json.dumps(notification("p1")))  # unsigned
+    assert res.status == 202